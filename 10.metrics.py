@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Client Metrics
+Per-endpoint request counters, latency histograms and OpenMetrics export
+
+Usage:
+    from script_loader import load_script
+    metrics = load_script("10.metrics.py")
+
+    metrics.REGISTRY.snapshot()                         # read in-process
+    metrics.write_openmetrics("metrics.prom")           # export to a file
+    metrics.serve_metrics(9464)                         # or a local HTTP port
+"""
+
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Latency buckets in seconds - spans local mock calls up to slow list fetches
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Gauge values for circuit breaker states (see 18.circuit_breaker.py)
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: Dict[Tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values) -> float:
+        return self.values.get(label_values, 0)
+
+    def snapshot(self) -> Dict[Tuple, float]:
+        with self.lock:
+            return dict(self.values)
+
+    def expose(self) -> List[str]:
+        lines = [f"# TYPE {self.name} counter", f"# HELP {self.name} {self.help}"]
+        for values, count in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}_total{_format_labels(self.labels, values)} {count}")
+        return lines
+
+
+class Gauge(Counter):
+    """Point-in-time value keyed by label values"""
+
+    kind = "gauge"
+
+    def set(self, *label_values, value: float):
+        with self.lock:
+            self.values[label_values] = value
+
+    def expose(self) -> List[str]:
+        lines = [f"# TYPE {self.name} gauge", f"# HELP {self.name} {self.help}"]
+        for values, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.values: Dict[Tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, *label_values, value: float):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                entry = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self) -> Dict[Tuple, Dict]:
+        with self.lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self.values.items()]
+        result = {}
+        for key, counts, total, count in items:
+            cumulative, running = {}, 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                cumulative[bound] = running
+            result[key] = {"buckets": cumulative, "sum": total, "count": count}
+        return result
+
+    def expose(self) -> List[str]:
+        lines = [f"# TYPE {self.name} histogram", f"# HELP {self.name} {self.help}"]
+        for values, data in sorted(self.snapshot().items()):
+            for bound, count in data["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labels, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {data['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {data['sum']}")
+        return lines
+
+
+class ClientMetrics:
+    """Metric family set recorded by NoIPFraudAPI._request"""
+
+    def __init__(self, prefix: str = "noipfraud_client"):
+        self.requests = Counter(f"{prefix}_requests", "HTTP requests sent", ("tenant", "endpoint", "status"))
+        self.errors = Counter(f"{prefix}_errors", "Failed requests (HTTP >= 400 or transport error)",
+                              ("tenant", "endpoint", "status"))
+        self.latency = Histogram(f"{prefix}_request_duration_seconds", "Request latency", ("tenant", "endpoint"))
+        self.bytes_sent = Counter(f"{prefix}_request_bytes", "Request body bytes sent", ("tenant", "endpoint"))
+        self.bytes_received = Counter(f"{prefix}_response_bytes", "Response body bytes received",
+                                      ("tenant", "endpoint"))
+        self.retries = Counter(f"{prefix}_retries", "Requests retried", ("tenant", "endpoint"))
+        self.relogins = Counter(f"{prefix}_relogins", "Re-authentications after expiry or 401", ("tenant",))
+        self.circuit_state = Gauge(f"{prefix}_circuit_state", "Circuit breaker state (0=closed 1=half_open 2=open)",
+                                   ("tenant",))
+        self.short_circuits = Counter(f"{prefix}_short_circuits", "Requests rejected by an open circuit",
+                                      ("tenant", "endpoint"))
+        self.queue_depths = Gauge(f"{prefix}_queue_depth", "Requests waiting for a scheduler slot",
+                                  ("tenant", "priority"))
+        self.queue_waits = Histogram(f"{prefix}_queue_wait_seconds", "Time spent waiting for a scheduler slot",
+                                     ("tenant", "priority"))
+        self.families = [self.requests, self.errors, self.latency, self.bytes_sent,
+                         self.bytes_received, self.retries, self.relogins, self.circuit_state,
+                         self.short_circuits, self.queue_depths, self.queue_waits]
+
+    def observe(self, tenant: str, endpoint: str, status, seconds: float,
+                sent: int = 0, received: int = 0):
+        status = str(status)
+        self.requests.inc(tenant, endpoint, status)
+        if not status.isdigit() or int(status) >= 400:
+            self.errors.inc(tenant, endpoint, status)
+        self.latency.observe(tenant, endpoint, value=seconds)
+        if sent:
+            self.bytes_sent.inc(tenant, endpoint, amount=sent)
+        if received:
+            self.bytes_received.inc(tenant, endpoint, amount=received)
+
+    def retry(self, tenant: str, endpoint: str):
+        self.retries.inc(tenant, endpoint)
+
+    def relogin(self, tenant: str):
+        self.relogins.inc(tenant)
+
+    def circuit(self, tenant: str, state: str):
+        self.circuit_state.set(tenant, value=CIRCUIT_STATES[state])
+
+    def short_circuit(self, tenant: str, endpoint: str):
+        self.short_circuits.inc(tenant, endpoint)
+
+    def queue_depth(self, tenant: str, priority: str, depth: int):
+        self.queue_depths.set(tenant, priority, value=depth)
+
+    def queue_wait(self, tenant: str, priority: str, seconds: float):
+        self.queue_waits.observe(tenant, priority, value=seconds)
+
+    def register(self, family):
+        """Attach an extra metric family (e.g. from another component) to the export"""
+        self.families.append(family)
+        return family
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Plain-dict view for in-process reads: {family: {label-tuple: value}}"""
+        return {f.name: f.snapshot() for f in self.families}
+
+    def expose(self) -> str:
+        lines = []
+        for family in self.families:
+            lines.extend(family.expose())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide default used by every NoIPFraudAPI unless one is passed in
+REGISTRY = ClientMetrics()
+
+
+def write_openmetrics(path: str, registry: ClientMetrics = None):
+    """Atomically write the OpenMetrics exposition to a file"""
+    registry = registry or REGISTRY
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    with os.fdopen(fd, "w") as f:
+        f.write(registry.expose())
+    os.replace(tmp, path)
+
+
+def serve_metrics(port: int = 9464, host: str = "127.0.0.1",
+                  registry: ClientMetrics = None):
+    """Serve GET /metrics on a background thread; returns the server (call .shutdown())"""
+    # Imported here: http.server is only needed when exporting over HTTP
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.expose().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Demo: run a few calls against the mock server and print the exposition"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show client metrics against the mock server")
+    parser.add_argument("--campaigns", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--out", help="also write OpenMetrics text to this file")
+    parser.add_argument("--port", type=int, help="keep serving /metrics on this port")
+    args = parser.parse_args()
+
+    from script_loader import load_script
+    client = load_script("6.noipfraud_complete_api.py")
+    mock = load_script("8.mock_server.py")
+    # Running as __main__ - use the registry instance the client records into
+    registry = client.metrics.REGISTRY
+
+    with mock.MockNoIPFraudServer(campaigns=args.campaigns, error_rate=args.error_rate) as server:
+        api = client.NoIPFraudAPI(server.base_url, server.username, server.password, max_retries=2)
+        api.login()
+        campaigns = api.get_campaigns()
+        api.bulk_change_status([c["name"] for c in campaigns[:5]], 1)
+        api.get_block_report()
+
+    print(registry.expose())
+    if args.out:
+        write_openmetrics(args.out, registry)
+        print(f"💾 Written to {args.out}")
+    if args.port:
+        serve_metrics(args.port, registry=registry)
+        print(f"📡 Serving http://127.0.0.1:{args.port}/metrics (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
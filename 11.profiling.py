@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Profiling Mode
+Per-phase wall/CPU time, tracemalloc peaks, optional cProfile and a
+flamegraph-compatible (collapsed stacks) sample dump for script runs.
+
+Enable on any numbered script:
+    python 6.noipfraud_complete_api.py --profile
+    python 6.noipfraud_complete_api.py --profile=cprofile
+    NOIPFRAUD_PROFILE=1 NOIPFRAUD_PROFILE_DIR=/tmp/prof python 3.noipfraud_api.py
+
+Output (in ./profiles unless NOIPFRAUD_PROFILE_DIR is set):
+    <script>-<timestamp>.summary.txt   compact per-phase table
+    <script>-<timestamp>.summary.json  same data, machine readable
+    <script>-<timestamp>.folded        collapsed stacks for flamegraph.pl / speedscope
+    <script>-<timestamp>.prof          cProfile stats (cprofile mode only)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# cProfile and tracemalloc are imported by Profiler.start() so that scripts
+# pay nothing for profiling support unless --profile is given
+tracemalloc = None
+
+
+class StackSampler:
+    """Background thread sampling all thread stacks into collapsed-stack counts"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.phases: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stack.append(self.phases.get(thread_id, "-"))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path: Path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Collects per-phase timings for one run
+
+    Phases are opened with `with PROFILER.phase("login"):` and are no-ops
+    while the profiler is disabled, so scripts can leave them in place.
+
+    tracemalloc's peak is process-wide, so memory peaks are only tracked for
+    phases on the main thread; phases opened in worker threads (e.g. "network"
+    inside a fan-out) report time only and show "-" for peak memory.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.use_cprofile = False
+        # Repeated phases (e.g. one "network" per request) are aggregated by name
+        self.phases: Dict[str, Dict] = {}
+        self._phases_lock = threading.Lock()
+        self._local = threading.local()
+        self._sampler: Optional[StackSampler] = None
+        self._cprofile = None
+        self._started = None
+        self._peak = 0
+
+    def start(self, use_cprofile: bool = False, sample_interval: float = 0.005):
+        global tracemalloc
+        import tracemalloc
+        self.enabled = True
+        self.use_cprofile = use_cprofile
+        self._started = (time.perf_counter(), time.process_time())
+        tracemalloc.start()
+        self._sampler = StackSampler(sample_interval)
+        self._sampler.start()
+        if use_cprofile:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    @property
+    def _stack(self) -> List[Dict]:
+        # Phase nesting is tracked per thread so worker pools don't interleave
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        parent = self._stack[-1] if self._stack else None
+        # Worker threads would reset each other's (and the main thread's) peak
+        track_memory = threading.current_thread() is threading.main_thread()
+        if track_memory:
+            if parent:
+                # Carry the parent's peak so far before resetting for the child
+                parent["child_peak"] = max(parent["child_peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        entry = {
+            "name": f"{parent['name']}/{name}" if parent else name,
+            "child_peak": 0,
+            "mem_start": tracemalloc.get_traced_memory()[0] if track_memory else 0,
+        }
+        self._stack.append(entry)
+        thread_id = threading.get_ident()
+        previous_phase = self._sampler.phases.get(thread_id, "-")
+        self._sampler.phases[thread_id] = entry["name"]
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            self._stack.pop()
+            self._sampler.phases[thread_id] = previous_phase
+            peak_kb = None
+            if track_memory:
+                peak = max(tracemalloc.get_traced_memory()[1], entry["child_peak"])
+                self._peak = max(self._peak, peak)
+                if parent:
+                    parent["child_peak"] = max(parent["child_peak"], peak)
+                tracemalloc.reset_peak()
+                peak_kb = (peak - entry["mem_start"]) / 1024
+            with self._phases_lock:
+                stats = self.phases.setdefault(entry["name"], {
+                    "phase": entry["name"], "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_mem_kb": None
+                })
+                stats["calls"] += 1
+                stats["wall_s"] += wall
+                stats["cpu_s"] += cpu
+                if peak_kb is not None:
+                    stats["peak_mem_kb"] = max(stats["peak_mem_kb"] or 0.0, peak_kb)
+
+    def stop(self, script: str, output_dir: str = None) -> Path:
+        """Stop collecting and write the report files; returns the summary path"""
+        if self._cprofile:
+            self._cprofile.disable()
+        self._sampler.stop()
+        total_wall = time.perf_counter() - self._started[0]
+        total_cpu = time.process_time() - self._started[1]
+        total_peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        self.enabled = False
+
+        out = Path(output_dir or os.environ.get("NOIPFRAUD_PROFILE_DIR", "profiles"))
+        out.mkdir(parents=True, exist_ok=True)
+        stem = out / f"{Path(script).stem}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+
+        summary = {
+            "script": script,
+            "total": {
+                "wall_s": round(total_wall, 4),
+                "cpu_s": round(total_cpu, 4),
+                "wait_s": round(max(total_wall - total_cpu, 0.0), 4),
+                "peak_mem_kb": round(total_peak / 1024, 1),
+            },
+            "phases": [
+                dict(p, wall_s=round(p["wall_s"], 4), cpu_s=round(p["cpu_s"], 4),
+                     wait_s=round(max(p["wall_s"] - p["cpu_s"], 0.0), 4),
+                     peak_mem_kb=None if p["peak_mem_kb"] is None else round(p["peak_mem_kb"], 1))
+                for p in list(self.phases.values())
+            ],
+        }
+        with open(f"{stem}.summary.json", "w") as f:
+            json.dump(summary, f, indent=2)
+        with open(f"{stem}.summary.txt", "w") as f:
+            f.write(format_summary(summary))
+        self._sampler.dump(Path(f"{stem}.folded"))
+        if self._cprofile:
+            self._cprofile.dump_stats(f"{stem}.prof")
+        return Path(f"{stem}.summary.txt")
+
+
+def format_summary(summary: Dict) -> str:
+    lines = [
+        f"Profile: {summary['script']}",
+        f"{'phase':<36}{'calls':>7}{'wall s':>10}{'cpu s':>10}{'wait s':>10}{'peak KB':>12}",
+        "-"*85,
+    ]
+    for p in summary["phases"]:
+        peak = "-" if p["peak_mem_kb"] is None else f"{p['peak_mem_kb']:.1f}"
+        lines.append(f"{p['phase']:<36}{p['calls']:>7}{p['wall_s']:>10.4f}{p['cpu_s']:>10.4f}"
+                     f"{p['wait_s']:>10.4f}{peak:>12}")
+    t = summary["total"]
+    lines.append("-"*85)
+    lines.append(f"{'TOTAL':<36}{'':>7}{t['wall_s']:>10.4f}{t['cpu_s']:>10.4f}"
+                 f"{t['wait_s']:>10.4f}{t['peak_mem_kb']:>12.1f}")
+    return "\n".join(lines) + "\n"
+
+
+# Shared instance - scripts open phases on this
+PROFILER = Profiler()
+
+
+def _profile_mode() -> Optional[str]:
+    """Read and strip --profile[=cprofile] from argv; fall back to NOIPFRAUD_PROFILE"""
+    mode = None
+    for arg in list(sys.argv[1:]):
+        if arg == "--profile" or arg.startswith("--profile="):
+            mode = arg.partition("=")[2] or "1"
+            sys.argv.remove(arg)
+    return mode or os.environ.get("NOIPFRAUD_PROFILE") or None
+
+
+def run_main(main, script: str):
+    """Run a script's main(), profiled when --profile / NOIPFRAUD_PROFILE is set"""
+    mode = _profile_mode()
+    if not mode or mode == "0":
+        return main()
+    PROFILER.start(use_cprofile=(mode == "cprofile"))
+    try:
+        with PROFILER.phase("main"):
+            return main()
+    finally:
+        path = PROFILER.stop(script)
+        print(f"\n📈 Profile written to {path}")
+        print(path.read_text())
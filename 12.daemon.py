@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Warm Daemon
+Long-running local HTTP/JSON service wrapping NoIPFraudAPI for n8n.
+Tokens, keep-alive connection pools and the campaign list cache stay warm
+between workflow steps instead of being rebuilt by every process spawn.
+
+Run:
+    NOIPFRAUD_BASE_URL=... NOIPFRAUD_USERNAME=... NOIPFRAUD_PASSWORD=... python 12.daemon.py
+    python 12.daemon.py --tenants tenants.json --port 8787 --workers 8
+
+tenants.json:
+    {"luxeattic": {"base_url": "https://luxeattic.com/admin/api", "username": "...", "password": "..."}}
+
+Endpoints (all JSON; pick a tenant with ?tenant=NAME, default is the first one):
+    GET  /health
+    GET  /metrics                            OpenMetrics text
+    GET  /campaigns?from=YYYY-MM-DD&to=...&window_days=7
+    GET  /report/status
+    GET  /report/block?date=YYYY-MM-DD
+    GET  /embed?campaign_id=ID
+    POST /embeds        {"campaign_ids": [...], "local": true}   (omit ids for all)
+    POST /status        {"campaign_id": "...", "status": -1}
+    POST /bulk-status   {"campaign_ids": [...], "status": 1}
+    POST /update        {"campaign_id": "...", "fakeurl": "..."}
+    POST /bulk-update   {"updates": [{"campaign_id": "...", ...}, ...]}
+    POST /create        {"name": "...", "safe_url": "...", "money_url": "...", "countries": ["th"]}
+"""
+
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import urlparse, parse_qs
+
+from script_loader import load_script
+
+client = load_script("6.noipfraud_complete_api.py")
+
+
+class WarmNoIPFraudAPI(client.NoIPFraudAPI):
+    """
+    NoIPFraudAPI with a short-lived campaign list cache, invalidated on writes
+
+    With a snapshot_cache the in-process cache is bypassed: the shared snapshot
+    is already warm, and only it sees other processes' writes.
+    """
+
+    def __init__(self, *args, cache_ttl: float = 30.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[tuple, tuple] = {}
+        self._cache_lock = threading.Lock()
+        # Bumped by invalidate(): a fill that started before a write is not stored
+        self._generation = 0
+        self._login_lock = threading.Lock()
+
+    def _ensure_authenticated(self):
+        # Workers share one client - only one of them should log in
+        with self._login_lock:
+            super()._ensure_authenticated()
+
+    def get_campaigns(self, from_date: str = None, to_date: str = None, **kwargs) -> List[Dict]:
+        if not self.cache_ttl or self.snapshot_cache is not None:
+            return super().get_campaigns(from_date, to_date, **kwargs)
+        # Defaults resolved so "today" doesn't outlive midnight; window_days etc. change the result too
+        from_date = from_date or datetime.now().strftime("%Y-%m-%d")
+        key = (from_date, to_date or from_date, tuple(sorted(kwargs.items())))
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            generation = self._generation
+        if hit and time.monotonic() - hit[0] < self.cache_ttl:
+            return hit[1]
+        campaigns = super().get_campaigns(from_date, to_date, **kwargs)
+        if campaigns:
+            with self._cache_lock:
+                if self._generation == generation:
+                    self._cache[key] = (time.monotonic(), campaigns)
+        return campaigns
+
+    def invalidate(self):
+        with self._cache_lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def change_status(self, campaign_id: str, status: int) -> bool:
+        ok = super().change_status(campaign_id, status)
+        self.invalidate()
+        return ok
+
+    def update_campaign(self, campaign_id: str, **updates) -> bool:
+        ok = super().update_campaign(campaign_id, **updates)
+        self.invalidate()
+        return ok
+
+    def create_campaign(self, *args, **kwargs):
+        result = super().create_campaign(*args, **kwargs)
+        self.invalidate()
+        return result
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Daemon:
+    """Tenant clients plus a bounded job queue drained by a worker pool"""
+
+    def __init__(self, tenants: Dict[str, Dict], workers: int = 8, max_queue: int = 100,
+                 job_timeout: float = 300.0, cache_ttl: float = 30.0, shared_cache: str = None):
+        # Shared with noipfraud.py --shared-cache and other daemons on this machine
+        snapshots = load_script("29.snapshot_cache.py").SharedSnapshotCache(
+            shared_cache, ttl=cache_ttl or 30.0) if shared_cache else None
+        self.clients = {
+            name: WarmNoIPFraudAPI(cfg["base_url"].rstrip("/"), cfg["username"], cfg["password"],
+                                   max_retries=cfg.get("max_retries", 2), tenant=name,
+                                   pool_size=max(workers, 10), cache_ttl=cache_ttl,
+                                   snapshot_cache=snapshots)
+            for name, cfg in tenants.items()
+        }
+        self.default_tenant = next(iter(self.clients))
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="noipfraud-worker")
+        # Running + waiting jobs; beyond this new requests are rejected with 503
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.job_timeout = job_timeout
+        self.pending = 0
+        self.pending_lock = threading.Lock()
+        self.accepting = True
+        self.started = time.time()
+
+    def client(self, tenant: str = None):
+        api = self.clients.get(tenant or self.default_tenant)
+        if api is None:
+            raise KeyError(f"Unknown tenant: {tenant}")
+        return api
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue a job and wait for its result"""
+        if not self.accepting:
+            raise QueueFull("Daemon is shutting down")
+        if not self.slots.acquire(blocking=False):
+            raise QueueFull("Job queue is full")
+        with self.pending_lock:
+            self.pending += 1
+
+        def run():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self.pending_lock:
+                    self.pending -= 1
+                self.slots.release()
+
+        return self.executor.submit(run).result(timeout=self.job_timeout)
+
+    def health(self) -> Dict:
+        return {
+            "ok": self.accepting,
+            "uptime_s": round(time.time() - self.started, 1),
+            "queue_depth": self.pending,
+            "tenants": {
+                name: {"base_url": api.base_url, "logged_in": bool(api.token),
+                       "token_expiry": api.token_expiry.isoformat() if api.token_expiry else None,
+                       "circuit": api.circuit_status()}
+                for name, api in self.clients.items()
+            },
+        }
+
+    def shutdown(self):
+        """Stop taking jobs and let queued ones finish"""
+        self.accepting = False
+        self.executor.shutdown(wait=True)
+
+
+def _routes(api, query: Dict, body: Dict):
+    """Map (method, path) to a zero-arg callable running the client operation"""
+    return {
+        ("GET", "/campaigns"): lambda: api.get_campaigns(query.get("from"), query.get("to"),
+                                                         window_days=int(query.get("window_days") or 0) or None),
+        ("GET", "/report/status"): lambda: api.get_status_report(),
+        ("GET", "/report/block"): lambda: api.get_block_report(query.get("date")),
+        ("GET", "/embed"): lambda: {"campaign_id": query["campaign_id"],
+                                    "code": api.get_embed_code(query["campaign_id"])},
+        ("POST", "/embeds"): lambda: api.get_all_embed_codes(body.get("campaign_ids"), local=bool(body.get("local"))),
+        ("POST", "/status"): lambda: {"campaign_id": body["campaign_id"],
+                                      "ok": api.change_status(body["campaign_id"], int(body["status"]))},
+        ("POST", "/bulk-status"): lambda: api.bulk_change_status(body["campaign_ids"], int(body["status"])),
+        ("POST", "/update"): lambda: {"campaign_id": body["campaign_id"],
+                                      "ok": api.update_campaign(**body)},
+        ("POST", "/bulk-update"): lambda: api.bulk_update([dict(u) for u in body["updates"]]),
+        ("POST", "/create"): lambda: api.create_campaign(
+            body["name"], body["safe_url"], body["money_url"],
+            countries=body.get("countries"), mobile_only=body.get("mobile_only", True)),
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _send(self, status: int, data, content_type: str = "application/json"):
+        body = data.encode() if isinstance(data, str) else json.dumps(data, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method: str):
+        daemon = self.server.state
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length)) if length else {}
+        except json.JSONDecodeError:
+            return self._send(400, {"error": "invalid JSON body"})
+
+        if parsed.path == "/health":
+            return self._send(200, daemon.health())
+        if parsed.path == "/metrics":
+            return self._send(200, client.metrics.REGISTRY.expose(), client.metrics.CONTENT_TYPE)
+
+        try:
+            api = daemon.client(query.get("tenant") or body.pop("tenant", None))
+        except KeyError as e:
+            return self._send(404, {"error": str(e.args[0])})
+
+        route = _routes(api, query, body).get((method, parsed.path))
+        if route is None:
+            return self._send(404, {"error": f"No route for {method} {parsed.path}"})
+        try:
+            return self._send(200, daemon.submit(route))
+        except QueueFull as e:
+            return self._send(503, {"error": str(e)})
+        except FutureTimeout:
+            return self._send(504, {"error": "Job timed out"})
+        except (KeyError, TypeError, ValueError) as e:
+            return self._send(400, {"error": f"Bad request: {e}"})
+        except Exception as e:
+            return self._send(502, {"error": f"{type(e).__name__}: {e}"})
+
+
+class DaemonServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, daemon: Daemon, host: str = "127.0.0.1", port: int = 8787, verbose: bool = False):
+        super().__init__((host, port), _Handler)
+        self.state = daemon
+        self.verbose = verbose
+
+
+def load_tenants(path: str = None) -> Dict[str, Dict]:
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    base_url = os.environ.get("NOIPFRAUD_BASE_URL")
+    if not base_url:
+        raise SystemExit("❌ Set NOIPFRAUD_BASE_URL/USERNAME/PASSWORD or pass --tenants FILE")
+    return {
+        os.environ.get("NOIPFRAUD_TENANT", "default"): {
+            "base_url": base_url,
+            "username": os.environ.get("NOIPFRAUD_USERNAME", ""),
+            "password": os.environ.get("NOIPFRAUD_PASSWORD", ""),
+        }
+    }
+
+
+def run(host: str = "127.0.0.1", port: int = 8787, tenants_file: str = None, workers: int = 8,
+        max_queue: int = 100, cache_ttl: float = 30.0, verbose: bool = False, shared_cache: str = None):
+    daemon = Daemon(load_tenants(tenants_file), workers=workers, max_queue=max_queue, cache_ttl=cache_ttl,
+                    shared_cache=shared_cache)
+    server = DaemonServer(daemon, host, port, verbose)
+
+    # Warm up: log in every tenant before taking traffic
+    for name, api in daemon.clients.items():
+        print(f"{'✅' if api.login() else '❌'} {name}: login")
+
+    def stop(signum, frame):
+        print("\n👋 Shutting down - draining queued jobs...")
+        # shutdown() blocks until serve_forever returns, so call it off the main thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print("="*70)
+    print(f"noIPFraud daemon listening on http://{host}:{server.server_address[1]}")
+    print(f"Tenants: {', '.join(daemon.clients)}  Workers: {workers}  Queue: {max_queue}")
+    print("="*70)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        daemon.shutdown()
+        print("✅ Stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm noIPFraud daemon for n8n")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--tenants", help="JSON file of tenants (default: NOIPFRAUD_* env vars)")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent API jobs")
+    parser.add_argument("--max-queue", type=int, default=100, help="waiting jobs before 503")
+    parser.add_argument("--cache-ttl", type=float, default=30.0, help="campaign list cache seconds (0 = off)")
+    parser.add_argument("--shared-cache", metavar="PATH", help="SQLite file for list snapshots shared across "
+                                                               "processes (see 29.snapshot_cache.py)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    run(args.host, args.port, args.tenants, args.workers, args.max_queue, args.cache_ttl, args.verbose,
+        args.shared_cache)
+
+
+if __name__ == "__main__":
+    main()
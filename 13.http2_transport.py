@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+noIPFraud HTTP/2 Transport
+Drop-in replacement for the requests.Session used by NoIPFraudAPI, built on
+httpx. Over TLS the connection negotiates HTTP/2 via ALPN and multiplexes
+every concurrent request to a host on one connection; servers without h2
+(and plain http://) fall back to HTTP/1.1 keep-alive automatically.
+
+Responses are requested with gzip (and brotli/zstd when the decoders are
+installed) so large campaigns.php?a=list payloads travel compressed.
+
+Requires: pip install "httpx[http2]"   (optional: brotli)
+
+Usage:
+    api = NoIPFraudAPI(base_url, username, password, transport="http2")
+    api.bulk_change_status(ids, -1, concurrency=16)   # one connection, 16 streams
+"""
+
+import requests
+
+
+def available() -> bool:
+    """True if httpx and h2 are importable"""
+    try:
+        import httpx  # noqa: F401
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def accept_encoding() -> str:
+    encodings = ["gzip", "deflate"]
+    try:
+        import brotli  # noqa: F401
+        encodings.insert(0, "br")
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            encodings.insert(0, "br")
+        except ImportError:
+            pass
+    try:
+        import zstandard  # noqa: F401
+        encodings.insert(0, "zstd")
+    except ImportError:
+        pass
+    return ", ".join(encodings)
+
+
+class _RequestInfo:
+    def __init__(self, body: bytes):
+        self.body = body
+
+
+class HTTP2Response:
+    """The subset of requests.Response that NoIPFraudAPI uses"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.content = response.content
+        self.http_version = response.http_version
+        self.request = _RequestInfo(response.request.content)
+
+    @property
+    def text(self) -> str:
+        return self._response.text
+
+    def json(self):
+        return self._response.json()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self._response.url}", response=self)
+
+
+class HTTP2Session:
+    """
+    requests.Session-compatible wrapper around one httpx.Client
+
+    One client holds one connection per host for HTTP/2 (up to pool_size
+    for HTTP/1.1 fallback). Transport errors are re-raised as
+    requests.ConnectionError / requests.Timeout so callers keep a single
+    exception hierarchy.
+    """
+
+    def __init__(self, pool_size: int = 10, timeout=None, http2: bool = True):
+        import httpx
+
+        self._httpx = httpx
+        self.client = httpx.Client(
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            headers={"Accept-Encoding": accept_encoding()},
+        )
+
+    def request(self, method: str, url: str, params=None, json=None, headers=None, timeout=None, **kwargs):
+        httpx = self._httpx
+        if isinstance(timeout, tuple):
+            # requests-style (connect, read)
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        extra = {} if timeout is None else {"timeout": timeout}
+        try:
+            response = self.client.request(method, url, params=params, json=json, headers=headers, **extra)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+        return HTTP2Response(response)
+
+    def close(self):
+        self.client.close()
+
+
+def make_session(pool_size: int = 10, timeout=None):
+    """HTTP2Session if httpx[http2] is installed, else None (caller keeps requests)"""
+    if not available():
+        return None
+    return HTTP2Session(pool_size=pool_size, timeout=timeout)
+
+
+def main():
+    """Compare HTTP/1.1 (requests) vs the httpx transport against the mock server"""
+    import argparse
+    import time
+
+    from script_loader import load_script
+
+    parser = argparse.ArgumentParser(description="HTTP/1.1 vs HTTP/2 transport fan-out comparison")
+    parser.add_argument("--campaigns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    if not available():
+        print("❌ httpx[http2] not installed - run: pip install 'httpx[http2]'")
+        return
+
+    client = load_script("6.noipfraud_complete_api.py")
+    mock = load_script("8.mock_server.py")
+
+    with mock.MockNoIPFraudServer(campaigns=args.campaigns, latency=args.latency) as server:
+        for transport in ("http1", "http2"):
+            api = client.NoIPFraudAPI(server.base_url, server.username, server.password,
+                                      transport=transport, pool_size=args.concurrency)
+            api.login()
+            ids = [c["name"] for c in api.get_campaigns()]
+            start = time.perf_counter()
+            codes = api.get_all_embed_codes(ids, concurrency=args.concurrency)
+            elapsed = time.perf_counter() - start
+            print(f"{transport}: {len(codes)} embed codes in {elapsed:.2f}s "
+                  f"({len(codes) / elapsed:.0f}/s) via {type(api.session).__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Auto-Action Rule Engine
+Evaluates threshold rules against block reports on every poll and dispatches
+the resulting status changes as parallel, per-tenant batches.
+
+rules.json:
+    [
+      {"id": "block-spam", "when": "block_rate > 80", "for_polls": 3, "status": -1,
+       "tenant": "luxeattic", "traffic": "54218f34454c61f813000001", "name": "TH-*"},
+      {"id": "review-dead", "when": "total < 10", "status": 0, "priority": -1}
+    ]
+
+    when       "<metric> <op> <number>", metric is any numeric block report field
+               (block_rate, total, blocked, allowed), op is one of > >= < <= ==
+    for_polls  consecutive polls the condition must hold before acting (default 1)
+    status     target status: 0=Review 1=Active 2=Allow All -1=Block All
+    tenant / traffic / name   optional scope; name is a glob on the campaign name
+    priority   when several rules fire for one campaign the highest wins (default 0)
+
+Evaluation is one pass over the campaigns: rules are indexed by tenant,
+traffic source and name pattern, and inside each scope bucket by
+(metric, op) with sorted thresholds, so a campaign only touches the rules
+whose scope and threshold it actually satisfies.
+
+Run:
+    python 14.rule_engine.py --rules rules.json --tenants tenants.json --interval 300
+    python 14.rule_engine.py --rules rules.json --once --dry-run
+"""
+
+import argparse
+import json
+import re
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from fnmatch import fnmatchcase
+from typing import Dict, List, Optional, Tuple
+
+from script_loader import load_script
+
+ANY = None
+CONDITION = re.compile(r"^\s*(\w+)\s*(>=|<=|==|>|<)\s*(-?\d+(?:\.\d+)?)\s*$")
+WILDCARDS = re.compile(r"[*?\[]")
+
+
+class Rule:
+    """One declared threshold rule"""
+
+    def __init__(self, id: str, when: str, status: int, for_polls: int = 1,
+                 tenant: str = None, traffic: str = None, name: str = None, priority: int = 0):
+        match = CONDITION.match(when)
+        if not match:
+            raise ValueError(f"Rule {id}: can't parse condition {when!r}")
+        if status not in (-1, 0, 1, 2):
+            raise ValueError(f"Rule {id}: invalid status {status}")
+        self.id = id
+        self.when = when
+        self.metric, self.op, value = match.groups()
+        self.value = float(value)
+        self.status = status
+        self.for_polls = max(1, int(for_polls))
+        self.tenant = tenant
+        self.traffic = traffic
+        self.name = name
+        self.priority = priority
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Rule":
+        return cls(**data)
+
+    def __repr__(self):
+        return f"Rule({self.id}: {self.when} x{self.for_polls} -> {self.status})"
+
+
+class _ThresholdIndex:
+    """Rules sharing (metric, op) sorted by threshold - matching is a bisect"""
+
+    def __init__(self, op: str, rules: List[Rule]):
+        self.op = op
+        self.rules = sorted(rules, key=lambda r: r.value)
+        self.values = [r.value for r in self.rules]
+
+    def match(self, value: float) -> List[Rule]:
+        op = self.op
+        if op == ">":
+            return self.rules[:bisect_left(self.values, value)]
+        if op == ">=":
+            return self.rules[:bisect_right(self.values, value)]
+        if op == "<":
+            return self.rules[bisect_right(self.values, value):]
+        if op == "<=":
+            return self.rules[bisect_left(self.values, value):]
+        return self.rules[bisect_left(self.values, value):bisect_right(self.values, value)]
+
+
+class _Bucket:
+    """Rules with the same scope, grouped into threshold indexes"""
+
+    def __init__(self):
+        self.pending: List[Rule] = []
+        self.indexes: List[Tuple[str, _ThresholdIndex]] = []
+
+    def build(self):
+        groups = defaultdict(list)
+        for rule in self.pending:
+            groups[(rule.metric, rule.op)].append(rule)
+        self.indexes = [(metric, _ThresholdIndex(op, rules)) for (metric, op), rules in groups.items()]
+
+    def match(self, row: Dict) -> List[Rule]:
+        matched = []
+        for metric, index in self.indexes:
+            value = row.get(metric)
+            if isinstance(value, (int, float)):
+                matched.extend(index.match(value))
+        return matched
+
+
+class RuleIndex:
+    """
+    Scope index: (tenant, traffic) -> name index -> bucket
+
+    Name patterns are split into exact names (hash lookup), globs keyed by
+    their literal prefix (looked up for every prefix of the campaign name)
+    and globs with no literal prefix (checked with fnmatch).
+    """
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = {r.id: r for r in rules}
+        if len(self.rules) != len(rules):
+            raise ValueError("Duplicate rule ids")
+        # (tenant, traffic) -> {"any": bucket, "exact": {name: bucket},
+        #                       "prefix": {prefix: {pattern: bucket}}, "glob": {pattern: bucket}}
+        self.scopes: Dict[Tuple, Dict] = {}
+        self.max_prefix = 0
+        for rule in rules:
+            self._bucket_for(rule).pending.append(rule)
+        for scope in self.scopes.values():
+            for bucket in self._buckets(scope):
+                bucket.build()
+
+    def _bucket_for(self, rule: Rule) -> _Bucket:
+        scope = self.scopes.setdefault((rule.tenant, rule.traffic),
+                                       {"any": _Bucket(), "exact": {}, "prefix": {}, "glob": {}})
+        pattern = rule.name
+        if pattern is None:
+            return scope["any"]
+        wildcard = WILDCARDS.search(pattern)
+        if not wildcard:
+            return scope["exact"].setdefault(pattern, _Bucket())
+        prefix = pattern[:wildcard.start()]
+        if prefix:
+            self.max_prefix = max(self.max_prefix, len(prefix))
+            return scope["prefix"].setdefault(prefix, {}).setdefault(pattern, _Bucket())
+        return scope["glob"].setdefault(pattern, _Bucket())
+
+    @staticmethod
+    def _buckets(scope: Dict):
+        yield scope["any"]
+        yield from scope["exact"].values()
+        for patterns in scope["prefix"].values():
+            yield from patterns.values()
+        yield from scope["glob"].values()
+
+    def match(self, tenant: str, row: Dict) -> List[Rule]:
+        name = row.get("campaign_name") or ""
+        traffic = row.get("traffic")
+        matched = []
+        for key in dict.fromkeys(((tenant, traffic), (tenant, ANY), (ANY, traffic), (ANY, ANY))):
+            scope = self.scopes.get(key)
+            if scope is None:
+                continue
+            matched.extend(scope["any"].match(row))
+            bucket = scope["exact"].get(name)
+            if bucket:
+                matched.extend(bucket.match(row))
+            if scope["prefix"]:
+                for i in range(min(len(name), self.max_prefix), 0, -1):
+                    for pattern, bucket in scope["prefix"].get(name[:i], {}).items():
+                        if fnmatchcase(name, pattern):
+                            matched.extend(bucket.match(row))
+            for pattern, bucket in scope["glob"].items():
+                if fnmatchcase(name, pattern):
+                    matched.extend(bucket.match(row))
+        return matched
+
+
+class RuleEngine:
+    """Tracks consecutive-poll streaks and turns matches into status changes"""
+
+    def __init__(self, rules: List[Rule], concurrency: int = 8, dry_run: bool = False):
+        self.index = RuleIndex(rules)
+        self.concurrency = concurrency
+        self.dry_run = dry_run
+        # (tenant, campaign_id) -> {rule_id: consecutive polls matched}
+        self.streaks: Dict[Tuple[str, str], Dict[str, int]] = {}
+        # tenant -> error of the last poll, for tenants that couldn't be fetched or changed
+        self.failed: Dict[str, str] = {}
+
+    def evaluate(self, reports: Dict[str, List[Dict]]) -> Dict[Tuple[str, int], List[str]]:
+        """
+        One pass over every tenant's block report rows
+        Tenants missing from reports (failed fetch) keep their streaks unchanged
+
+        Returns:
+            {(tenant, status): [campaign_id, ...]} of changes to make
+        """
+        actions = defaultdict(list)
+        streaks = {key: value for key, value in self.streaks.items() if key[0] not in reports}
+        for tenant, rows in reports.items():
+            for row in rows:
+                key = (tenant, row["campaign_id"])
+                previous = self.streaks.get(key, {})
+                current = {}
+                best: Optional[Rule] = None
+                for rule in self.index.match(tenant, row):
+                    count = current[rule.id] = previous.get(rule.id, 0) + 1
+                    if count >= rule.for_polls and (best is None or rule.priority > best.priority):
+                        best = rule
+                if current:
+                    streaks[key] = current
+                if best is not None and row.get("status") != best.status:
+                    actions[(tenant, best.status)].append(row["campaign_id"])
+        # Campaigns of polled tenants that matched nothing drop their streaks
+        self.streaks = streaks
+        return dict(actions)
+
+    def dispatch(self, clients: Dict, actions: Dict[Tuple[str, int], List[str]]) -> Dict:
+        """Run each (tenant, status) batch in parallel; returns per-batch results"""
+        if self.dry_run or not actions:
+            return {f"{tenant}:{status}": {cid: None for cid in ids} for (tenant, status), ids in actions.items()}
+
+        def run(item):
+            (tenant, status), ids = item
+            try:
+                outcome = clients[tenant].bulk_change_status(ids, status, concurrency=self.concurrency)
+            except Exception as e:
+                self.failed[tenant] = f"{type(e).__name__}: {e}"
+                outcome = {cid: False for cid in ids}
+            return f"{tenant}:{status}", outcome
+
+        with ThreadPoolExecutor(max_workers=max(1, len(actions))) as pool:
+            return dict(pool.map(run, actions.items()))
+
+    def poll(self, clients: Dict, date: str = None) -> Dict:
+        """
+        Fetch block reports for every tenant, evaluate and dispatch
+        A tenant whose fetch raises is skipped this poll and listed in self.failed
+        """
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        self.failed = {}
+
+        def fetch(tenant):
+            try:
+                return tenant, clients[tenant].get_block_report(date)
+            except Exception as e:
+                # CircuitOpen / ConnectionError on one tenant must not stop the others
+                self.failed[tenant] = f"{type(e).__name__}: {e}"
+                return tenant, None
+
+        with ThreadPoolExecutor(max_workers=max(1, len(clients))) as pool:
+            reports = {tenant: rows for tenant, rows in pool.map(fetch, clients) if rows is not None}
+        return self.dispatch(clients, self.evaluate(reports))
+
+
+def load_rules(path: str) -> List[Rule]:
+    with open(path) as f:
+        return [Rule.from_dict(r) for r in json.load(f)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Threshold-driven auto-action rule engine")
+    parser.add_argument("--rules", required=True, help="JSON rules file")
+    parser.add_argument("--tenants", help="JSON tenants file (default: NOIPFRAUD_* env vars)")
+    parser.add_argument("--interval", type=float, default=300, help="seconds between polls")
+    parser.add_argument("--date", help="report date (default: today)")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel status changes per batch")
+    parser.add_argument("--once", action="store_true", help="run a single poll and exit")
+    parser.add_argument("--dry-run", action="store_true", help="evaluate and print, don't change status")
+    args = parser.parse_args()
+
+    client = load_script("6.noipfraud_complete_api.py")
+    tenants = load_script("12.daemon.py").load_tenants(args.tenants)
+    clients = {
+        name: client.NoIPFraudAPI(cfg["base_url"].rstrip("/"), cfg["username"], cfg["password"],
+                                  max_retries=2, tenant=name, pool_size=args.concurrency)
+        for name, cfg in tenants.items()
+    }
+    engine = RuleEngine(load_rules(args.rules), concurrency=args.concurrency, dry_run=args.dry_run)
+
+    print("="*70)
+    print(f"noIPFraud Rule Engine - {len(engine.index.rules)} rules, {len(clients)} tenants"
+          f"{' (DRY RUN)' if args.dry_run else ''}")
+    print("="*70)
+
+    while True:
+        start = time.perf_counter()
+        results = engine.poll(clients, args.date)
+        elapsed = time.perf_counter() - start
+        stamp = datetime.now().strftime("%H:%M:%S")
+        for tenant, error in engine.failed.items():
+            print(f"[{stamp}] ❌ {tenant}: {error}")
+        if not results:
+            print(f"[{stamp}] ✅ No actions ({elapsed:.2f}s)")
+        for batch, outcome in results.items():
+            ok = sum(1 for v in outcome.values() if v)
+            print(f"[{stamp}] 🚨 {batch}: {len(outcome)} campaigns"
+                  f"{'' if args.dry_run else f', {ok} changed'} ({elapsed:.2f}s)")
+        if args.once:
+            break
+        time.sleep(max(0.0, args.interval - elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Campaign Index
+Hash indexes over a get_campaigns() snapshot for O(1) lookups and compound
+queries, maintained incrementally when a refreshed snapshot only changes a
+few campaigns.
+
+Usage:
+    index = CampaignIndex(api.get_campaigns())
+    index.get("xmgbl4i3")
+    index.query(country="th", active=1, traffic="54218f34454c61f813000001")
+    index.query(domain="safe.example.com", info="Launch-TH-01")
+    diff = index.refresh(api.get_campaigns())   # {"added": [...], "removed": [...], "changed": [...]}
+"""
+
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+
+def fakeurl_domain(url: Optional[str]) -> Optional[str]:
+    """Host of a campaign's safe URL, lower-cased ("safe.com=blocked" style values included)"""
+    if not url:
+        return None
+    if "//" not in url:
+        url = "//" + url
+    host = urlparse(url).hostname
+    return host.lower() if host else None
+
+
+def campaign_countries(campaign: Dict) -> List[str]:
+    rules = campaign.get("rules") or {}
+    country = rules.get("country") or {}
+    return [c.lower() for c in (country.get("d") or [])]
+
+
+def _raw_fields(campaign: Dict) -> tuple:
+    country = ((campaign.get("rules") or {}).get("country") or {}).get("d")
+    return (campaign.get("info"), campaign.get("fakeurl"), tuple(country or ()),
+            campaign.get("traffic"), campaign.get("active"))
+
+
+# attribute -> function returning the value(s) to index for a campaign
+EXTRACTORS = {
+    "info": lambda c: [c.get("info")],
+    "domain": lambda c: [fakeurl_domain(c.get("fakeurl"))],
+    "country": campaign_countries,
+    "traffic": lambda c: [c.get("traffic")],
+    "active": lambda c: [c.get("active")],
+}
+
+
+class CampaignIndex:
+    """Primary index on campaign id ("name") plus secondary hash indexes"""
+
+    def __init__(self, campaigns: Iterable[Dict] = ()):
+        self.by_id: Dict[str, Dict] = {}
+        # attribute -> value -> set of campaign ids
+        self.indexes: Dict[str, Dict[object, Set[str]]] = {attr: {} for attr in EXTRACTORS}
+        # campaign id -> attribute -> indexed values (for removal without rescanning)
+        self._keys: Dict[str, Dict[str, tuple]] = {}
+        # campaign id -> raw indexed fields, compared before re-deriving keys on refresh
+        self._raw: Dict[str, tuple] = {}
+        for campaign in campaigns:
+            self.upsert(campaign)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, campaign_id: str):
+        return campaign_id in self.by_id
+
+    def get(self, campaign_id: str) -> Optional[Dict]:
+        return self.by_id.get(campaign_id)
+
+    # ==================== MAINTENANCE ====================
+
+    def _index_keys(self, campaign: Dict) -> Dict[str, tuple]:
+        keys = {}
+        for attr, extract in EXTRACTORS.items():
+            values = extract(campaign)
+            keys[attr] = tuple(v for v in dict.fromkeys(values) if v is not None)
+        return keys
+
+    def upsert(self, campaign: Dict) -> bool:
+        """Insert or replace one campaign; returns True if any indexed attribute changed"""
+        cid = campaign["name"]
+        self.by_id[cid] = campaign
+        raw = _raw_fields(campaign)
+        if self._raw.get(cid) == raw:
+            return False
+        self._raw[cid] = raw
+        new_keys = self._index_keys(campaign)
+        old_keys = self._keys.get(cid)
+        if old_keys == new_keys:
+            return False
+        for attr, values in new_keys.items():
+            old = old_keys[attr] if old_keys else ()
+            if old == values:
+                continue
+            index = self.indexes[attr]
+            for value in old:
+                ids = index.get(value)
+                if ids is not None:
+                    ids.discard(cid)
+                    if not ids:
+                        del index[value]
+            for value in values:
+                index.setdefault(value, set()).add(cid)
+        self._keys[cid] = new_keys
+        return True
+
+    def remove(self, campaign_id: str) -> bool:
+        if campaign_id not in self.by_id:
+            return False
+        del self.by_id[campaign_id]
+        del self._raw[campaign_id]
+        for attr, values in self._keys.pop(campaign_id).items():
+            index = self.indexes[attr]
+            for value in values:
+                ids = index.get(value)
+                if ids is not None:
+                    ids.discard(campaign_id)
+                    if not ids:
+                        del index[value]
+        return True
+
+    def refresh(self, campaigns: Iterable[Dict]) -> Dict[str, List[str]]:
+        """
+        Bring the index in line with a new full snapshot
+
+        Only campaigns whose indexed attributes changed touch the secondary
+        indexes; everything else is a record swap.
+
+        Returns:
+            {"added": [...], "removed": [...], "changed": [...]} campaign ids
+        """
+        seen = set()
+        added, changed = [], []
+        for campaign in campaigns:
+            cid = campaign["name"]
+            seen.add(cid)
+            is_new = cid not in self.by_id
+            if self.upsert(campaign) and not is_new:
+                changed.append(cid)
+            if is_new:
+                added.append(cid)
+        removed = [cid for cid in self.by_id if cid not in seen]
+        for cid in removed:
+            self.remove(cid)
+        return {"added": added, "removed": removed, "changed": changed}
+
+    # ==================== QUERIES ====================
+
+    def ids(self, attr: str, value) -> Set[str]:
+        if attr == "domain" and isinstance(value, str):
+            value = value.lower()
+        if attr == "country" and isinstance(value, str):
+            value = value.lower()
+        return self.indexes[attr].get(value, set())
+
+    def query(self, **criteria) -> List[Dict]:
+        """
+        AND of attribute criteria; a list/tuple/set value means "any of"
+
+            index.query(country=["th", "vn"], active=1)
+        """
+        if not criteria:
+            return list(self.by_id.values())
+        candidate_sets = []
+        for attr, value in criteria.items():
+            if attr in ("id", "name"):
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                matched = {v for v in values if v in self.by_id}
+            elif attr not in self.indexes:
+                raise ValueError(f"Unknown index {attr!r} (have: id, {', '.join(self.indexes)})")
+            elif isinstance(value, (list, tuple, set)):
+                matched = set().union(*(self.ids(attr, v) for v in value)) if value else set()
+            else:
+                matched = self.ids(attr, value)
+            if not matched:
+                return []
+            candidate_sets.append(matched)
+        # Intersect smallest first
+        candidate_sets.sort(key=len)
+        result = set(candidate_sets[0])
+        for other in candidate_sets[1:]:
+            result &= other
+            if not result:
+                return []
+        return [self.by_id[cid] for cid in result]
+
+    def values(self, attr: str) -> Dict[object, int]:
+        """Distinct values of an indexed attribute with campaign counts"""
+        return {value: len(ids) for value, ids in self.indexes[attr].items()}
+
+
+def main():
+    """Demo against the mock server: build, query, refresh"""
+    import argparse
+    import time
+
+    from script_loader import load_script
+
+    parser = argparse.ArgumentParser(description="Campaign index demo against the mock server")
+    parser.add_argument("--campaigns", type=int, default=5000)
+    args = parser.parse_args()
+
+    client = load_script("6.noipfraud_complete_api.py")
+    mock = load_script("8.mock_server.py")
+
+    with mock.MockNoIPFraudServer(campaigns=args.campaigns) as server:
+        api = client.NoIPFraudAPI(server.base_url, server.username, server.password)
+        api.login()
+        snapshot = api.get_campaigns()
+
+        start = time.perf_counter()
+        index = CampaignIndex(snapshot)
+        print(f"✅ Indexed {len(index)} campaigns in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        hits = index.query(country="th", active=1)
+        print(f"🔍 country=th & active=1: {len(hits)} campaigns "
+              f"({(time.perf_counter() - start) * 1000:.3f} ms)")
+        print(f"📊 Traffic sources: {index.values('traffic')}")
+
+        for c in snapshot[:5]:
+            api.change_status(c["name"], -1)
+        start = time.perf_counter()
+        diff = index.refresh(api.get_campaigns())
+        print(f"🔄 Refresh: {len(diff['changed'])} changed, {len(diff['added'])} added, "
+              f"{len(diff['removed'])} removed ({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Bulk Campaign Creation
+Creates campaigns from a CSV or JSON manifest. Re-running the same manifest
+is safe: rows whose name already exists (campaign "info") are not created
+again, and the existing campaign id is returned for them.
+
+manifest.csv:
+    name,safe_url,money_url,countries,traffic,mobile_only
+    Launch-TH-01,https://safe.example.com/a,https://lp1.example.com|70;https://lp2.example.com|30,th;vn,,true
+
+    money_url   one URL, or a split "url|perc;url|perc" (percentages default to an even split)
+    countries   "th;vn" or "th,vn" (default th)
+    traffic     traffic source id (default Facebook)
+    mobile_only true/false (default true)
+
+manifest.json: a list of objects with the same keys (money_url/countries may be lists).
+
+Run:
+    python 16.bulk_create.py manifest.csv --concurrency 8 --out created.json
+    noipfraud.py bulk-create manifest.csv
+"""
+
+import argparse
+import csv
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from script_loader import load_script
+
+campaign_index = load_script("15.campaign_index.py")
+
+
+# ==================== MANIFEST ====================
+
+def _split_money_urls(value, line: int) -> List[Dict]:
+    if isinstance(value, list):
+        entries = [dict(e) if isinstance(e, dict) else {"url": e} for e in value]
+    else:
+        entries = []
+        for part in str(value).split(";"):
+            part = part.strip()
+            if not part:
+                continue
+            url, _, perc = part.partition("|")
+            entries.append({"url": url.strip(), "perc": perc.strip() or None})
+    if not entries:
+        raise ValueError(f"row {line}: money_url is empty")
+    for e in entries:
+        if e.get("perc") is not None:
+            try:
+                e["perc"] = float(e["perc"])
+            except (TypeError, ValueError):
+                raise ValueError(f"row {line}: money_url percentage {e['perc']!r} is not a number") from None
+    unset = [e for e in entries if e.get("perc") is None]
+    if unset:
+        remaining = 100 - sum(e["perc"] for e in entries if e.get("perc") is not None)
+        for e in unset:
+            e["perc"] = remaining / len(unset)
+    if any(e["perc"] <= 0 for e in entries) or abs(sum(e["perc"] for e in entries) - 100) > 0.01:
+        split = ", ".join(f"{e['perc']:g}" for e in entries)
+        raise ValueError(f"row {line}: money_url percentages must be positive and add up to 100 (got {split})")
+    return [{"url": e["url"], "perc": int(e["perc"]) if float(e["perc"]).is_integer() else e["perc"],
+             "desc": e.get("desc") or f"LP{i + 1}"} for i, e in enumerate(entries)]
+
+
+def _parse_row(row: Dict, line: int) -> Dict:
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ValueError(f"row {line}: name is required")
+    if not row.get("safe_url") or not row.get("money_url"):
+        raise ValueError(f"row {line}: safe_url and money_url are required")
+    countries = row.get("countries") or ["th"]
+    if isinstance(countries, str):
+        countries = [c.strip().lower() for c in countries.replace(";", ",").split(",") if c.strip()]
+    mobile_only = row.get("mobile_only", True)
+    if isinstance(mobile_only, str):
+        # A blank cell means the default (true)
+        mobile_only = mobile_only.strip().lower() not in ("false", "0", "no")
+    parsed = {
+        "row": line,
+        "name": name,
+        "safe_url": row["safe_url"].strip(),
+        "money_url": _split_money_urls(row["money_url"], line),
+        "countries": countries,
+        "mobile_only": mobile_only,
+    }
+    if row.get("traffic"):
+        parsed["traffic"] = str(row["traffic"]).strip()
+    return parsed
+
+
+def load_manifest(path: str) -> List[Dict]:
+    """Parse a .csv or .json manifest; raises ValueError on the first bad row"""
+    if path.endswith(".json"):
+        with open(path) as f:
+            rows = json.load(f)
+        return [_parse_row(row, i + 1) for i, row in enumerate(rows)]
+    with open(path, newline="") as f:
+        # line 1 is the header
+        return [_parse_row(row, i + 2) for i, row in enumerate(csv.DictReader(f))]
+
+
+# ==================== BULK CREATE ====================
+
+def _existing_campaigns(api) -> List[Dict]:
+    """Today's campaign list, raising instead of returning [] when it can't be loaded"""
+    try:
+        return api.get_campaigns(strict=True)
+    except Exception as e:
+        raise RuntimeError(f"campaign list unavailable ({type(e).__name__}: {e})") from e
+
+
+def bulk_create(api, rows: List[Dict], concurrency: int = 8, dry_run: bool = False) -> List[Dict]:
+    """
+    Create missing campaigns, deduplicated by name against one list fetch
+
+    Returns:
+        One result per manifest row:
+        {"row", "name", "campaign_id", "result": "created" | "exists" | "duplicate" | "failed" | "planned"}
+        plus "error" on rows whose create request raised
+
+    create_campaign is never retried (a slow but committed create would be
+    duplicated); a failed row is safe to re-run, since the name check finds
+    it if the server did create it.
+
+    Raises:
+        RuntimeError: the campaign list couldn't be loaded - nothing is created,
+        since a failed fetch would look like "no campaigns exist"
+    """
+    index = campaign_index.CampaignIndex(_existing_campaigns(api))
+    results = []
+    to_create: Dict[str, Dict] = {}
+    for row in rows:
+        existing = index.query(info=row["name"])
+        if existing:
+            results.append({"row": row["row"], "name": row["name"],
+                            "campaign_id": existing[0]["name"], "result": "exists"})
+        elif row["name"] in to_create:
+            results.append({"row": row["row"], "name": row["name"], "campaign_id": None, "result": "duplicate"})
+        else:
+            to_create[row["name"]] = row
+            results.append({"row": row["row"], "name": row["name"], "campaign_id": None,
+                            "result": "planned" if dry_run else "pending"})
+
+    if dry_run or not to_create:
+        return results
+
+    created: Dict[str, str] = {}
+    errors: Dict[str, str] = {}
+    lock = threading.Lock()
+
+    def create(row):
+        kwargs = {"countries": row["countries"], "mobile_only": row["mobile_only"]}
+        if "traffic" in row:
+            kwargs["traffic"] = row["traffic"]
+        try:
+            response = api.create_campaign(row["name"], row["safe_url"], row["money_url"], **kwargs)
+        except Exception as e:
+            # One failed row (CircuitOpen, ConnectionError) must not drop the ids already created
+            with lock:
+                created[row["name"]] = False
+                errors[row["name"]] = f"{type(e).__name__}: {e}"
+            return
+        campaign_id = response.get("name") if isinstance(response, dict) else None
+        with lock:
+            created[row["name"]] = campaign_id if response else False
+
+    api._ensure_authenticated()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        list(pool.map(create, to_create.values()))
+
+    # Server replied without an id - resolve by name with one more list fetch
+    if any(cid is None for cid in created.values()):
+        try:
+            index.refresh(_existing_campaigns(api))
+        except Exception as e:
+            for name, cid in created.items():
+                if cid is None:
+                    errors[name] = f"created but id unknown ({type(e).__name__}: {e})"
+        for name, cid in created.items():
+            if cid is None:
+                found = index.query(info=name)
+                created[name] = found[0]["name"] if found else False
+
+    for result in results:
+        if result["result"] == "pending":
+            cid = created.get(result["name"])
+            result["campaign_id"] = cid or None
+            result["result"] = "created" if cid else "failed"
+            if result["name"] in errors:
+                result["error"] = errors[result["name"]]
+        elif result["result"] == "duplicate":
+            result["campaign_id"] = created.get(result["name"]) or None
+    return results
+
+
+def summarize(results: List[Dict]) -> Dict[str, int]:
+    summary = {}
+    for r in results:
+        summary[r["result"]] = summary.get(r["result"], 0) + 1
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-create campaigns from a CSV/JSON manifest")
+    parser.add_argument("manifest", help=".csv or .json manifest")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel create requests")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be created")
+    parser.add_argument("--out", help="write the row -> campaign id results as JSON")
+    args = parser.parse_args()
+
+    import os
+    client = load_script("6.noipfraud_complete_api.py")
+    base_url = os.environ.get("NOIPFRAUD_BASE_URL")
+    if not base_url:
+        print("❌ Set NOIPFRAUD_BASE_URL / NOIPFRAUD_USERNAME / NOIPFRAUD_PASSWORD")
+        sys.exit(2)
+    api = client.NoIPFraudAPI(base_url.rstrip("/"), os.environ.get("NOIPFRAUD_USERNAME", ""),
+                              os.environ.get("NOIPFRAUD_PASSWORD", ""), max_retries=2,
+                              pool_size=args.concurrency)
+
+    rows = load_manifest(args.manifest)
+    print(f"📄 {len(rows)} manifest rows from {args.manifest}")
+    try:
+        results = bulk_create(api, rows, args.concurrency, args.dry_run)
+    except RuntimeError as e:
+        print(f"❌ {e} - nothing created")
+        sys.exit(1)
+    for r in results:
+        icon = {"created": "✅", "exists": "⏭️ ", "duplicate": "🔁", "planned": "📝"}.get(r["result"], "❌")
+        error = f" - {r['error']}" if r.get("error") else ""
+        print(f"{icon} row {r['row']}: {r['name']} -> {r['campaign_id'] or '-'} ({r['result']}){error}")
+    print(f"\nSummary: {summarize(results)}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.out}")
+    sys.exit(1 if any(r["result"] == "failed" for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
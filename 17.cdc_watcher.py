@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Change-Data-Capture Watcher
+Polls get_campaigns for every tenant, keeps the last snapshot and emits typed
+events for what changed since the previous poll.
+
+Each campaign's settings are reduced to a content hash; only campaigns whose
+hash moved are diffed field by field. Click counters (total/block) are
+tracked separately so a busy campaign doesn't look "changed" on every poll.
+
+Events (one JSON object each):
+    campaign_added     new campaign id
+    campaign_removed   id no longer listed
+    status_changed     active: old -> new
+    url_changed        fakeurl / realurl: old -> new
+    config_changed     any other setting (fields listed)
+    block_rate_spike   block rate of the clicks since the last poll crossed --spike-rate
+
+    {"type": "status_changed", "tenant": "luxeattic", "campaign_id": "xmgbl4i3",
+     "campaign_name": "Launch-TH-01", "ts": "2025-10-31T12:00:00", "old": 1, "new": -1}
+
+The poll interval halves (down to --min-interval) after a poll with events
+and doubles (up to --max-interval) after an idle one.
+
+Run:
+    python 17.cdc_watcher.py --tenants tenants.json --out events.ndjson
+    python 17.cdc_watcher.py --webhook https://n8n.example.com/webhook/noipfraud
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from script_loader import load_script
+
+# Per-day counters returned by campaigns.php?a=list - not part of the content hash
+STATS_FIELDS = ("total", "block")
+URL_FIELDS = ("fakeurl", "realurl")
+
+
+def content_hash(campaign: Dict) -> str:
+    settings = {k: v for k, v in campaign.items() if k not in STATS_FIELDS}
+    return hashlib.blake2b(json.dumps(settings, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+# ==================== SINKS ====================
+
+class CallbackSink:
+    """Hand each batch of events to a Python callable"""
+
+    def __init__(self, callback: Callable[[List[Dict]], None]):
+        self.callback = callback
+
+    def __call__(self, events: List[Dict]):
+        self.callback(events)
+
+
+class NDJSONSink:
+    """Append events to a newline-delimited JSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, events: List[Dict]):
+        lines = "".join(json.dumps(e, default=str) + "\n" for e in events)
+        with self.lock, open(self.path, "a") as f:
+            f.write(lines)
+
+
+class WebhookSink:
+    """POST each batch as a JSON array (n8n Webhook node)"""
+
+    def __init__(self, url: str, timeout: float = 10.0, max_retries: int = 2):
+        import requests
+
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+
+    def __call__(self, events: List[Dict]):
+        import requests
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(self.url, json=events, timeout=self.timeout)
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    return
+            except requests.ConnectionError:
+                if attempt == self.max_retries:
+                    raise
+            time.sleep(0.5 * (2 ** attempt))
+        raise RuntimeError(f"Webhook {self.url} failed after {self.max_retries + 1} attempts")
+
+
+# ==================== WATCHER ====================
+
+class AdaptiveInterval:
+    """Poll interval that tightens while changes keep coming and relaxes when idle"""
+
+    def __init__(self, min_interval: float = 30.0, max_interval: float = 600.0, factor: float = 2.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.current = min_interval
+
+    def update(self, changed: bool) -> float:
+        if changed:
+            self.current = max(self.min_interval, self.current / self.factor)
+        else:
+            self.current = min(self.max_interval, self.current * self.factor)
+        return self.current
+
+
+class _TenantState:
+    def __init__(self):
+        self.date: Optional[str] = None
+        self.hashes: Dict[str, str] = {}
+        self.campaigns: Dict[str, Dict] = {}
+        # campaign id -> (total, block) at the previous poll
+        self.counters: Dict[str, tuple] = {}
+        self.spiking: set = set()
+
+
+class CDCWatcher:
+    """Per-tenant snapshots diffed into typed events"""
+
+    def __init__(self, clients: Dict, sinks: List[Callable] = (), spike_rate: float = 50.0,
+                 spike_min_clicks: int = 20, interval: AdaptiveInterval = None):
+        self.clients = clients
+        self.sinks = list(sinks)
+        self.spike_rate = spike_rate
+        self.spike_min_clicks = spike_min_clicks
+        self.interval = interval or AdaptiveInterval()
+        self.state: Dict[str, _TenantState] = {name: _TenantState() for name in clients}
+
+    def diff(self, tenant: str, campaigns: List[Dict], date: str = None) -> List[Dict]:
+        """Compare one tenant's new snapshot with the previous one and update the state"""
+        state = self.state.setdefault(tenant, _TenantState())
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        baseline = state.date is None
+        new_day = state.date != date
+        ts = datetime.now().isoformat(timespec="seconds")
+        events = []
+
+        def event(kind, campaign, **extra):
+            events.append({"type": kind, "tenant": tenant, "campaign_id": campaign["name"],
+                           "campaign_name": campaign.get("info"), "ts": ts, **extra})
+
+        hashes, seen = {}, {}
+        for campaign in campaigns:
+            cid = campaign["name"]
+            seen[cid] = campaign
+            digest = hashes[cid] = content_hash(campaign)
+            old_digest = state.hashes.get(cid)
+            if old_digest is None:
+                if not baseline:
+                    event("campaign_added", campaign, new=campaign)
+            elif old_digest != digest:
+                old = state.campaigns[cid]
+                changed = [k for k in campaign.keys() | old.keys()
+                           if k not in STATS_FIELDS and campaign.get(k) != old.get(k)]
+                if "active" in changed:
+                    event("status_changed", campaign, old=old.get("active"), new=campaign.get("active"))
+                for field in URL_FIELDS:
+                    if field in changed:
+                        event("url_changed", campaign, field=field, old=old.get(field), new=campaign.get(field))
+                rest = sorted(k for k in changed if k != "active" and k not in URL_FIELDS)
+                if rest:
+                    event("config_changed", campaign, fields=rest,
+                          old={k: old.get(k) for k in rest}, new={k: campaign.get(k) for k in rest})
+
+            # Counters are cumulative for the day; a new day starts a fresh baseline
+            total, block = campaign.get("total", 0) or 0, campaign.get("block", 0) or 0
+            previous = None if new_day else state.counters.get(cid)
+            if previous is not None and total >= previous[0]:
+                clicks, blocked = total - previous[0], block - previous[1]
+                rate = blocked / clicks * 100 if clicks else 0.0
+                if clicks >= self.spike_min_clicks and rate >= self.spike_rate:
+                    if cid not in state.spiking:
+                        state.spiking.add(cid)
+                        event("block_rate_spike", campaign, clicks=clicks, blocked=blocked,
+                              block_rate=round(rate, 2), threshold=self.spike_rate)
+                elif clicks >= self.spike_min_clicks:
+                    state.spiking.discard(cid)
+            state.counters[cid] = (total, block)
+
+        for cid in state.hashes.keys() - seen.keys():
+            event("campaign_removed", state.campaigns[cid])
+            state.counters.pop(cid, None)
+            state.spiking.discard(cid)
+
+        state.hashes = hashes
+        state.campaigns = seen
+        state.date = date
+        return events
+
+    def publish(self, events: List[Dict]):
+        for sink in self.sinks:
+            try:
+                sink(events)
+            except Exception as e:
+                print(f"❌ Sink {type(sink).__name__} failed: {e}")
+
+    def poll(self) -> List[Dict]:
+        """Fetch every tenant in parallel, diff and publish; returns the events"""
+        date = datetime.now().strftime("%Y-%m-%d")
+
+        def fetch(name):
+            # Spike alerts shouldn't wait behind a report job sharing the client
+            try:
+                with self.clients[name].priority("alert"):
+                    return name, self.clients[name].get_campaigns(date, date)
+            except Exception as e:
+                # One unreachable tenant (CircuitOpen, ConnectionError) skips its diff this round only
+                print(f"❌ {name}: poll failed - {type(e).__name__}: {e}")
+                return name, []
+
+        events = []
+        with ThreadPoolExecutor(max_workers=max(1, len(self.clients))) as pool:
+            for tenant, campaigns in pool.map(fetch, self.clients):
+                # An empty list is a failed fetch, not "everything was deleted"
+                if campaigns:
+                    events.extend(self.diff(tenant, campaigns, date))
+        if events:
+            self.publish(events)
+        return events
+
+    def run(self, once: bool = False):
+        while True:
+            start = time.monotonic()
+            events = self.poll()
+            delay = self.interval.update(bool(events))
+            stamp = datetime.now().strftime("%H:%M:%S")
+            counts = {}
+            for e in events:
+                counts[e["type"]] = counts.get(e["type"], 0) + 1
+            print(f"[{stamp}] {'🔔 ' + str(counts) if events else '✅ No changes'} "
+                  f"(next poll in {delay:.0f}s)")
+            if once:
+                return
+            time.sleep(max(0.0, delay - (time.monotonic() - start)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Campaign change-data-capture watcher")
+    parser.add_argument("--tenants", help="JSON tenants file (default: NOIPFRAUD_* env vars)")
+    parser.add_argument("--out", help="append events to this NDJSON file")
+    parser.add_argument("--webhook", help="POST event batches to this URL")
+    parser.add_argument("--min-interval", type=float, default=30.0)
+    parser.add_argument("--max-interval", type=float, default=600.0)
+    parser.add_argument("--spike-rate", type=float, default=50.0, help="block rate %% that counts as a spike")
+    parser.add_argument("--spike-min-clicks", type=int, default=20, help="ignore spikes on fewer new clicks")
+    parser.add_argument("--once", action="store_true", help="poll once (baseline only) and exit")
+    args = parser.parse_args()
+
+    client = load_script("6.noipfraud_complete_api.py")
+    tenants = load_script("12.daemon.py").load_tenants(args.tenants)
+    clients = {
+        name: client.NoIPFraudAPI(cfg["base_url"].rstrip("/"), cfg["username"], cfg["password"],
+                                  max_retries=2, tenant=name)
+        for name, cfg in tenants.items()
+    }
+
+    sinks = []
+    if args.out:
+        sinks.append(NDJSONSink(args.out))
+    if args.webhook:
+        sinks.append(WebhookSink(args.webhook))
+    if not sinks:
+        sinks.append(CallbackSink(lambda events: [print(json.dumps(e, default=str)) for e in events]))
+
+    watcher = CDCWatcher(clients, sinks, args.spike_rate, args.spike_min_clicks,
+                         AdaptiveInterval(args.min_interval, args.max_interval))
+
+    print("="*70)
+    print(f"noIPFraud CDC Watcher - {len(clients)} tenants, "
+          f"interval {args.min_interval:.0f}-{args.max_interval:.0f}s")
+    print("="*70)
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Circuit Breaker
+One breaker per admin API base_url, shared by every NoIPFraudAPI pointing at
+it. After `failure_threshold` consecutive failures (transport errors or 5xx)
+the circuit opens and calls fail immediately with CircuitOpen instead of
+waiting out timeouts. After `reset_timeout` seconds it goes half-open and lets
+`half_open_max` trial requests through; a success closes it again, a failure
+re-opens it.
+
+    closed --N failures--> open --reset_timeout--> half_open --success--> closed
+                            ^                          |
+                            +--------failure-----------+
+
+Usage:
+    api = NoIPFraudAPI(base_url, username, password, timeout=(5, 30), breaker_threshold=5)
+    api.circuit_status()      # {"state": "open", "failures": 5, "retry_in_s": 12.3, ...}
+"""
+
+import threading
+import time
+from typing import Dict
+
+import requests
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(requests.ConnectionError):
+    """Raised without touching the network while a breaker is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one base_url"""
+
+    def __init__(self, key: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max: int = 1):
+        self.key = key
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max = max(1, half_open_max)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trials = 0
+        self.opened_count = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Reserve a call; raises CircuitOpen while open or while half-open trials are in flight"""
+        with self.lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpen(f"Circuit open for {self.key} "
+                                      f"({self.failures} consecutive failures)")
+                self.state = HALF_OPEN
+                self.trials = 0
+            if self.state == HALF_OPEN:
+                if self.trials >= self.half_open_max:
+                    self.rejected += 1
+                    raise CircuitOpen(f"Circuit half-open for {self.key}, trial request in flight")
+                self.trials += 1
+
+    def release(self):
+        """Give back a reserved call that never got an answer for a local reason
+        (bad priority, KeyboardInterrupt) - counted neither as success nor failure"""
+        with self.lock:
+            if self.state == HALF_OPEN and self.trials:
+                self.trials -= 1
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.state = CLOSED
+            self.trials = 0
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened_count += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def status(self) -> Dict:
+        with self.lock:
+            retry_in = self.reset_timeout - (time.monotonic() - self.opened_at) if self.state == OPEN else 0
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "threshold": self.failure_threshold,
+                "retry_in_s": round(max(0.0, retry_in), 1),
+                "opened": self.opened_count,
+                "rejected": self.rejected,
+            }
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(base_url: str, **config) -> CircuitBreaker:
+    """Process-wide breaker for base_url (config only applies on first use)"""
+    key = base_url.rstrip("/")
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(key)
+        if breaker is None:
+            breaker = _BREAKERS[key] = CircuitBreaker(key, **config)
+        return breaker
+
+
+def all_status() -> Dict[str, Dict]:
+    with _BREAKERS_LOCK:
+        breakers = list(_BREAKERS.values())
+    return {b.key: b.status() for b in breakers}
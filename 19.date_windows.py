@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Date Windows
+Helpers for NoIPFraudAPI.get_campaigns(..., window_days=N): split a long
+from/to range into windows, merge the per-window campaign lists back into
+one, and keep the stats of windows that are entirely in the past.
+
+A past window's clicks can't change any more, so only its per-campaign
+click counters (STAT_FIELDS) are cached (in memory, plus on disk when a directory is
+given). Campaign settings always come from the newest window, which is
+fetched live on every call.
+
+Usage:
+    api.get_campaigns("2025-01-01", "2025-10-31", window_days=7, concurrency=8)
+    api.window_cache = WindowCache("~/.cache/noipfraud/windows")   # share across runs
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Per-range click counters - the only fields summed across windows. Everything
+# else (active, lptrack, device, maxrisk...) is a setting taken from the newest window.
+STAT_FIELDS = {"total", "block", "known"}
+
+
+def split_range(from_date: str, to_date: str, window_days: int) -> List[Tuple[str, str]]:
+    """Inclusive [from, to] windows of at most window_days days, oldest first"""
+    start = datetime.strptime(from_date, "%Y-%m-%d").date()
+    end = datetime.strptime(to_date, "%Y-%m-%d").date()
+    if end < start:
+        raise ValueError(f"to_date {to_date} is before from_date {from_date}")
+    step = timedelta(days=max(1, window_days))
+    windows = []
+    while start <= end:
+        stop = min(end, start + step - timedelta(days=1))
+        windows.append((start.isoformat(), stop.isoformat()))
+        start = stop + timedelta(days=1)
+    return windows
+
+
+def is_past(window: Tuple[str, str], today: date = None) -> bool:
+    return window[1] < (today or date.today()).isoformat()
+
+
+def stats_of(campaign: Dict) -> Dict[str, float]:
+    return {k: v for k, v in campaign.items()
+            if k in STAT_FIELDS and isinstance(v, (int, float)) and not isinstance(v, bool)}
+
+
+def merge(latest: List[Dict], older: List[Dict[str, Dict]]) -> List[Dict]:
+    """
+    Merge window results into the get_campaigns shape
+
+    Args:
+        latest: Full campaign list of the newest window (settings + stats)
+        older: {campaign id: stats} of every other window
+
+    Campaigns missing from the newest window no longer exist and are dropped.
+    """
+    merged = []
+    for campaign in latest:
+        row = dict(campaign)
+        for window in older:
+            for field, value in window.get(row["name"], {}).items():
+                if field not in STAT_FIELDS:
+                    # Stats cached on disk by older versions may still carry settings
+                    continue
+                current = row.get(field, 0)
+                row[field] = (current if isinstance(current, (int, float)) else 0) + value
+        merged.append(row)
+    return merged
+
+
+class WindowCache:
+    """LRU of past windows' stats, optionally persisted as one JSON file per window"""
+
+    def __init__(self, directory: str = None, max_entries: int = 512):
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: Tuple) -> str:
+        digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, base_url: str, window: Tuple[str, str]) -> Optional[Dict[str, Dict]]:
+        key = (base_url, *window)
+        with self.lock:
+            stats = self.entries.get(key)
+            if stats is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return stats
+        if self.directory:
+            try:
+                with open(self._path(key)) as f:
+                    stats = json.load(f)
+            except (OSError, ValueError):
+                stats = None
+            if stats is not None:
+                self._remember(key, stats)
+                with self.lock:
+                    self.hits += 1
+                return stats
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, base_url: str, window: Tuple[str, str], campaigns: List[Dict]) -> Dict[str, Dict]:
+        key = (base_url, *window)
+        stats = {c["name"]: stats_of(c) for c in campaigns}
+        self._remember(key, stats)
+        if self.directory:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".window-")
+            with os.fdopen(fd, "w") as f:
+                json.dump(stats, f)
+            os.replace(tmp, self._path(key))
+        return stats
+
+    def _remember(self, key: Tuple, stats: Dict):
+        with self.lock:
+            self.entries[key] = stats
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
@@ -8,6 +8,10 @@ import requests
 import json
 from datetime import datetime
 
+from script_loader import load_script
+
+profiling = load_script("11.profiling.py")
+
 
 # Configuration
 BASE_URL = "https://luxeattic.com/admin/api"
@@ -217,4 +221,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    profiling.run_main(main, __file__)
\ No newline at end of file
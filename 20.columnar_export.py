@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Columnar Export
+Writes campaign snapshots, block reports and get_campaign_stats daily rows
+as Hive-partitioned Parquet (or Arrow IPC) datasets:
+
+    <out>/campaigns/tenant=luxeattic/date=2025-10-31/part-0.parquet
+    <out>/block_report/tenant=luxeattic/date=2025-10-31/part-0.parquet
+    <out>/daily_stats/tenant=luxeattic/date=2025-10-31/part-0.parquet
+
+Columns are typed (int8 status, int64 counters, float64 rates) and repeated
+strings (traffic source, domain, flag, cv) are dictionary-encoded. Each
+(tenant, date) partition is one file: exporting a new day adds a directory,
+re-exporting a day replaces only that partition. A partition is only
+written from a complete fetch - if the list or any campaign's stats fail, the
+previous file stays and the error is reported.
+
+Requires: pip install pyarrow
+
+Load in pandas:
+    import pyarrow.dataset as ds
+    ds.dataset("warehouse/block_report", format="parquet", partitioning="hive").to_table().to_pandas()
+
+Run:
+    python 20.columnar_export.py --tenants tenants.json --out ./warehouse --from 2025-10-01 --to 2025-10-31
+    python 20.columnar_export.py --out ./warehouse --stats --format arrow     (today, env credentials)
+"""
+
+import argparse
+import os
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from urllib.parse import quote
+
+from script_loader import load_script
+
+campaign_index = load_script("15.campaign_index.py")
+
+# Column name -> type key (see _arrow_type); tenant and date live in the partition path
+SCHEMAS = {
+    "campaigns": [
+        ("campaign_id", "string"),
+        ("campaign_name", "string"),
+        ("status", "int8"),
+        ("traffic", "dict"),
+        ("fakeurl", "string"),
+        ("domain", "dict"),
+        ("countries", "list_string"),
+        ("money_urls", "int16"),
+        ("maxrisk", "int16"),
+        ("cv", "dict"),
+        ("total", "int64"),
+        ("block", "int64"),
+    ],
+    "block_report": [
+        ("campaign_id", "string"),
+        ("campaign_name", "string"),
+        ("total", "int64"),
+        ("blocked", "int64"),
+        ("allowed", "int64"),
+        ("block_rate", "float64"),
+        ("flag", "dict"),
+        ("status", "int8"),
+        ("traffic", "dict"),
+    ],
+    "daily_stats": [
+        ("campaign_id", "string"),
+        ("total", "int64"),
+        ("block", "int64"),
+    ],
+}
+
+FORMATS = {"parquet": "parquet", "arrow": "arrow"}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("pyarrow not installed - run: pip install pyarrow") from e
+    return pyarrow
+
+
+def _arrow_type(pa, key: str):
+    if key == "dict":
+        return pa.dictionary(pa.int32(), pa.string())
+    if key == "list_string":
+        return pa.list_(pa.string())
+    return {"string": pa.string(), "int8": pa.int8(), "int16": pa.int16(),
+            "int64": pa.int64(), "float64": pa.float64()}[key]
+
+
+def _coerce(key: str, value):
+    """API numbers may arrive as strings - convert to the column type instead of leaving it to the cast"""
+    if value is None or value == "":
+        return None
+    if key in ("int8", "int16", "int64"):
+        return int(value)
+    if key == "float64":
+        return float(value)
+    return value
+
+
+def schema(dataset: str):
+    pa = _pyarrow()
+    return pa.schema([(name, _arrow_type(pa, key)) for name, key in SCHEMAS[dataset]])
+
+
+# ==================== ROW SHAPING ====================
+
+def campaign_rows(campaigns: List[Dict]) -> List[Dict]:
+    return [{
+        "campaign_id": c["name"],
+        "campaign_name": c.get("info"),
+        "status": c.get("active"),
+        "traffic": c.get("traffic"),
+        "fakeurl": c.get("fakeurl"),
+        "domain": campaign_index.fakeurl_domain(c.get("fakeurl")),
+        "countries": campaign_index.campaign_countries(c),
+        "money_urls": len(c.get("realurl") or []),
+        "maxrisk": c.get("maxrisk"),
+        "cv": c.get("cv"),
+        "total": c.get("total", 0),
+        "block": c.get("block", 0),
+    } for c in campaigns]
+
+
+def daily_stats_rows(stats: Dict[str, List[Dict]]) -> List[Dict]:
+    """{campaign_id: get_campaign_stats rows} -> flat rows with campaign_id"""
+    return [{"campaign_id": cid, **row} for cid, rows in stats.items() for row in rows or []]
+
+
+# ==================== WRITING ====================
+
+def partition_dir(root: str, dataset: str, tenant: str, date: str) -> str:
+    return os.path.join(root, dataset, f"tenant={quote(tenant, safe='')}", f"date={date}")
+
+
+def write_partition(root: str, dataset: str, tenant: str, date: str, rows: List[Dict],
+                    fmt: str = "parquet") -> str:
+    """Write (or replace) one tenant/date partition; returns the file path"""
+    pa = _pyarrow()
+    columns = SCHEMAS[dataset]
+    records = []
+    for row in rows:
+        record = {}
+        for name, key in columns:
+            try:
+                record[name] = _coerce(key, row.get(name))
+            except (TypeError, ValueError):
+                raise ValueError(f"{dataset}.{name}: {row.get(name)!r} is not {key} "
+                                 f"(campaign {row.get('campaign_id')})") from None
+        records.append(record)
+    table = pa.Table.from_pylist(records, schema=schema(dataset))
+    directory = partition_dir(root, dataset, tenant, date)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-0.{FORMATS[fmt]}")
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".part-")
+    os.close(fd)
+    try:
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp, compression="zstd", use_dictionary=True)
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    # A partition holds exactly one file, also when the format changed
+    for name in os.listdir(directory):
+        if name.startswith("part-") and name != os.path.basename(path):
+            os.unlink(os.path.join(directory, name))
+    return path
+
+
+def write_rows(root: str, dataset: str, tenant: str, rows: List[Dict], fmt: str = "parquet",
+               date: str = None) -> List[str]:
+    """Group rows by their "date" field (or the given date) and write one partition per day"""
+    by_date = defaultdict(list)
+    for row in rows:
+        by_date[date or row["date"]].append(row)
+    return [write_partition(root, dataset, tenant, day, day_rows, fmt) for day, day_rows in sorted(by_date.items())]
+
+
+def read_dataset(root: str, dataset: str, fmt: str = "parquet"):
+    """Whole dataset as a pyarrow Table, with tenant/date columns from the paths"""
+    _pyarrow()
+    import pyarrow.dataset as ds
+    return ds.dataset(os.path.join(root, dataset), format="ipc" if fmt == "arrow" else fmt,
+                      partitioning="hive").to_table()
+
+
+def export_day(api, tenant: str, date: str, root: str, fmt: str = "parquet",
+               stats: bool = False, concurrency: int = 8) -> Tuple[List[str], List[str]]:
+    """
+    Snapshot + block report (+ per-campaign daily stats) for one tenant and day
+
+    Returns (written paths, errors). A dataset whose fetch failed is not
+    written, so an earlier complete partition is kept rather than replaced
+    by a partial one.
+    """
+    # requests errors are OSErrors, unparseable bodies ValueErrors
+    try:
+        campaigns = api.get_campaigns(date, date, strict=True)
+    except (OSError, ValueError) as e:
+        return [], [f"campaign list: {e}"]
+    if not campaigns:
+        return [], []
+    paths = [write_partition(root, "campaigns", tenant, date, campaign_rows(campaigns), fmt)]
+    # Same snapshot as the campaigns partition - get_block_report would list the day again
+    paths += write_rows(root, "block_report", tenant, api.block_report_rows(campaigns, date), fmt, date)
+    errors = []
+    if stats:
+        ids = [c["name"] for c in campaigns]
+        try:
+            per_campaign = api.get_all_campaign_stats(ids, date, date, concurrency)
+        except (OSError, ValueError) as e:
+            errors.append(f"daily_stats: {type(e).__name__}: {e}")
+        else:
+            missing = sorted(cid for cid, rows in per_campaign.items() if rows is None)
+            if missing:
+                errors.append(f"daily_stats: no stats for {len(missing)}/{len(ids)} campaigns "
+                              f"({', '.join(missing[:5])}{', ...' if len(missing) > 5 else ''}) - partition not written")
+            else:
+                paths += write_rows(root, "daily_stats", tenant, daily_stats_rows(per_campaign), fmt, date)
+    return paths, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export campaign/report history to partitioned Parquet/Arrow")
+    parser.add_argument("--out", required=True, help="dataset root directory")
+    parser.add_argument("--tenants", help="JSON tenants file (default: NOIPFRAUD_* env vars)")
+    parser.add_argument("--from", dest="from_date", help="YYYY-MM-DD (default today)")
+    parser.add_argument("--to", dest="to_date", help="YYYY-MM-DD (default --from)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--stats", action="store_true", help="also export get_campaign_stats daily rows")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    try:
+        _pyarrow()
+    except ImportError as e:
+        print(f"❌ {e}")
+        return
+
+    client = load_script("6.noipfraud_complete_api.py")
+    tenants = load_script("12.daemon.py").load_tenants(args.tenants)
+    start = datetime.strptime(args.from_date or datetime.now().strftime("%Y-%m-%d"), "%Y-%m-%d")
+    end = datetime.strptime(args.to_date, "%Y-%m-%d") if args.to_date else start
+    days = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((end - start).days + 1)]
+
+    print("="*70)
+    print(f"noIPFraud Columnar Export - {len(tenants)} tenants, {len(days)} days -> {args.out}")
+    print("="*70)
+    failed = 0
+    for name, cfg in tenants.items():
+        api = client.NoIPFraudAPI(cfg["base_url"].rstrip("/"), cfg["username"], cfg["password"],
+                                  max_retries=2, tenant=name, pool_size=args.concurrency)
+        for day in days:
+            paths, errors = export_day(api, name, day, args.out, args.format, args.stats, args.concurrency)
+            print(f"{'✅' if paths and not errors else '❌'} {name} {day}: {len(paths)} partitions")
+            for error in errors:
+                print(f"   ❌ {error}")
+            failed += bool(errors)
+    if failed:
+        print(f"\n❌ {failed} tenant-days incomplete")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Embed Templates
+Learns the PHP embed code template per (tenant, cv) from a few server samples
+and renders embed code locally for the remaining campaigns.
+
+Learning diffs the embed code of campaigns that differ in as many settings
+as possible; every differing span must be explained by one campaign field
+(e.g. the clid or maxrisk), otherwise the group falls back to the server.
+A sample of rendered codes is checked against getPhpEmbed on every run and
+a mismatch drops the template for that group.
+
+Usage:
+    codes = api.get_all_embed_codes(local=True)        # ~1 list + a few embeds per cv
+    renderer = EmbedRenderer(api, verify_rate=0.05)
+    renderer.embed_codes(ids, concurrency=8)
+"""
+
+import difflib
+import math
+import random
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Click counters are never part of the embed code
+SKIP_FIELDS = {"total", "block"}
+# Widening steps for a differing span: identifier chars, then anything up to a quote/space/delimiter
+BOUNDARIES = (re.compile(r"\w"), re.compile(r"""[^\s'"<>=;,()]"""))
+
+
+def _scalar_fields(campaign: Dict) -> Dict[str, str]:
+    return {k: str(v) for k, v in campaign.items()
+            if k not in SKIP_FIELDS and isinstance(v, (str, int, float)) and not isinstance(v, bool)}
+
+
+def _widen(text: str, start: int, end: int, pattern) -> Tuple[int, int]:
+    while start > 0 and pattern.match(text[start - 1]):
+        start -= 1
+    while end < len(text) and pattern.match(text[end]):
+        end += 1
+    return start, end
+
+
+class EmbedTemplate:
+    """Literal chunks and campaign-field placeholders"""
+
+    def __init__(self, parts: List[Tuple[bool, str]]):
+        # (is_field, literal text or field name)
+        self.parts = parts
+        self.fields = {value for is_field, value in parts if is_field}
+
+    def render(self, campaign: Dict) -> Optional[str]:
+        """Embed code for a campaign, or None if a needed field is missing"""
+        out = []
+        for is_field, value in self.parts:
+            if not is_field:
+                out.append(value)
+                continue
+            field = campaign.get(value)
+            if field is None or isinstance(field, bool):
+                return None
+            out.append(str(field))
+        return "".join(out)
+
+    @classmethod
+    def learn(cls, samples: List[Tuple[Dict, str]]) -> Optional["EmbedTemplate"]:
+        """
+        Build a template from (campaign, embed code) samples
+
+        Returns None when a difference between samples can't be attributed to
+        a campaign field, or when the template doesn't reproduce every sample.
+        """
+        if len(samples) < 2:
+            return None
+        base, base_code = samples[0]
+        base_fields = _scalar_fields(base)
+        spans: Dict[Tuple[int, int], str] = {}
+
+        for other, other_code in samples[1:]:
+            other_fields = _scalar_fields(other)
+            matcher = difflib.SequenceMatcher(None, base_code, other_code, autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag == "equal":
+                    continue
+                field = None
+                for pattern in BOUNDARIES:
+                    a1, a2 = _widen(base_code, i1, i2, pattern)
+                    b1, b2 = _widen(other_code, j1, j2, pattern)
+                    seg_a, seg_b = base_code[a1:a2], other_code[b1:b2]
+                    # Prefer the campaign id when several fields render the same
+                    for name in sorted(base_fields, key=lambda k: k != "name"):
+                        if base_fields[name] == seg_a and other_fields.get(name) == seg_b:
+                            field = name
+                            break
+                    if field:
+                        break
+                if field is None:
+                    return None
+                if spans.get((a1, a2), field) != field:
+                    return None
+                spans[(a1, a2)] = field
+
+        parts, pos = [], 0
+        for (start, end), field in sorted(spans.items()):
+            if start < pos:
+                return None  # overlapping spans
+            if start > pos:
+                parts.append((False, base_code[pos:start]))
+            parts.append((True, field))
+            pos = end
+        if pos < len(base_code):
+            parts.append((False, base_code[pos:]))
+
+        template = cls(parts)
+        if any(template.render(c) != code for c, code in samples):
+            return None
+        return template
+
+
+def pick_samples(campaigns: List[Dict], max_samples: int = 4) -> List[Dict]:
+    """Greedy pick of campaigns so each scalar field takes at least two values where possible"""
+    if not campaigns:
+        return []
+    chosen = [campaigns[0]]
+    seen = defaultdict(set)
+    for k, v in _scalar_fields(campaigns[0]).items():
+        seen[k].add(v)
+    candidates = campaigns[1:]
+    while len(chosen) < max_samples and candidates:
+        def gain(c):
+            return sum(1 for k, v in _scalar_fields(c).items() if len(seen[k]) < 2 and v not in seen[k])
+        best = max(candidates, key=gain)
+        if gain(best) == 0 and len(chosen) >= 2:
+            break
+        chosen.append(best)
+        candidates.remove(best)
+        for k, v in _scalar_fields(best).items():
+            seen[k].add(v)
+    return chosen
+
+
+class EmbedRenderer:
+    """Per-(tenant, cv) template cache with sampled server verification"""
+
+    def __init__(self, api, verify_rate: float = 0.01, max_samples: int = 4, seed: int = None):
+        self.api = api
+        self.verify_rate = verify_rate
+        self.max_samples = max_samples
+        self.rng = random.Random(seed)
+        self.templates: Dict[Tuple[str, str], Optional[EmbedTemplate]] = {}
+        self.stats = {"server": 0, "rendered": 0, "verified": 0, "mismatches": 0}
+
+    def _fetch(self, ids: List[str], concurrency: int) -> Dict[str, str]:
+        if not ids:
+            # get_all_embed_codes treats no ids as "every campaign"
+            return {}
+        self.stats["server"] += len(ids)
+        return self.api.get_all_embed_codes(ids, concurrency)
+
+    def _template(self, cv: str, group: List[Dict], codes: Dict[str, str], concurrency: int):
+        key = (self.api.tenant, cv)
+        if key in self.templates:
+            return self.templates[key]
+        samples = pick_samples(group, self.max_samples)
+        codes.update(self._fetch([c["name"] for c in samples], concurrency))
+        pairs = [(c, codes[c["name"]]) for c in samples if codes.get(c["name"])]
+        template = EmbedTemplate.learn(pairs) if len(pairs) == len(samples) else None
+        self.templates[key] = template
+        return template
+
+    def embed_codes(self, campaign_ids: List[str] = None, concurrency: int = 1) -> Dict[str, str]:
+        """Same result as get_all_embed_codes, rendered locally where a template is known"""
+        campaigns = {c["name"]: c for c in self.api.get_campaigns()}
+        ids = list(campaign_ids) if campaign_ids else list(campaigns)
+        codes: Dict[str, str] = {}
+
+        groups = defaultdict(list)
+        unknown = []
+        for cid in ids:
+            if cid in campaigns:
+                groups[campaigns[cid].get("cv")].append(campaigns[cid])
+            else:
+                unknown.append(cid)
+
+        server = list(unknown)
+        for cv, group in groups.items():
+            known = (self.api.tenant, cv) in self.templates
+            template = self._template(cv, group, codes, concurrency) if known or len(group) > 1 else None
+            if template is None:
+                server.extend(c["name"] for c in group if c["name"] not in codes)
+                continue
+            rendered = {}
+            for c in group:
+                if c["name"] in codes:
+                    continue
+                code = template.render(c)
+                if code is None:
+                    server.append(c["name"])
+                else:
+                    rendered[c["name"]] = code
+            if not rendered:
+                continue
+
+            check = self.rng.sample(sorted(rendered), min(len(rendered), math.ceil(len(rendered) * self.verify_rate)))
+            truth = self._fetch(check, concurrency)
+            self.stats["verified"] += len(check)
+            if any(truth[cid] != rendered[cid] for cid in check):
+                # Template went stale (e.g. server-side change) - trust the server for this
+                # group and learn again next time
+                self.stats["mismatches"] += 1
+                self.templates.pop((self.api.tenant, cv), None)
+                codes.update(truth)
+                server.extend(cid for cid in rendered if cid not in truth)
+                continue
+            self.stats["rendered"] += len(rendered) - len(check)
+            codes.update(rendered)
+            codes.update(truth)
+
+        if server:
+            codes.update(self._fetch(server, concurrency))
+        return {cid: codes.get(cid) for cid in ids}
+
+
+def main():
+    """Compare server-only vs learned-template embed generation against the mock server"""
+    import argparse
+    import time
+
+    from script_loader import load_script
+
+    parser = argparse.ArgumentParser(description="Embed template learning demo against the mock server")
+    parser.add_argument("--campaigns", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    client = load_script("6.noipfraud_complete_api.py")
+    mock = load_script("8.mock_server.py")
+
+    with mock.MockNoIPFraudServer(campaigns=args.campaigns) as server:
+        api = client.NoIPFraudAPI(server.base_url, server.username, server.password, pool_size=args.concurrency)
+        api.login()
+        for local in (False, True):
+            server.requests.clear()
+            start = time.perf_counter()
+            codes = api.get_all_embed_codes(concurrency=args.concurrency, local=local)
+            elapsed = time.perf_counter() - start
+            print(f"{'local ' if local else 'server'}: {len(codes)} embed codes in {elapsed:.2f}s, "
+                  f"{sum(server.requests.values())} requests")
+        baseline = api.get_all_embed_codes(concurrency=args.concurrency)
+        print(f"{'✅' if baseline == codes else '❌'} Rendered codes match the server")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Landing-Page Deploy over SFTP
+Uploads a local directory to one of the servers in 7.test_sftp_connection.py.
+
+- Several SFTP channels share one SSH connection and take files from a queue
+- Writes are pipelined (no round trip per 32 KB block) over a large window
+- --pack bundles files smaller than --pack-below into one tar.gz that is
+  extracted remotely, instead of one create/close round trip per file
+- Files go to <name>.<size>-<mtime>.part first and are renamed when
+  complete; an interrupted run resumes the .part from its current size, and
+  a changed local file gets a new .part instead of extending the old one.
+  Partials of older versions are deleted once the file is in place. Files
+  already on the server with the same size and mtime are skipped.
+
+Requires: pip install paramiko
+
+Run:
+    python 22.sftp_deploy.py luxeattic ./lp-th-01 /var/www/html/lp-th-01 --channels 4 --pack
+"""
+
+import argparse
+import hashlib
+import os
+import posixpath
+import queue
+import re
+import stat
+import tarfile
+import tempfile
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from script_loader import load_script
+
+sftp_check = load_script("7.test_sftp_connection.py")
+
+CHUNK = 32768                  # SFTP max write request size
+WINDOW_SIZE = 64 * 1024 * 1024  # lets pipelined writes stay in flight
+MAX_PACKET = 64 * 1024
+PART_SUFFIX = ".part"
+
+
+def scan(local_dir: str) -> List[Tuple[str, int, int]]:
+    """(relative posix path, size, mtime) for every file under local_dir"""
+    files = []
+    for root, _, names in os.walk(local_dir):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            rel = os.path.relpath(path, local_dir).replace(os.sep, "/")
+            files.append((rel, st.st_size, int(st.st_mtime)))
+    return files
+
+
+def _remote_stat(sftp, path: str):
+    try:
+        return sftp.stat(path)
+    except IOError:
+        return None
+
+
+def makedirs(sftp, remote_dir: str, known: set):
+    """mkdir -p over SFTP, remembering what already exists"""
+    missing = []
+    path = remote_dir
+    while path and path not in known and path != "/":
+        attrs = _remote_stat(sftp, path)
+        if attrs is not None:
+            if not stat.S_ISDIR(attrs.st_mode):
+                raise IOError(f"{path} exists and is not a directory")
+            break
+        missing.append(path)
+        path = posixpath.dirname(path)
+    for path in reversed(missing):
+        sftp.mkdir(path)
+    known.add(remote_dir)
+
+
+def _is_partial_of(entry: str, name: str) -> bool:
+    """entry is <name>.<size>-<mtime>.part (or a legacy <name>.part)"""
+    return re.fullmatch(re.escape(name) + r"(\.\d+-\d+)?" + re.escape(PART_SUFFIX), entry) is not None
+
+
+def partials(sftp, remote_dir: str) -> Dict[str, List[str]]:
+    """{file name: [its leftover .part names]} in one remote directory (one listdir)"""
+    try:
+        entries = sftp.listdir(remote_dir)
+    except IOError:
+        return {}
+    found: Dict[str, List[str]] = {}
+    for entry in entries:
+        if entry.endswith(PART_SUFFIX):
+            # <name>.<size>-<mtime>.part -> name; legacy <name>.part -> name
+            name = re.sub(r"(\.\d+-\d+)?" + re.escape(PART_SUFFIX) + "$", "", entry)
+            found.setdefault(name, []).append(entry)
+    return found
+
+
+def upload(sftp, local_path: str, remote_path: str, size: int, mtime: int, stale: List[str] = ()) -> Dict:
+    """
+    Pipelined, resumable upload of one file
+
+    Args:
+        stale: Leftover .part names next to remote_path (see partials());
+            the ones from other versions are removed after the rename
+
+    Returns:
+        {"status": "skipped" | "uploaded" | "resumed", "bytes": bytes sent}
+    """
+    done = _remote_stat(sftp, remote_path)
+    if done is not None and done.st_size == size and int(done.st_mtime) == mtime:
+        return {"status": "skipped", "bytes": 0}
+
+    # The partial is named after the source version so a changed file never resumes an old prefix
+    part = f"{remote_path}.{size}-{mtime}{PART_SUFFIX}"
+    partial = _remote_stat(sftp, part)
+    offset = partial.st_size if partial is not None and partial.st_size <= size else 0
+    remote = sftp.open(part, "r+b" if offset else "wb")
+    try:
+        remote.set_pipelined(True)
+        if offset:
+            remote.seek(offset)
+        with open(local_path, "rb") as f:
+            f.seek(offset)
+            while True:
+                chunk = f.read(CHUNK)
+                if not chunk:
+                    break
+                remote.write(chunk)
+    finally:
+        # Pipelined write errors surface here
+        remote.close()
+
+    if sftp.stat(part).st_size != size:
+        raise IOError(f"Size mismatch after upload: {remote_path}")
+    sftp.utime(part, (mtime, mtime))
+    try:
+        sftp.posix_rename(part, remote_path)
+    except IOError:
+        # Server without the posix-rename extension: plain rename won't overwrite
+        if _remote_stat(sftp, remote_path) is not None:
+            sftp.remove(remote_path)
+        sftp.rename(part, remote_path)
+    # Old-version partials would otherwise stay readable in the web root for good
+    directory, name = posixpath.split(remote_path)
+    for entry in stale:
+        if _is_partial_of(entry, name) and entry != posixpath.basename(part):
+            try:
+                sftp.remove(posixpath.join(directory, entry))
+            except IOError:
+                pass
+    return {"status": "resumed" if offset else "uploaded", "bytes": size - offset}
+
+
+def pack(local_dir: str, files: List[Tuple[str, int, int]]) -> str:
+    """tar.gz of the given files, named by their manifest so a rerun reuses it"""
+    manifest = "\n".join(f"{rel}\t{size}\t{mtime}" for rel, size, mtime in files)
+    digest = hashlib.sha256(manifest.encode()).hexdigest()[:16]
+    path = os.path.join(tempfile.gettempdir(), f"noipfraud-deploy-{digest}.tar.gz")
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        with tarfile.open(tmp, "w:gz") as tar:
+            for rel, _, _ in files:
+                tar.add(os.path.join(local_dir, rel), arcname=rel)
+        os.replace(tmp, path)
+    return path
+
+
+def _run(ssh, command: str) -> Tuple[int, str]:
+    _, stdout, stderr = ssh.exec_command(command)
+    code = stdout.channel.recv_exit_status()
+    return code, stderr.read().decode(errors="replace").strip()
+
+
+def _quote(path: str) -> str:
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
+def deploy(config: Dict, local_dir: str, remote_dir: str, channels: int = 4,
+           pack_small: bool = False, pack_below: int = 64 * 1024, verbose: bool = True) -> Dict:
+    """Upload local_dir to remote_dir on one server; returns a summary"""
+    import paramiko
+
+    start = time.perf_counter()
+    files = scan(local_dir)
+    remote_dir = remote_dir.rstrip("/") or "/"
+    summary = {"files": len(files), "uploaded": 0, "resumed": 0, "skipped": 0, "packed": 0,
+               "bytes": 0, "errors": {}}
+
+    ssh = sftp_check.connect(config)
+    transport = ssh.get_transport()
+    clients = [paramiko.SFTPClient.from_transport(transport, window_size=WINDOW_SIZE, max_packet_size=MAX_PACKET)
+               for _ in range(max(1, channels))]
+    try:
+        known_dirs: set = set()
+        makedirs(clients[0], remote_dir, known_dirs)
+
+        bundle = []
+        if pack_small:
+            small = [f for f in files if f[1] < pack_below]
+            # Only worth it for several files; skip ones already deployed
+            pending = []
+            for rel, size, mtime in small:
+                attrs = _remote_stat(clients[0], posixpath.join(remote_dir, rel))
+                if attrs is not None and attrs.st_size == size and int(attrs.st_mtime) == mtime:
+                    summary["skipped"] += 1
+                else:
+                    pending.append((rel, size, mtime))
+            if len(pending) > 1:
+                bundle = pending
+            small_set = {f[0] for f in small}
+            files = [f for f in files if f[0] not in small_set] + [f for f in pending if not bundle]
+
+        leftovers: Dict[str, Dict[str, List[str]]] = {remote_dir: partials(clients[0], remote_dir)}
+        for rel, _, _ in files:
+            directory = posixpath.dirname(posixpath.join(remote_dir, rel))
+            if directory not in known_dirs:
+                makedirs(clients[0], directory, known_dirs)
+            if directory not in leftovers:
+                leftovers[directory] = partials(clients[0], directory)
+
+        def stale(remote_path: str) -> List[str]:
+            directory, name = posixpath.split(remote_path)
+            return leftovers.get(directory, {}).get(name, [])
+
+        # (name, is_bundle, local path, remote path, size, mtime) - a flag rather than
+        # a reserved name, which a real file of that name would collide with
+        work = queue.Queue()
+        if bundle:
+            archive = pack(local_dir, bundle)
+            st = os.stat(archive)
+            remote_archive = posixpath.join(remote_dir, "." + os.path.basename(archive))
+            work.put((posixpath.basename(remote_archive), True, archive, remote_archive, st.st_size, int(st.st_mtime)))
+        # Largest first so one big file doesn't finish last on its own
+        for rel, size, mtime in sorted(files, key=lambda f: -f[1]):
+            work.put((rel, False, os.path.join(local_dir, rel), posixpath.join(remote_dir, rel), size, mtime))
+        lock = threading.Lock()
+
+        def worker(sftp):
+            while True:
+                try:
+                    name, is_bundle, local_path, remote_path, size, mtime = work.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    result = upload(sftp, local_path, remote_path, size, mtime, stale(remote_path))
+                except Exception as e:
+                    with lock:
+                        summary["errors"][name] = str(e)
+                    continue
+                if is_bundle:
+                    code, err = _run(ssh, f"tar -xzpf {_quote(remote_path)} -C {_quote(remote_dir)} "
+                                          f"&& rm -f {_quote(remote_path)}")
+                    with lock:
+                        if code:
+                            summary["errors"][f"{name} (extract)"] = err or f"tar exited {code}"
+                        else:
+                            summary["packed"] += len(bundle)
+                            summary["bytes"] += result["bytes"]
+                    continue
+                with lock:
+                    summary[result["status"]] += 1
+                    summary["bytes"] += result["bytes"]
+                if verbose and result["status"] != "skipped":
+                    print(f"   📤 {name} ({size:,} bytes, {result['status']})")
+
+        threads = [threading.Thread(target=worker, args=(c,), daemon=True) for c in clients]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        for c in clients:
+            c.close()
+        ssh.close()
+
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deploy a landing-page directory over SFTP")
+    parser.add_argument("server", choices=sorted(sftp_check.SERVERS))
+    parser.add_argument("local_dir")
+    parser.add_argument("remote_dir")
+    parser.add_argument("--channels", type=int, default=4, help="parallel SFTP channels")
+    parser.add_argument("--pack", action="store_true", help="send small files as one archive")
+    parser.add_argument("--pack-below", type=int, default=64 * 1024, help="size limit for packed files (bytes)")
+    args = parser.parse_args()
+
+    try:
+        import paramiko  # noqa: F401
+    except ImportError:
+        print("❌ paramiko not installed")
+        print("Run: pip install paramiko")
+        exit(1)
+
+    print("="*70)
+    print(f"Deploying {args.local_dir} -> {args.server}:{args.remote_dir}")
+    print("="*70)
+    summary = deploy(sftp_check.SERVERS[args.server], args.local_dir, args.remote_dir,
+                     args.channels, args.pack, args.pack_below)
+    mb = summary["bytes"] / 1024 / 1024
+    print(f"\n✅ {summary['uploaded']} uploaded, {summary['resumed']} resumed, {summary['packed']} packed, "
+          f"{summary['skipped']} unchanged - {mb:.1f} MB in {summary['seconds']}s")
+    for name, error in summary["errors"].items():
+        print(f"❌ {name}: {error}")
+    exit(1 if summary["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Access-Log Ingestion over SFTP
+Pulls only the new bytes of each server's nginx access log into a local
+SQLite store, using the SSH keys from 7.test_sftp_connection.py.
+
+Per (server, log path) the store keeps a checkpoint of the file's inode and
+the byte offset after the last complete line; rows and checkpoint commit in
+one transaction, so a crash never double-counts or skips lines.
+
+Rotation:
+    inode changed   finish the old file (now <path>.1) from the checkpoint,
+                    then read the new file from the start
+    file shrank     copytruncate - read from the start
+Data is read in pipelined batches and parsed line by line, so memory stays
+bounded whatever the log size.
+
+Requires: pip install paramiko
+
+Run:
+    python 23.log_ingest.py --db clicks.db                     (all servers, default log path)
+    python 23.log_ingest.py --db clicks.db luxeattic --path /var/log/nginx/lp_access.log
+"""
+
+import argparse
+import re
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from script_loader import load_script
+
+sftp_check = load_script("7.test_sftp_connection.py")
+
+DEFAULT_PATHS = ["/var/log/nginx/access.log"]
+READ_CHUNK = 32768            # one SFTP read request
+BATCH_BYTES = 4 * 1024 * 1024  # in flight per readv batch
+INSERT_BATCH = 5000
+
+# nginx "combined" format
+LINE = re.compile(
+    r'(?P<ip>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" '
+    r'(?P<status>\d{3}) (?P<bytes>\d+|-) "(?P<referer>[^"]*)" "(?P<ua>[^"]*)"'
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS access_log (
+    server TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    ip TEXT,
+    method TEXT,
+    path TEXT,
+    status INTEGER,
+    bytes INTEGER,
+    referer TEXT,
+    user_agent TEXT
+);
+CREATE INDEX IF NOT EXISTS access_log_ts ON access_log (server, ts);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    server TEXT NOT NULL,
+    path TEXT NOT NULL,
+    inode INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    updated TEXT NOT NULL,
+    PRIMARY KEY (server, path)
+);
+"""
+
+
+def parse_line(server: str, line: bytes) -> Optional[Tuple]:
+    match = LINE.match(line.decode("utf-8", errors="replace"))
+    if not match:
+        return None
+    try:
+        ts = datetime.strptime(match["time"], "%d/%b/%Y:%H:%M:%S %z").isoformat()
+    except ValueError:
+        return None
+    size = match["bytes"]
+    return (server, ts, match["ip"], match["method"], match["path"], int(match["status"]),
+            0 if size == "-" else int(size), match["referer"], match["ua"])
+
+
+def open_store(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def remote_stat(ssh, paths: List[str]) -> Dict[str, Tuple[int, int]]:
+    """{path: (inode, size)} in one round trip (SFTP attributes carry no inode)"""
+    quoted = " ".join("'" + p.replace("'", "'\\''") + "'" for p in paths)
+    _, stdout, _ = ssh.exec_command(f"stat -L -c '%i %s %n' {quoted} 2>/dev/null")
+    result = {}
+    for line in stdout.read().decode(errors="replace").splitlines():
+        inode, size, name = line.split(" ", 2)
+        result[name] = (int(inode), int(size))
+    return result
+
+
+def read_lines(sftp, path: str, start: int, end: int) -> Iterator[Tuple[bytes, int]]:
+    """
+    Complete lines in [start, end) with the offset just past each one
+
+    A trailing partial line is left for the next run.
+    """
+    pending = b""
+    position = start
+    with sftp.open(path, "rb") as f:
+        for batch in range(start, end, BATCH_BYTES):
+            stop = min(end, batch + BATCH_BYTES)
+            chunks = [(o, min(READ_CHUNK, stop - o)) for o in range(batch, stop, READ_CHUNK)]
+            # readv pipelines the requests instead of one round trip per chunk
+            for data in f.readv(chunks):
+                pending += data
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    position += len(line) + 1
+                    yield line, position
+
+
+class Ingester:
+    """Incremental tail of remote logs into a SQLite store"""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def checkpoint(self, server: str, path: str) -> Optional[Tuple[int, int]]:
+        row = self.db.execute("SELECT inode, offset FROM checkpoints WHERE server = ? AND path = ?",
+                              (server, path)).fetchone()
+        return tuple(row) if row else None
+
+    def _ingest_range(self, sftp, server: str, source: str, path: str, inode: int,
+                      start: int, end: int) -> Dict[str, int]:
+        """Stream one file range into the store, committing rows with the checkpoint"""
+        stats = {"lines": 0, "skipped": 0, "bytes": 0}
+        rows, offset = [], start
+
+        def flush():
+            self.db.executemany("INSERT INTO access_log VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            # The checkpoint names the inode being read: after a crash while finishing a
+            # rotated file the next run sees the rotation again and resumes from here
+            self.db.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+                            (server, path, inode, offset, datetime.now().isoformat(timespec="seconds")))
+            self.db.commit()
+            rows.clear()
+
+        for line, position in read_lines(sftp, source, start, end):
+            row = parse_line(server, line)
+            if row is None:
+                stats["skipped"] += 1
+            else:
+                rows.append(row)
+                stats["lines"] += 1
+            offset = position
+            if len(rows) >= INSERT_BATCH:
+                flush()
+        flush()
+        stats["bytes"] = offset - start
+        return stats
+
+    def ingest(self, ssh, sftp, server: str, path: str) -> Dict:
+        rotated = path + ".1"
+        current = remote_stat(ssh, [path, rotated])
+        if path not in current:
+            return {"path": path, "error": "not found"}
+        inode, size = current[path]
+        saved = self.checkpoint(server, path)
+        result = {"path": path, "lines": 0, "skipped": 0, "bytes": 0, "rotated": False, "lost": False}
+
+        def add(stats):
+            for key in ("lines", "skipped", "bytes"):
+                result[key] += stats[key]
+
+        start = 0
+        if saved is not None:
+            old_inode, old_offset = saved
+            if old_inode == inode:
+                # Same file; if it shrank it was truncated in place (copytruncate)
+                start = old_offset if size >= old_offset else 0
+            else:
+                result["rotated"] = True
+                old = current.get(rotated)
+                if old and old[0] == old_inode:
+                    # Finish the rotated file first
+                    add(self._ingest_range(sftp, server, rotated, path, old_inode, old_offset, old[1]))
+                else:
+                    # Rotated more than once (or compressed) since the last run
+                    result["lost"] = True
+        if size > start or saved is None or saved[0] != inode:
+            add(self._ingest_range(sftp, server, path, path, inode, start, size))
+        return result
+
+
+def ingest_server(db: sqlite3.Connection, name: str, config: Dict, paths: List[str]) -> List[Dict]:
+    ssh = sftp_check.connect(config)
+    try:
+        sftp = ssh.open_sftp()
+        ingester = Ingester(db)
+        return [ingester.ingest(ssh, sftp, name, path) for path in paths]
+    finally:
+        ssh.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental access-log ingestion over SFTP")
+    parser.add_argument("servers", nargs="*", metavar="SERVER", help="default: all in 7.test_sftp_connection.py")
+    parser.add_argument("--db", default="access_logs.db", help="SQLite store")
+    parser.add_argument("--path", action="append", help=f"remote log path (default {DEFAULT_PATHS[0]})")
+    parser.add_argument("--interval", type=float, help="keep running, polling every N seconds")
+    args = parser.parse_args()
+
+    try:
+        import paramiko  # noqa: F401
+    except ImportError:
+        print("❌ paramiko not installed")
+        print("Run: pip install paramiko")
+        exit(1)
+
+    names = args.servers or list(sftp_check.SERVERS)
+    db = open_store(args.db)
+    while True:
+        for name in names:
+            start = time.perf_counter()
+            try:
+                results = ingest_server(db, name, sftp_check.SERVERS[name], args.path or DEFAULT_PATHS)
+            except Exception as e:
+                print(f"❌ {name}: {e}")
+                continue
+            for r in results:
+                if "error" in r:
+                    print(f"❌ {name} {r['path']}: {r['error']}")
+                    continue
+                notes = " (rotated)" if r["rotated"] else ""
+                notes += " ⚠️  missed a rotation" if r["lost"] else ""
+                print(f"✅ {name} {r['path']}: {r['lines']} lines, {r['bytes'] / 1024:.0f} KB"
+                      f"{notes} ({time.perf_counter() - start:.2f}s)")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
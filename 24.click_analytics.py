@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Click Analytics
+Streams raw access-log clicks (the SQLite store from 23.log_ingest.py, or
+log files) and computes per-campaign, per-country and per-hour totals in
+bounded memory:
+
+    unique IPs        HyperLogLog (~1.6% error at the default precision)
+    top IPs / UAs     count-min sketch + top-K heavy hitters
+    repeat-IP rate    1 - unique / total
+
+Clicks are attributed to campaigns by host and request path: a hit on a
+campaign's fakeurl counts as blocked (the safe page), a hit on one of its
+realurls as allowed, and ?clid=<id> is honoured when present. Access logs in
+the combined format carry no Host, so the host of a server's clicks comes from
+--host SERVER=DOMAIN (--log-host for log files); without one a path is only
+attributed when a single campaign host uses it. Report rows use the
+get_block_report fields so they can be checked against the server.
+
+Memory: the count-min sketches are shared by all campaigns of a day (keys
+salted with the campaign), and unique-IP counters start sparse, so a
+campaign-day costs a few hundred bytes until it sees real traffic.
+
+Run:
+    python 24.click_analytics.py --db access_logs.db --date 2025-10-31 --compare --host luxeattic=luxeattic.com
+    python 24.click_analytics.py --log access.log --log access.log.1 --log-host luxeattic.com --geoip GeoLite2-Country.mmdb
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import sqlite3
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from script_loader import load_script
+
+log_ingest = load_script("23.log_ingest.py")
+
+UNKNOWN = "??"
+
+
+def hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+# User agents and campaign ids repeat heavily - don't rehash them on every click
+_agent_hash = lru_cache(maxsize=4096)(hash64)
+_campaign_salt = lru_cache(maxsize=65536)(hash64)
+
+
+def normalize_host(host: Optional[str]) -> Optional[str]:
+    host = (host or "").lower().rstrip(".")
+    return host[4:] if host.startswith("www.") else host or None
+
+
+# ==================== SKETCHES ====================
+
+class HyperLogLog:
+    """
+    Distinct counter in 2**precision bytes
+
+    Registers are kept sparse ({index: rank}) until that would outgrow the
+    dense array - most campaign-days only see a handful of IPs.
+    """
+
+    def __init__(self, precision: int = 12):
+        self.p = precision
+        self.m = 1 << precision
+        self.sparse: Optional[Dict[int, int]] = {}
+        self.registers: Optional[bytearray] = None
+        self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add_hash(self, h: int):
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if self.sparse is not None:
+            if rank > self.sparse.get(index, 0):
+                self.sparse[index] = rank
+                # A dict entry costs ~50 bytes against 1 per dense register
+                if len(self.sparse) > self.m // 64:
+                    self._densify()
+        elif rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def _densify(self):
+        self.registers = bytearray(self.m)
+        for index, rank in self.sparse.items():
+            self.registers[index] = rank
+        self.sparse = None
+
+    def merge(self, other: "HyperLogLog"):
+        if self.sparse is not None:
+            self._densify()
+        if other.sparse is not None:
+            for index, rank in other.sparse.items():
+                self.registers[index] = max(self.registers[index], rank)
+        else:
+            self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        if self.sparse is not None:
+            zeros = self.m - len(self.sparse)
+            harmonic = zeros + sum(2.0 ** -r for r in self.sparse.values())
+        else:
+            zeros = self.registers.count(0)
+            harmonic = sum(2.0 ** -r for r in self.registers)
+        estimate = self.alpha * self.m * self.m / harmonic
+        if estimate <= 2.5 * self.m and zeros:
+            # Small-range correction: linear counting
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class CountMinSketch:
+    """Frequency estimates (never under-counting) in depth x width counters"""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array("Q", bytes(8 * width)) for _ in range(depth)]
+
+    def _cells(self, h: int):
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add_hash(self, h: int, count: int = 1) -> int:
+        estimate = None
+        for row, cell in zip(self.rows, self._cells(h)):
+            row[cell] += count
+            estimate = row[cell] if estimate is None else min(estimate, row[cell])
+        return estimate
+
+
+class HeavyHitters:
+    """
+    Top-K items by count-min estimate
+
+    Several trackers can share one sketch as long as each salts its hashes
+    differently (see ClickAnalytics.add).
+    """
+
+    def __init__(self, k: int = 10, sketch: CountMinSketch = None):
+        self.k = k
+        self.sketch = sketch or CountMinSketch()
+        self.top: Dict[str, int] = {}
+
+    def add(self, item: str, h: int):
+        estimate = self.sketch.add_hash(h)
+        if item in self.top or len(self.top) < self.k:
+            self.top[item] = estimate
+            return
+        smallest = min(self.top, key=self.top.get)
+        if estimate > self.top[smallest]:
+            del self.top[smallest]
+            self.top[item] = estimate
+
+    def items(self) -> List[Tuple[str, int]]:
+        return heapq.nlargest(self.k, self.top.items(), key=lambda kv: kv[1])
+
+
+# ==================== ATTRIBUTION ====================
+
+class CampaignResolver:
+    """
+    (host, request path) -> (campaign id, blocked?) from a get_campaigns() snapshot
+
+    Different domains can use the same path, so URLs are keyed by host. With
+    host None (or a host no campaign uses) a path only resolves when exactly
+    one campaign host has it.
+    """
+
+    def __init__(self, campaigns: List[Dict]):
+        self.names = {c["name"]: c.get("info") for c in campaigns}
+        self.urls: Dict[Tuple[Optional[str], str], Tuple[str, bool]] = {}
+        for c in campaigns:
+            for entry in c.get("realurl") or []:
+                key = self._key(entry.get("url"))
+                if key:
+                    self.urls.setdefault(key, (c["name"], False))
+            key = self._key(c.get("fakeurl"))
+            if key:
+                self.urls[key] = (c["name"], True)
+        self.hosts = {host for host, _ in self.urls if host}
+        hosts_by_path: Dict[str, List[Tuple[str, bool]]] = defaultdict(list)
+        for (_, path), hit in self.urls.items():
+            hosts_by_path[path].append(hit)
+        self.unique_paths = {path: hits[0] for path, hits in hosts_by_path.items() if len(hits) == 1}
+        self.resolve = lru_cache(maxsize=65536)(self._resolve)
+
+    @staticmethod
+    def _key(url: Optional[str]) -> Optional[Tuple[Optional[str], str]]:
+        parsed = urlparse(url or "")
+        if not parsed.path or parsed.path == "/":
+            return None
+        return normalize_host(parsed.hostname), parsed.path
+
+    def _resolve(self, host: Optional[str], request_path: str) -> Optional[Tuple[str, bool]]:
+        parsed = urlparse(request_path)
+        host = normalize_host(host)
+        if host in self.hosts:
+            hit = self.urls.get((host, parsed.path))
+        else:
+            hit = self.unique_paths.get(parsed.path)
+        if "clid=" in parsed.query:
+            clid = parse_qs(parsed.query).get("clid", [None])[0]
+            if clid in self.names:
+                return clid, hit[1] if hit else False
+        return hit
+
+
+def country_lookup(mmdb_path: str = None):
+    """IP -> ISO country code via geoip2 when a database is given, else "??" """
+    if not mmdb_path:
+        return lambda ip: UNKNOWN
+    import geoip2.database
+    import geoip2.errors
+    reader = geoip2.database.Reader(mmdb_path)
+
+    @lru_cache(maxsize=262144)
+    def lookup(ip: str) -> str:
+        try:
+            return (reader.country(ip).country.iso_code or UNKNOWN).lower()
+        except (geoip2.errors.AddressNotFoundError, ValueError):
+            return UNKNOWN
+
+    return lookup
+
+
+# ==================== ENGINE ====================
+
+class _Day:
+    """Count-min sketches shared by every campaign of one day"""
+
+    def __init__(self, width: int, depth: int):
+        self.ip_counts = CountMinSketch(width, depth)
+        self.agent_counts = CountMinSketch(width, depth)
+
+
+class _CampaignDay:
+    def __init__(self, precision: int, k: int, day: _Day):
+        self.total = 0
+        self.blocked = 0
+        self.ips = HyperLogLog(precision)
+        self.top_ips = HeavyHitters(k, day.ip_counts)
+        self.top_agents = HeavyHitters(k, day.agent_counts)
+
+
+class ClickAnalytics:
+    """
+    Streaming aggregation; memory grows with campaigns x days, not with clicks
+
+    Per day: two width x depth x 8 byte sketches (1 MB at the defaults) for
+    all campaigns together. Per campaign-day: counters, top-K dicts and a
+    sparse HyperLogLog (dense 2**precision bytes once busy).
+    """
+
+    def __init__(self, resolver: CampaignResolver, country=None, precision: int = 12, top_k: int = 10,
+                 sketch_width: int = 1 << 15, sketch_depth: int = 4):
+        self.resolver = resolver
+        self.country = country or (lambda ip: UNKNOWN)
+        self.precision = precision
+        self.top_k = top_k
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self.sketches: Dict[str, _Day] = {}
+        self.days: Dict[Tuple[str, str], _CampaignDay] = {}
+        # (date, hour, campaign, country) -> [total, blocked]
+        self.hourly: Dict[Tuple[str, str, str, str], List[int]] = defaultdict(lambda: [0, 0])
+        self.unattributed = 0
+
+    def add(self, ts: str, ip: str, host: Optional[str], path: str, user_agent: str):
+        hit = self.resolver.resolve(host, path)
+        if hit is None:
+            self.unattributed += 1
+            return
+        campaign, blocked = hit
+        date, hour = ts[:10], ts[11:13]
+        day = self.days.get((date, campaign))
+        if day is None:
+            shared = self.sketches.get(date)
+            if shared is None:
+                shared = self.sketches[date] = _Day(self.sketch_width, self.sketch_depth)
+            day = self.days[(date, campaign)] = _CampaignDay(self.precision, self.top_k, shared)
+        day.total += 1
+        day.blocked += blocked
+        ip_hash = hash64(ip)
+        day.ips.add_hash(ip_hash)
+        # Salting with the campaign keeps its counts apart in the day's shared sketch
+        salt = _campaign_salt(campaign)
+        day.top_ips.add(ip, ip_hash ^ salt)
+        agent = user_agent or "-"
+        day.top_agents.add(agent, _agent_hash(agent) ^ salt)
+        counts = self.hourly[(date, hour, campaign, self.country(ip))]
+        counts[0] += 1
+        counts[1] += blocked
+
+    def consume(self, rows: Iterable[Tuple[str, str, Optional[str], str, str]]) -> int:
+        n = 0
+        add = self.add
+        for ts, ip, host, path, agent in rows:
+            add(ts, ip, host, path, agent)
+            n += 1
+        return n
+
+    def report(self, date: str = None) -> List[Dict]:
+        """get_block_report-shaped rows plus the sketch results"""
+        rows = []
+        for (day_date, campaign), day in sorted(self.days.items()):
+            if date and day_date != date:
+                continue
+            rate = day.blocked / day.total * 100 if day.total else 0
+            unique = min(day.ips.count(), day.total)
+            rows.append({
+                "campaign_id": campaign,
+                "campaign_name": self.resolver.names.get(campaign),
+                "date": day_date,
+                "total": day.total,
+                "blocked": day.blocked,
+                "allowed": day.total - day.blocked,
+                "block_rate": round(rate, 2),
+                "flag": "HIGH" if rate > 50 else "OK",
+                "unique_ips": unique,
+                "repeat_ip_rate": round((1 - unique / day.total) * 100, 2) if day.total else 0.0,
+                "top_ips": day.top_ips.items(),
+                "top_user_agents": day.top_agents.items(),
+            })
+        return rows
+
+    def hourly_rows(self, date: str = None) -> List[Dict]:
+        return [{"date": d, "hour": h, "campaign_id": c, "country": country, "total": t, "blocked": b}
+                for (d, h, c, country), (t, b) in sorted(self.hourly.items()) if not date or d == date]
+
+
+def cross_check(local: List[Dict], server: List[Dict], tolerance: float = 5.0) -> List[Dict]:
+    """Per campaign: local vs server block rate, flagged when they differ by more than tolerance points"""
+    remote = {r["campaign_id"]: r for r in server}
+    out = []
+    for row in local:
+        s = remote.get(row["campaign_id"])
+        if s is None:
+            continue
+        delta = row["block_rate"] - s["block_rate"]
+        out.append({"campaign_id": row["campaign_id"], "campaign_name": row["campaign_name"],
+                    "local_total": row["total"], "server_total": s["total"],
+                    "local_block_rate": row["block_rate"], "server_block_rate": s["block_rate"],
+                    "delta": round(delta, 2), "mismatch": abs(delta) > tolerance})
+    return out
+
+
+# ==================== SOURCES ====================
+
+def rows_from_db(path: str, date: str = None,
+                 server_hosts: Dict[str, str] = None) -> Iterator[Tuple[str, str, Optional[str], str, str]]:
+    """(ts, ip, host, path, user agent) rows; host from server_hosts by the row's server name"""
+    server_hosts = server_hosts or {}
+    db = sqlite3.connect(path)
+    if date:
+        # ISO timestamps: every "YYYY-MM-DDT..." of the day sorts before "YYYY-MM-DDU"
+        cursor = db.execute("SELECT ts, ip, server, path, user_agent FROM access_log WHERE ts >= ? AND ts < ?",
+                            (date, date + "U"))
+    else:
+        cursor = db.execute("SELECT ts, ip, server, path, user_agent FROM access_log")
+    # Cursor iteration fetches incrementally - the table is never loaded whole
+    for ts, ip, server, request_path, agent in cursor:
+        yield ts, ip, server_hosts.get(server), request_path, agent
+
+
+def rows_from_logs(paths: List[str], host: str = None) -> Iterator[Tuple[str, str, Optional[str], str, str]]:
+    for path in paths:
+        with open(path, "rb") as f:
+            for line in f:
+                row = log_ingest.parse_line("", line.rstrip(b"\n"))
+                if row is not None:
+                    yield row[1], row[2], host, row[4], row[8]
+
+
+def main():
+    import os
+    import time
+
+    parser = argparse.ArgumentParser(description="Streaming click analytics over raw access logs")
+    parser.add_argument("--db", help="SQLite store from 23.log_ingest.py")
+    parser.add_argument("--log", action="append", help="raw nginx access log file (repeatable)")
+    parser.add_argument("--date", help="only this day (YYYY-MM-DD)")
+    parser.add_argument("--host", action="append", default=[], metavar="SERVER=DOMAIN",
+                        help="domain served by a --db server, to tell apart campaigns sharing a path (repeatable)")
+    parser.add_argument("--log-host", metavar="DOMAIN", help="domain the --log files were written for")
+    parser.add_argument("--geoip", help="GeoLite2/GeoIP2 country .mmdb (needs: pip install geoip2)")
+    parser.add_argument("--top", type=int, default=10, help="top-K IPs / user agents")
+    parser.add_argument("--compare", action="store_true", help="cross-check block rates against the API")
+    parser.add_argument("--hourly", action="store_true", help="print per-hour/country rows too")
+    args = parser.parse_args()
+    if not args.db and not args.log:
+        parser.error("give --db or --log")
+    server_hosts = {}
+    for mapping in args.host:
+        server, sep, domain = mapping.partition("=")
+        if not sep or not server or not domain:
+            parser.error(f"--host takes SERVER=DOMAIN, got {mapping!r}")
+        server_hosts[server] = domain
+
+    client = load_script("6.noipfraud_complete_api.py")
+    base_url = os.environ.get("NOIPFRAUD_BASE_URL")
+    if not base_url:
+        print("❌ Set NOIPFRAUD_BASE_URL / NOIPFRAUD_USERNAME / NOIPFRAUD_PASSWORD (campaigns are needed to attribute clicks)")
+        exit(2)
+    api = client.NoIPFraudAPI(base_url.rstrip("/"), os.environ.get("NOIPFRAUD_USERNAME", ""),
+                              os.environ.get("NOIPFRAUD_PASSWORD", ""), max_retries=2)
+
+    engine = ClickAnalytics(CampaignResolver(api.get_campaigns(args.date)), country_lookup(args.geoip),
+                            top_k=args.top)
+    start = time.perf_counter()
+    rows = rows_from_db(args.db, args.date, server_hosts) if args.db else rows_from_logs(args.log, args.log_host)
+    n = engine.consume(rows)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {n:,} clicks in {elapsed:.1f}s ({n / max(elapsed, 1e-9):,.0f}/s), "
+          f"{engine.unattributed:,} not attributed to a campaign")
+
+    report = engine.report(args.date)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.hourly:
+        print(json.dumps(engine.hourly_rows(args.date), indent=2))
+    if args.compare:
+        dates = sorted({r["date"] for r in report})
+        for date in dates:
+            checks = cross_check([r for r in report if r["date"] == date], api.get_block_report(date))
+            bad = [c for c in checks if c["mismatch"]]
+            print(f"\n{'⚠️ ' if bad else '✅'} {date}: {len(checks)} campaigns compared, {len(bad)} differ")
+            for c in bad:
+                print(f"   {c['campaign_id']} {c['campaign_name']}: local {c['local_block_rate']}% "
+                      f"vs server {c['server_block_rate']}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Fleet Health Check
+Runs a set of checks on every server in 7.test_sftp_connection.py. Each host
+gets one SSH connection; its commands run at the same time on separate
+channels of that transport, and all hosts are checked concurrently, so a
+full fleet check costs about one round trip per host after the handshake.
+
+Checks (override with --check NAME, repeatable):
+    disk      df usage of / and the web root
+    load      1/5/15 minute load average and CPU count
+    nginx     systemctl is-active nginx
+    php_fpm   running php*-fpm units
+    webroot   sha256 over every file in the web root (detects drift between servers)
+
+Requires: pip install paramiko
+
+Run:
+    python 25.fleet_health.py
+    python 25.fleet_health.py luxeattic --check disk --check nginx --json
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from script_loader import load_script
+
+sftp_check = load_script("7.test_sftp_connection.py")
+
+DEFAULT_WEB_ROOT = "/var/www/html"
+
+
+def _parse_disk(out: str) -> Dict:
+    mounts = {}
+    for line in out.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) >= 6:
+            mounts[parts[5]] = {"used_pct": int(parts[4].rstrip("%")), "avail_kb": int(parts[3])}
+    return mounts
+
+
+def _parse_load(out: str) -> Dict:
+    load, cpus = out.split("\n", 1)
+    one, five, fifteen = (float(v) for v in load.split()[:3])
+    return {"1m": one, "5m": five, "15m": fifteen, "cpus": int(cpus.strip())}
+
+
+def _parse_units(out: str) -> Dict:
+    units = {}
+    for line in out.splitlines():
+        parts = line.split()
+        if len(parts) >= 4:
+            units[parts[0]] = parts[3]
+    return units
+
+
+def _quote(path: str) -> str:
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
+# name -> (command builder(config), parser(stdout), healthy(value))
+CHECKS: Dict[str, Tuple[Callable[[Dict], str], Callable[[str], object], Callable[[object], bool]]] = {
+    "disk": (lambda cfg: f"df -P / {_quote(cfg.get('web_root', DEFAULT_WEB_ROOT))}",
+             _parse_disk, lambda v: all(m["used_pct"] < 90 for m in v.values())),
+    "load": (lambda cfg: "cat /proc/loadavg; nproc",
+             _parse_load, lambda v: v["5m"] < 2 * v["cpus"]),
+    "nginx": (lambda cfg: "systemctl is-active nginx",
+              str.strip, lambda v: v == "active"),
+    "php_fpm": (lambda cfg: "systemctl list-units 'php*-fpm.service' --no-legend --plain --all",
+                _parse_units, lambda v: bool(v) and all(s == "running" for s in v.values())),
+    "webroot": (lambda cfg: f"cd {_quote(cfg.get('web_root', DEFAULT_WEB_ROOT))} && "
+                            "find . -type f -print0 | LC_ALL=C sort -z | xargs -0 -r sha256sum | sha256sum",
+                lambda out: out.split()[0], lambda v: bool(v)),
+}
+
+
+def run_on_channel(transport, command: str, timeout: float) -> Dict:
+    """One command on its own session channel"""
+    start = time.perf_counter()
+    channel = transport.open_session(timeout=timeout)
+    try:
+        channel.settimeout(timeout)
+        channel.exec_command(command)
+        stdout = channel.makefile("rb").read().decode(errors="replace")
+        stderr = channel.makefile_stderr("rb").read().decode(errors="replace")
+        code = channel.recv_exit_status()
+    finally:
+        channel.close()
+    return {"exit": code, "stdout": stdout, "stderr": stderr.strip(),
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+def check_host(config: Dict, checks: List[str], timeout: float = 30.0) -> Dict:
+    """All checks for one host, multiplexed over one SSH transport"""
+    start = time.perf_counter()
+    result = {"host": config["host"], "ok": False, "checks": {}}
+    try:
+        ssh = sftp_check.connect(config, timeout=timeout)
+    except Exception as e:
+        result.update(error=f"{type(e).__name__}: {e}", seconds=round(time.perf_counter() - start, 3))
+        return result
+    result["connect_s"] = round(time.perf_counter() - start, 3)
+    transport = ssh.get_transport()
+    lock = threading.Lock()
+
+    def run(check: str):
+        build, parse, healthy = CHECKS[check]
+        try:
+            out = run_on_channel(transport, build(config), timeout)
+            entry = {"exit": out["exit"], "seconds": out["seconds"]}
+            if out["exit"] == 0:
+                entry["value"] = parse(out["stdout"])
+                entry["ok"] = healthy(entry["value"])
+            else:
+                entry.update(ok=False, error=out["stderr"] or out["stdout"].strip())
+        except (socket.timeout, TimeoutError):
+            entry = {"ok": False, "error": f"timed out after {timeout}s"}
+        except Exception as e:
+            entry = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        with lock:
+            result["checks"][check] = entry
+
+    threads = [threading.Thread(target=run, args=(c,), daemon=True) for c in checks]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ssh.close()
+    result["ok"] = all(c["ok"] for c in result["checks"].values())
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def check_fleet(servers: Dict[str, Dict], checks: List[str] = None, timeout: float = 30.0) -> Dict[str, Dict]:
+    """Every host concurrently; {server name: host result}"""
+    checks = checks or list(CHECKS)
+    with ThreadPoolExecutor(max_workers=max(1, len(servers))) as pool:
+        futures = {name: pool.submit(check_host, cfg, checks, timeout) for name, cfg in servers.items()}
+        return {name: f.result() for name, f in futures.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent SSH health checks across the server fleet")
+    parser.add_argument("servers", nargs="*", metavar="SERVER", help="default: all in 7.test_sftp_connection.py")
+    parser.add_argument("--check", action="append", choices=sorted(CHECKS), help="default: all checks")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", action="store_true", help="print the raw JSON result")
+    args = parser.parse_args()
+
+    try:
+        import paramiko  # noqa: F401
+    except ImportError:
+        print("❌ paramiko not installed")
+        print("Run: pip install paramiko")
+        exit(1)
+
+    names = args.servers or list(sftp_check.SERVERS)
+    unknown = [n for n in names if n not in sftp_check.SERVERS]
+    if unknown:
+        print(f"❌ Unknown server(s): {', '.join(unknown)}")
+        exit(2)
+
+    start = time.perf_counter()
+    results = check_fleet({n: sftp_check.SERVERS[n] for n in names}, args.check, args.timeout)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        exit(0 if all(r["ok"] for r in results.values()) else 1)
+
+    print("="*70)
+    print(f"Fleet health - {len(results)} hosts in {time.perf_counter() - start:.2f}s")
+    print("="*70)
+    for name, r in results.items():
+        print(f"\n{'✅' if r['ok'] else '❌'} {name} ({r['host']}) {r['seconds']}s")
+        if "error" in r:
+            print(f"   {r['error']}")
+        for check, c in sorted(r["checks"].items()):
+            detail = c.get("value") if c["ok"] else c.get("error") or c.get("value")
+            print(f"   {'✅' if c['ok'] else '❌'} {check:<8} {c.get('seconds', '-')}s  {detail}")
+    exit(0 if all(r["ok"] for r in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+noIPFraud SSH Backends (blocking paramiko / asyncio asyncssh)
+The same probe/list/upload/exec operations on two backends:
+
+    ParamikoBackend   blocking; a fleet run needs one thread per host in flight
+    AsyncSSHBackend   asyncio; one event loop keeps hundreds of sessions open
+
+Both take SERVERS entries from 7.test_sftp_connection.py and return
+{server name: result} from run_fleet(); a per-host failure is reported in
+that host's result and never aborts the rest of the fleet.
+
+Requires: pip install paramiko        (blocking backend)
+          pip install asyncssh        (async backend)
+
+Run:
+    python 26.async_ssh.py exec "uptime" --backend asyncssh
+    python 26.async_ssh.py list /var/www/html luxeattic
+    python 26.async_ssh.py upload ./index.php /var/www/html/index.php
+    python 26.async_ssh.py bench --hosts 200 --concurrency 64 --server luxeattic     (fleet of 200 sessions to one host)
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from script_loader import load_script
+
+sftp_check = load_script("7.test_sftp_connection.py")
+
+OPERATIONS = ("probe", "list", "upload", "exec")
+
+
+def _timed(start: float, **result) -> Dict:
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+class ParamikoBackend:
+    """Blocking backend: one worker thread per host in flight"""
+
+    name = "paramiko"
+
+    def __init__(self, max_workers: int = 32, timeout: float = 10.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    def run(self, config: Dict, op: str, *args) -> Dict:
+        """One operation on one host over a fresh connection"""
+        start = time.perf_counter()
+        try:
+            ssh = sftp_check.connect(config, timeout=self.timeout)
+        except Exception as e:
+            return _timed(start, ok=False, error=f"{type(e).__name__}: {e}")
+        try:
+            if op == "probe":
+                return _timed(start, ok=ssh.get_transport().is_active())
+            if op == "exec":
+                _, stdout, stderr = ssh.exec_command(args[0], timeout=self.timeout)
+                out = stdout.read().decode(errors="replace")
+                code = stdout.channel.recv_exit_status()
+                return _timed(start, ok=code == 0, exit=code, stdout=out,
+                              stderr=stderr.read().decode(errors="replace").strip())
+            sftp = ssh.open_sftp()
+            if op == "list":
+                return _timed(start, ok=True, entries=sorted(sftp.listdir(args[0])))
+            if op == "upload":
+                attrs = sftp.put(args[0], args[1])
+                return _timed(start, ok=True, bytes=attrs.st_size)
+            raise ValueError(f"Unknown operation: {op}")
+        except Exception as e:
+            return _timed(start, ok=False, error=f"{type(e).__name__}: {e}")
+        finally:
+            ssh.close()
+
+    def run_fleet(self, servers: Dict[str, Dict], op: str, *args) -> Dict[str, Dict]:
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(servers)))) as pool:
+            futures = {name: pool.submit(self.run, cfg, op, *args) for name, cfg in servers.items()}
+            return {name: f.result() for name, f in futures.items()}
+
+
+class AsyncSSHBackend:
+    """asyncio backend: every session lives on one event loop, no thread per host"""
+
+    name = "asyncssh"
+
+    def __init__(self, concurrency: int = 500, timeout: float = 10.0):
+        import asyncssh  # noqa: F401  (fail at construction, not mid-fleet)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._keys: Dict[str, object] = {}
+
+    def _key(self, config: Dict):
+        import asyncssh
+        path = str(sftp_check.key_path(config))
+        # Parse each key file once, not once per session
+        if path not in self._keys:
+            self._keys[path] = asyncssh.read_private_key(path)
+        return self._keys[path]
+
+    async def run(self, config: Dict, op: str, *args) -> Dict:
+        import asyncssh
+        start = time.perf_counter()
+        try:
+            conn = await asyncio.wait_for(asyncssh.connect(
+                config["host"], port=config["port"], username=config["username"],
+                client_keys=[self._key(config)], known_hosts=None,
+                agent_path=None, config=None), self.timeout)
+        except Exception as e:
+            return _timed(start, ok=False, error=f"{type(e).__name__}: {e}")
+        try:
+            async with conn:
+                if op == "probe":
+                    return _timed(start, ok=True)
+                if op == "exec":
+                    done = await conn.run(args[0], check=False, timeout=self.timeout)
+                    return _timed(start, ok=done.exit_status == 0, exit=done.exit_status,
+                                  stdout=done.stdout, stderr=(done.stderr or "").strip())
+                async with conn.start_sftp_client() as sftp:
+                    if op == "list":
+                        return _timed(start, ok=True, entries=sorted(await sftp.listdir(args[0])))
+                    if op == "upload":
+                        await sftp.put(args[0], args[1])
+                        return _timed(start, ok=True, bytes=os.path.getsize(args[0]))
+                raise ValueError(f"Unknown operation: {op}")
+        except Exception as e:
+            return _timed(start, ok=False, error=f"{type(e).__name__}: {e}")
+
+    async def run_fleet_async(self, servers: Dict[str, Dict], op: str, *args) -> Dict[str, Dict]:
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def one(cfg):
+            async with limit:
+                return await self.run(cfg, op, *args)
+
+        results = await asyncio.gather(*(one(cfg) for cfg in servers.values()))
+        return dict(zip(servers, results))
+
+    def run_fleet(self, servers: Dict[str, Dict], op: str, *args) -> Dict[str, Dict]:
+        """Blocking entry point with the same signature as ParamikoBackend.run_fleet"""
+        return asyncio.run(self.run_fleet_async(servers, op, *args))
+
+
+BACKENDS = {"paramiko": ParamikoBackend, "asyncssh": AsyncSSHBackend}
+
+
+def get_backend(name: str, **kwargs):
+    return BACKENDS[name](**kwargs)
+
+
+def bench(config: Dict, hosts: int, op: str = "exec", args: tuple = ("true",),
+          backends: Optional[List[str]] = None, concurrency: int = 32, timeout: float = 10.0) -> List[Dict]:
+    """Run op on a simulated fleet of `hosts` sessions to one server, each backend at the same in-flight limit"""
+    fleet = {f"host-{i:04d}": config for i in range(hosts)}
+    rows = []
+    for name in backends or list(BACKENDS):
+        limit = {"max_workers": concurrency} if name == "paramiko" else {"concurrency": concurrency}
+        kwargs = {**limit, "timeout": timeout}
+        try:
+            backend = get_backend(name, **kwargs)
+        except ImportError:
+            rows.append({"backend": name, "error": f"{name} not installed"})
+            continue
+        peak = [threading.active_count()]
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(0.01):
+                peak[0] = max(peak[0], threading.active_count())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        results = backend.run_fleet(fleet, op, *args)
+        wall = time.perf_counter() - start
+        stop.set()
+        sampler.join()
+        latencies = sorted(r["seconds"] for r in results.values())
+        rows.append({
+            "backend": name,
+            "hosts": hosts,
+            "ok": sum(1 for r in results.values() if r["ok"]),
+            "wall_s": round(wall, 2),
+            "hosts_per_s": round(hosts / wall, 1),
+            "p50_s": round(statistics.median(latencies), 3),
+            "p95_s": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+            "peak_threads": peak[0] - 1,  # minus the sampler
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet SSH operations on a blocking or asyncio backend")
+    # Options go after the subcommand: 26.async_ssh.py exec "uptime" --backend asyncssh
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--timeout", type=float, default=10.0)
+    ops = argparse.ArgumentParser(add_help=False, parents=[common])
+    ops.add_argument("--backend", choices=sorted(BACKENDS), default="asyncssh")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("probe", parents=[ops], help="connect and authenticate")
+    p.add_argument("servers", nargs="*", metavar="SERVER")
+    p = sub.add_parser("list", parents=[ops], help="list a remote directory")
+    p.add_argument("path")
+    p.add_argument("servers", nargs="*", metavar="SERVER")
+    p = sub.add_parser("upload", parents=[ops], help="upload one file")
+    p.add_argument("local")
+    p.add_argument("remote")
+    p.add_argument("servers", nargs="*", metavar="SERVER")
+    p = sub.add_parser("exec", parents=[ops], help="run a shell command")
+    p.add_argument("cmd")
+    p.add_argument("servers", nargs="*", metavar="SERVER")
+    p = sub.add_parser("bench", parents=[common], help="compare backends on a simulated fleet")
+    p.add_argument("--server", choices=sorted(sftp_check.SERVERS), default=next(iter(sftp_check.SERVERS)))
+    p.add_argument("--hosts", type=int, default=100, help="sessions to open (all to --server)")
+    p.add_argument("--op", choices=["probe", "exec"], default="exec")
+    p.add_argument("--concurrency", type=int, default=32,
+                   help="sessions in flight, the same for both backends (paramiko threads / asyncssh semaphore)")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        print("="*70)
+        print(f"SSH backend benchmark - {args.hosts} sessions to {args.server}, op={args.op}, "
+              f"{args.concurrency} in flight")
+        print("="*70)
+        for row in bench(sftp_check.SERVERS[args.server], args.hosts, args.op, ("true",),
+                         concurrency=args.concurrency, timeout=args.timeout):
+            if "error" in row:
+                print(f"⚠️  {row['backend']:<9} skipped: {row['error']}")
+                continue
+            print(f"{row['backend']:<9} {row['ok']}/{row['hosts']} ok  {row['wall_s']}s wall  "
+                  f"{row['hosts_per_s']} hosts/s  p50 {row['p50_s']}s  p95 {row['p95_s']}s  "
+                  f"peak threads {row['peak_threads']}")
+        return
+
+    try:
+        backend = get_backend(args.backend, timeout=args.timeout)
+    except ImportError:
+        print(f"❌ {args.backend} not installed")
+        print(f"Run: pip install {args.backend}")
+        exit(1)
+
+    names = args.servers or list(sftp_check.SERVERS)
+    op_args = {"probe": (), "list": (getattr(args, "path", None),),
+               "upload": (getattr(args, "local", None), getattr(args, "remote", None)),
+               "exec": (getattr(args, "cmd", None),)}[args.command]
+    results = backend.run_fleet({n: sftp_check.SERVERS[n] for n in names}, args.command, *op_args)
+    for name, r in results.items():
+        print(f"{'✅' if r['ok'] else '❌'} {name} ({r['seconds']}s)")
+        if "error" in r:
+            print(f"   {r['error']}")
+        elif args.command == "list":
+            for entry in r["entries"]:
+                print(f"   📄 {entry}")
+        elif args.command == "upload":
+            print(f"   📤 {r['bytes']:,} bytes")
+        elif args.command == "exec":
+            for line in (r["stdout"] + r["stderr"]).splitlines():
+                print(f"   {line}")
+    exit(0 if all(r["ok"] for r in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+noIPFraud HTTP Cassettes (record / replay)
+Records real API exchanges to a JSON file once and replays them from disk,
+so the test scripts run offline, in milliseconds, without touching live
+campaigns.
+
+Interactions are matched on method, endpoint (login.php, campaigns.php) and
+the a= action; when several recordings share that key, the one with the
+same params and body wins, then recording order. A key replayed more times
+than it was recorded keeps returning its last response (polling loops).
+
+Scrubbed before anything is written: Authorization/Cookie headers, and
+password/token/username-style fields in params and JSON bodies (request and
+response). Token and password values are also replaced anywhere else they
+appear in the cassette.
+
+Modes:
+    record   always hit the network, then write the cassette
+    replay   never hit the network; an unrecorded request raises CassetteMiss
+    auto     replay if the cassette exists, else record
+
+Usage:
+    cassette = Cassette("cassettes/list.json", mode="auto")
+    api = NoIPFraudAPI(base_url, username, password, cassette=cassette)
+    ...
+    cassette.save()
+
+The committed cassettes/ were recorded against 8.mock_server.py, so the
+suite replays offline out of the box. To re-record them:
+    python 8.mock_server.py --port 8080 --campaigns 20 --username luxeattic --password <script password>
+    python 27.cassette.py suite --record --upstream http://127.0.0.1:8080
+
+Run:
+    python 27.cassette.py suite                 (replay every test script, offline)
+    python 27.cassette.py suite --record        (re-record against the live API)
+    python 27.cassette.py record cassettes/x.json 4.test_create_campaign.py --upstream http://127.0.0.1:8080
+"""
+
+import argparse
+import base64
+import builtins
+import contextlib
+import io
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from script_loader import SCRIPT_DIR
+
+MODES = ("record", "replay", "auto")
+SCRUBBED = "<SCRUBBED>"
+SECRET_HEADERS = {"authorization", "cookie", "set-cookie", "proxy-authorization", "x-api-key"}
+# Values of these keys are also replaced wherever else they appear
+SECRET_VALUE_KEYS = {"password", "passwd", "token", "access_token", "refresh_token", "api_key", "apikey", "secret"}
+SECRET_KEYS = SECRET_VALUE_KEYS | {"username", "user"}
+# Replayed bodies are stored decoded
+DROP_HEADERS = {"content-encoding", "transfer-encoding", "connection", "keep-alive"}
+
+SUITE = ["1.test_login.py", "2.test_api_step2.py", "3.noipfraud_api.py", "4.test_create_campaign.py",
+         "5.test_update_campaign.py", "6.noipfraud_complete_api.py"]
+DEFAULT_DIR = SCRIPT_DIR / "cassettes"
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Replay found no recording for a request"""
+
+
+def _endpoint(url: str) -> str:
+    return urlparse(url).path.rsplit("/", 1)[-1]
+
+
+def _scrub(value, secrets: set = None):
+    """Copy of a JSON-like value with secret fields replaced"""
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if str(key).lower() in SECRET_KEYS and item not in (None, ""):
+                if secrets is not None and str(key).lower() in SECRET_VALUE_KEYS and isinstance(item, str):
+                    secrets.add(item)
+                result[key] = SCRUBBED
+            else:
+                result[key] = _scrub(item, secrets)
+        return result
+    if isinstance(value, list):
+        return [_scrub(item, secrets) for item in value]
+    return value
+
+
+def _replace(value, secrets: List[str]):
+    if isinstance(value, str):
+        for secret in secrets:
+            value = value.replace(secret, SCRUBBED)
+        return value
+    if isinstance(value, dict):
+        return {k: _replace(v, secrets) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_replace(v, secrets) for v in value]
+    return value
+
+
+def _fingerprint(params: Dict, body) -> str:
+    rest = {k: v for k, v in (params or {}).items() if k != "a"}
+    return json.dumps({"params": _scrub(rest), "body": _scrub(body)}, sort_keys=True, default=str)
+
+
+class Cassette:
+    """One recorded session: HTTP interactions plus input() answers"""
+
+    def __init__(self, path, mode: str = "auto", upstream: str = None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        self.path = Path(path)
+        if mode == "auto":
+            mode = "replay" if self.path.exists() else "record"
+        self.mode = mode
+        # Record against another base URL (e.g. the mock server) than the one in the script
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.interactions: List[Dict] = []
+        self.inputs: List[str] = []
+        self._secrets: set = set()
+        self._used: set = set()
+        self._last: Dict[tuple, int] = {}
+        # Replay bookkeeping: requests answered and requests with no recording
+        self.replayed = 0
+        self.misses = 0
+        self._input_pos = 0
+        self._lock = threading.Lock()
+        if mode == "replay":
+            if not self.path.exists():
+                raise FileNotFoundError(f"No cassette at {self.path} - record it first")
+            data = json.loads(self.path.read_text())
+            self.interactions = data["interactions"]
+            self.inputs = data.get("inputs", [])
+            for interaction in self.interactions:
+                req = interaction["request"]
+                req["_fingerprint"] = _fingerprint(req.get("params"), req.get("body"))
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
+    def wrap(self, session) -> "CassetteSession":
+        return CassetteSession(self, session)
+
+    # ---- HTTP ----
+
+    def play(self, send: Callable, method: str, url: str, params: Dict = None, json=None,
+             data=None, headers: Dict = None, **kwargs):
+        """Record the exchange through send(), or answer it from the cassette"""
+        if "?" in url:
+            # The test scripts put a= in the URL itself
+            url, query = url.split("?", 1)
+            params = {**dict(parse_qsl(query)), **(params or {})}
+        if self.recording:
+            if self.upstream:
+                url = f"{self.upstream}/{_endpoint(url)}"
+            response = send(method, url, params=params, json=json, data=data, headers=headers, **kwargs)
+            self._add(method, url, params, json if json is not None else data, headers, response)
+            return response
+        return self._replay(method, url, params, json, data, headers)
+
+    def _add(self, method, url, params, body, headers, response):
+        content = response.content
+        try:
+            text, encoded = content.decode("utf-8"), None
+        except UnicodeDecodeError:
+            text, encoded = None, base64.b64encode(content).decode()
+        secrets: set = set()
+        if text:
+            try:
+                text = json.dumps(_scrub(json.loads(text), secrets), ensure_ascii=False)
+            except ValueError:
+                pass
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        request_headers = {}
+        for key, value in (headers or {}).items():
+            if key.lower() in SECRET_HEADERS:
+                token = str(value).split(" ", 1)[-1]
+                if len(token) >= 4 and token != "None":
+                    secrets.add(token)
+                value = SCRUBBED
+            request_headers[key] = value
+        interaction = {
+            "request": {"method": method.upper(), "endpoint": _endpoint(url), "action": (params or {}).get("a"),
+                        "url": url, "params": _scrub(params, secrets),
+                        "headers": request_headers, "body": _scrub(body, secrets)},
+            "response": {"status": response.status_code,
+                         "headers": {k: (SCRUBBED if k.lower() in SECRET_HEADERS else v)
+                                     for k, v in response.headers.items() if k.lower() not in DROP_HEADERS}},
+        }
+        interaction["response"]["body" if encoded is None else "body_b64"] = text if encoded is None else encoded
+        with self._lock:
+            self._secrets |= secrets
+            self.interactions.append(interaction)
+
+    def _find(self, method: str, endpoint: str, action, fingerprint: str) -> Optional[int]:
+        key = (method, endpoint, action)
+        fallback = None
+        for i, interaction in enumerate(self.interactions):
+            req = interaction["request"]
+            if (req["method"], req["endpoint"], req["action"]) != key or i in self._used:
+                continue
+            if req["_fingerprint"] == fingerprint:
+                return i
+            if fallback is None:
+                fallback = i
+        if fallback is None:
+            return self._last.get(key)
+        return fallback
+
+    def _replay(self, method, url, params, json_body, data, headers):
+        method = method.upper()
+        endpoint = _endpoint(url)
+        action = (params or {}).get("a")
+        with self._lock:
+            index = self._find(method, endpoint, action, _fingerprint(params, json_body if json_body is not None else data))
+            if index is None:
+                self.misses += 1
+                raise CassetteMiss(f"No recording for {method} {endpoint}?a={action} in {self.path}")
+            self.replayed += 1
+            self._used.add(index)
+            self._last[(method, endpoint, action)] = index
+        recorded = self.interactions[index]["response"]
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.reason = requests.status_codes._codes.get(recorded["status"], ("",))[0].upper()
+        if "body_b64" in recorded:
+            response._content = base64.b64decode(recorded["body_b64"])
+        else:
+            response._content = recorded["body"].encode("utf-8")
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        if "Content-Length" in response.headers:
+            response.headers["Content-Length"] = str(len(response._content))
+        response.encoding = "utf-8"
+        response.url = url
+        response.request = requests.Request(method, url, params=params, json=json_body, data=data,
+                                            headers=headers).prepare()
+        return response
+
+    def problems(self) -> List[str]:
+        """Why a run under this cassette can't count as passing ([] if it can)"""
+        if self.recording:
+            return [] if self.interactions else ["nothing recorded"]
+        found = []
+        if self.misses:
+            found.append(f"{self.misses} request(s) had no recording")
+        unused = len(self.interactions) - len(self._used)
+        if unused:
+            found.append(f"{unused} recorded interaction(s) never replayed")
+        if not self.replayed:
+            found.append("nothing replayed")
+        return found
+
+    # ---- input() ----
+
+    def input(self, prompt: str = "", original: Callable = builtins.input) -> str:
+        if self.recording:
+            answer = original(prompt)
+            self.inputs.append(answer)
+            return answer
+        print(prompt, end="")
+        answer = self.inputs[self._input_pos] if self._input_pos < len(self.inputs) else ""
+        self._input_pos += 1
+        print(answer)
+        return answer
+
+    def save(self):
+        """Write the cassette (record mode only), atomically"""
+        if not self.recording:
+            return
+        secrets = sorted((s for s in self._secrets if len(s) >= 4), key=len, reverse=True)
+        data = {"version": 1, "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "interactions": _replace(self.interactions, secrets), "inputs": self.inputs}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+        os.replace(tmp, self.path)
+
+
+class CassetteSession:
+    """requests.Session-compatible wrapper that records or replays through a Cassette"""
+
+    def __init__(self, cassette: Cassette, inner=None):
+        self.cassette = cassette
+        self.inner = inner
+
+    def request(self, method: str, url: str, **kwargs):
+        send = self.inner.request if self.inner is not None else None
+        if send is None and self.cassette.recording:
+            raise ValueError("Recording needs a real session to send through")
+        return self.cassette.play(send, method, url, **kwargs)
+
+    def close(self):
+        self.cassette.save()
+        if self.inner is not None and hasattr(self.inner, "close"):
+            self.inner.close()
+
+
+@contextlib.contextmanager
+def patch_requests(cassette: Cassette):
+    """Route every requests call (requests.get/post included) and input() through the cassette"""
+    original_request = requests.Session.request
+    original_input = builtins.input
+
+    def request(session, method, url, **kwargs):
+        def send(m, u, **kw):
+            return original_request(session, m, u, **kw)
+        return cassette.play(send, method, url, **kwargs)
+
+    requests.Session.request = request
+    builtins.input = lambda prompt="": cassette.input(prompt, original_input)
+    try:
+        yield cassette
+    finally:
+        requests.Session.request = original_request
+        builtins.input = original_input
+
+
+def run_script(script: str, cassette: Cassette, quiet: bool = False) -> Dict:
+    """
+    Run a numbered script under a cassette; {"ok", "error", "seconds", "output"}
+
+    The scripts catch their own request errors, so a clean exit isn't enough:
+    misses, unreplayed recordings or an empty run fail it too (Cassette.problems).
+    """
+    output = io.StringIO()
+    argv = sys.argv
+    sys.argv = [script]
+    start = time.perf_counter()
+    ok, error = True, None
+    try:
+        with patch_requests(cassette), contextlib.ExitStack() as stack:
+            if quiet:
+                stack.enter_context(contextlib.redirect_stdout(output))
+            try:
+                runpy.run_path(str(SCRIPT_DIR / script), run_name="__main__")
+            except SystemExit as e:
+                ok = e.code in (None, 0)
+    except Exception as e:
+        ok, error = False, f"{type(e).__name__}: {e}"
+    finally:
+        sys.argv = argv
+        cassette.save()
+    problems = cassette.problems()
+    if problems:
+        ok = False
+        error = "; ".join(([error] if error else []) + problems)
+    return {"ok": ok, "error": error, "seconds": time.perf_counter() - start, "output": output.getvalue()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/replay HTTP cassettes for the test scripts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("suite", help="run every test script under its cassette")
+    p.add_argument("--dir", default=str(DEFAULT_DIR))
+    p.add_argument("--record", action="store_true", help="re-record against the network")
+    p.add_argument("--upstream", help="record against this base URL instead of the scripts' own")
+    p.add_argument("--verbose", action="store_true", help="show script output")
+    for mode in ("record", "replay"):
+        p = sub.add_parser(mode, help=f"{mode} one script")
+        p.add_argument("cassette")
+        p.add_argument("script")
+        p.add_argument("--upstream", help="record against this base URL instead of the script's own")
+    args = parser.parse_args()
+
+    if args.command in ("record", "replay"):
+        cassette = Cassette(args.cassette, mode=args.command, upstream=getattr(args, "upstream", None))
+        result = run_script(args.script, cassette)
+        print(f"\n{'✅' if result['ok'] else '❌'} {args.script} {args.command}ed in {result['seconds'] * 1000:.0f} ms "
+              f"({len(cassette.interactions)} interactions)")
+        if result["error"]:
+            print(f"   {result['error']}")
+        exit(0 if result["ok"] else 1)
+
+    print("="*70)
+    print(f"Cassette suite ({'record' if args.record else 'replay'}) - {args.dir}")
+    print("="*70)
+    total = time.perf_counter()
+    failed = ran = 0
+    for script in SUITE:
+        path = Path(args.dir) / (Path(script).stem + ".json")
+        if not args.record and not path.exists():
+            print(f"⚠️  {script}: no cassette (run with --record)")
+            continue
+        cassette = Cassette(path, mode="record" if args.record else "replay", upstream=args.upstream)
+        result = run_script(script, cassette, quiet=not args.verbose)
+        ran += 1
+        failed += not result["ok"]
+        print(f"{'✅' if result['ok'] else '❌'} {script:<28} {result['seconds'] * 1000:7.1f} ms  "
+              f"{len(cassette.interactions)} interactions")
+        if result["error"]:
+            print(f"   {result['error']}")
+    print(f"\n{ran - failed}/{ran} passed in {(time.perf_counter() - total) * 1000:.0f} ms")
+    exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
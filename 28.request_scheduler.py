@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Request Scheduler
+Bounds a client's in-flight requests and hands free slots out by priority
+class, so an urgent change_status(..., -1) doesn't queue behind hundreds of
+report reads on the same client.
+
+Classes, highest first:
+    interactive   writes: create, update, changeStatus, login
+    alert         monitoring that must stay fresh (set with api.priority("alert"))
+    background    everything else: list, stats, embed reads
+
+Each class is guaranteed a share of the slots: a waiting class below its
+share is served before anything else, so background work keeps moving
+under a flood of writes. Idle shares are lent to whoever is waiting, and a
+class may not borrow a slot that a waiting class below its share is owed.
+
+Usage:
+    api = NoIPFraudAPI(base_url, username, password, pool_size=10)   # 10 slots
+    with api.priority("alert"):
+        api.get_campaigns()
+    api.scheduler.status()
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+PRIORITIES = ("interactive", "alert", "background")
+DEFAULT_SHARES = {"interactive": 0.5, "alert": 0.25, "background": 0.25}
+WRITE_ACTIONS = {"auth", "create", "update", "changeStatus"}
+
+
+def classify(method: str, action: Optional[str]) -> str:
+    """Default class of a request: writes are interactive, reads background"""
+    if action in WRITE_ACTIONS or method.upper() not in ("GET", "HEAD"):
+        return "interactive"
+    return "background"
+
+
+class RequestScheduler:
+    """Priority-aware semaphore with a guaranteed share of slots per class"""
+
+    def __init__(self, slots: int, shares: Dict[str, float] = None, metrics=None, tenant: str = None):
+        if slots < 1:
+            raise ValueError("slots must be >= 1")
+        shares = shares or DEFAULT_SHARES
+        unknown = set(shares) - set(PRIORITIES)
+        if unknown:
+            raise ValueError(f"Unknown priority class(es): {', '.join(sorted(unknown))}")
+        self.slots = slots
+        # Reserve in priority order so small slot counts still favour interactive
+        self.reserved = {}
+        left = slots
+        for p in PRIORITIES:
+            want = max(1, int(slots * shares[p])) if shares.get(p) else 0
+            self.reserved[p] = min(want, left)
+            left -= self.reserved[p]
+        self.metrics = metrics
+        self.tenant = tenant
+        self.running = {p: 0 for p in PRIORITIES}
+        self.waiting = {p: deque() for p in PRIORITIES}
+        self.cond = threading.Condition()
+
+    def _total(self) -> int:
+        return sum(self.running.values())
+
+    def _can_borrow(self, priority: str) -> bool:
+        owed = sum(max(0, self.reserved[p] - self.running[p])
+                   for p in PRIORITIES if p != priority and self.waiting[p])
+        return self._total() + owed < self.slots
+
+    def _next(self) -> Optional[str]:
+        """Class whose head waiter gets the next free slot"""
+        if self._total() >= self.slots:
+            return None
+        for p in PRIORITIES:
+            if self.waiting[p] and self.running[p] < self.reserved[p]:
+                return p
+        for p in PRIORITIES:
+            if self.waiting[p] and self._can_borrow(p):
+                return p
+        return None
+
+    def _depth(self, priority: str):
+        if self.metrics is not None:
+            self.metrics.queue_depth(self.tenant, priority, len(self.waiting[priority]))
+
+    def acquire(self, priority: str) -> float:
+        """Block until a slot is free for this class; returns seconds waited"""
+        if priority not in self.running:
+            raise ValueError(f"Unknown priority class: {priority}")
+        ticket = object()
+        start = time.perf_counter()
+        with self.cond:
+            queue = self.waiting[priority]
+            queue.append(ticket)
+            self._depth(priority)
+            try:
+                while not (queue[0] is ticket and self._next() == priority):
+                    self.cond.wait()
+            except BaseException:
+                queue.remove(ticket)
+                self._depth(priority)
+                self.cond.notify_all()
+                raise
+            queue.popleft()
+            self.running[priority] += 1
+            self._depth(priority)
+            # The next waiter in line may fit too
+            self.cond.notify_all()
+        waited = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.queue_wait(self.tenant, priority, waited)
+        return waited
+
+    def release(self, priority: str):
+        with self.cond:
+            self.running[priority] -= 1
+            self.cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: str):
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def status(self) -> Dict[str, Dict]:
+        with self.cond:
+            return {p: {"running": self.running[p], "waiting": len(self.waiting[p]),
+                        "reserved": self.reserved[p]} for p in PRIORITIES}
+
+
+def main():
+    """Demo: a Block All issued during a large embed fan-out, with and without priorities"""
+    import argparse
+
+    from script_loader import load_script
+
+    parser = argparse.ArgumentParser(description="Urgent write latency behind a background fan-out")
+    parser.add_argument("--campaigns", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32, help="background fan-out workers")
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    client = load_script("6.noipfraud_complete_api.py")
+    mock = load_script("8.mock_server.py")
+
+    print("="*70)
+    print(f"Block All latency during a {args.campaigns}-request background fan-out ({args.slots} slots)")
+    print("="*70)
+    with mock.MockNoIPFraudServer(campaigns=args.campaigns, latency=args.latency) as server:
+        for label, urgent_class in (("FIFO (one class)", "background"), ("priority classes", None)):
+            api = client.NoIPFraudAPI(server.base_url, server.username, server.password,
+                                      pool_size=args.slots, breaker_threshold=0)
+            api.login()
+            ids = [c["name"] for c in api.get_campaigns()]
+            fan_out = threading.Thread(target=api.get_all_embed_codes, args=(ids, args.concurrency))
+            fan_out.start()
+            time.sleep(0.2)
+            start = time.perf_counter()
+            # FIFO: the write joins the same queue as the fan-out
+            with api.priority(urgent_class):
+                api.change_status(ids[0], -1)
+            urgent = time.perf_counter() - start
+            fan_out.join()
+            print(f"{label:<18} Block All answered in {urgent * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
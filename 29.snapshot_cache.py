@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Shared Campaign Snapshot Cache
+One campaigns.php?a=list snapshot per (base URL, date range), shared by every
+process on the machine through a SQLite file in WAL mode: n8n workers, cron
+runs of noipfraud.py and the daemon all read the same copy instead of each
+downloading and parsing their own.
+
+- Each snapshot carries a version counter; a process keeps its own copy
+  and re-reads the body only when the version changes. Every caller gets a
+  separate list, so mutating a result never changes what others see
+- WAL: readers never block the writer and see the last committed snapshot
+- When a snapshot goes stale one process takes a lease and refreshes it;
+  the others keep serving the stale copy (up to max_stale) or wait for the
+  new version instead of all hitting the API at once
+- Writes through the client (status/update/create) invalidate the base URL's
+  snapshots for every process; a refresh that was already in flight when the
+  write landed is returned to its caller but not stored
+- Each write prunes the file: invalidated snapshots, ranges nobody refreshed
+  within `retention`, and the oldest ones beyond `max_bytes`
+
+Usage:
+    cache = SharedSnapshotCache("~/.cache/noipfraud/snapshots.db", ttl=30)
+    api = NoIPFraudAPI(base_url, username, password, snapshot_cache=cache)
+    api.get_campaigns()          # shared with every other process using the file
+
+Run:
+    python 29.snapshot_cache.py --processes 8 --seconds 5      (demo against the mock server)
+"""
+
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    base_url TEXT NOT NULL,
+    from_date TEXT NOT NULL,
+    to_date TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (base_url, from_date, to_date)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    base_url TEXT NOT NULL,
+    from_date TEXT NOT NULL,
+    to_date TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (base_url, from_date, to_date)
+);
+CREATE TABLE IF NOT EXISTS generations (
+    base_url TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+"""
+
+POLL_INTERVAL = 0.05
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+class SharedSnapshotCache:
+    """Cross-process snapshot store with a single refresher per key"""
+
+    def __init__(self, path: str, ttl: float = 30.0, max_stale: float = 300.0,
+                 lease: float = 60.0, wait: float = 30.0, retention: float = 3600.0,
+                 max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            ttl: Seconds a snapshot is served without refreshing
+            max_stale: While another process refreshes, serve a snapshot up to
+                this old rather than wait for the new one
+            lease: Seconds before a crashed refresher's lease can be taken over
+            wait: Longest wait for another process's refresh before fetching directly
+            retention: Snapshots not refreshed for this long are deleted on the next write
+            max_bytes: Compressed size kept in the file; the least recently
+                refreshed snapshots beyond it are deleted
+        """
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.lease = lease
+        self.wait = wait
+        self.retention = max(retention, max_stale)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        # key -> (version, pickled campaigns) in this process; unpickling is
+        # the cheapest way to hand each caller its own copy
+        self._parsed: Dict[Tuple, Tuple[int, bytes]] = {}
+        self._parsed_lock = threading.Lock()
+        self.stats = {"hits": 0, "stale": 0, "refreshes": 0, "waits": 0}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._db().executescript(SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections aren't shared across threads)"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self._local.db = db
+        return db
+
+    def _owner(self) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+    def _count(self, stat: str):
+        with self._parsed_lock:
+            self.stats[stat] += 1
+
+    # ---- snapshots ----
+
+    def read(self, key: Tuple[str, str, str]) -> Optional[Tuple[int, float, List[Dict]]]:
+        """(version, fetched unix time, a copy of the campaigns) or None"""
+        db = self._db()
+        row = db.execute("SELECT version, fetched FROM snapshots WHERE base_url = ? AND from_date = ? "
+                         "AND to_date = ?", key).fetchone()
+        if row is None:
+            with self._parsed_lock:
+                self._parsed.pop(key, None)
+            return None
+        version, fetched = row
+        with self._parsed_lock:
+            parsed = self._parsed.get(key)
+        if parsed is None or parsed[0] != version:
+            body = db.execute("SELECT version, body FROM snapshots WHERE base_url = ? AND from_date = ? "
+                              "AND to_date = ?", key).fetchone()
+            if body is None:
+                return None
+            version = body[0]
+            parsed = (version, pickle.dumps(json.loads(zlib.decompress(body[1])), pickle.HIGHEST_PROTOCOL))
+            with self._parsed_lock:
+                self._parsed[key] = parsed
+        return version, fetched, pickle.loads(parsed[1])
+
+    def generation(self, base_url: str) -> int:
+        """Invalidation counter of base_url; bumped by every invalidate()"""
+        row = self._db().execute("SELECT generation FROM generations WHERE base_url = ?", (base_url,)).fetchone()
+        return row[0] if row else 0
+
+    def put(self, key: Tuple[str, str, str], campaigns: List[Dict], generation: int = None) -> Optional[int]:
+        """
+        Store a new snapshot; returns its version
+
+        With generation (read before the fetch), nothing is stored and None is
+        returned if the base URL was invalidated since: the fetch may predate the write.
+        """
+        body = zlib.compress(json.dumps(campaigns, separators=(",", ":")).encode(), 6)
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if generation is not None and self.generation(key[0]) != generation:
+                db.execute("ROLLBACK")
+                return None
+            db.execute("INSERT INTO snapshots VALUES (?, ?, ?, 1, ?, ?) "
+                       "ON CONFLICT (base_url, from_date, to_date) DO UPDATE SET "
+                       "version = version + 1, fetched = excluded.fetched, body = excluded.body",
+                       (*key, time.time(), body))
+            version = db.execute("SELECT version FROM snapshots WHERE base_url = ? AND from_date = ? "
+                                 "AND to_date = ?", key).fetchone()[0]
+            pruned = self._prune(db, key)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        with self._parsed_lock:
+            self._parsed[key] = (version, pickle.dumps(campaigns, pickle.HIGHEST_PROTOCOL))
+            for old in pruned:
+                self._parsed.pop(old, None)
+        return version
+
+    def _prune(self, db: sqlite3.Connection, keep: Tuple[str, str, str]) -> List[Tuple[str, str, str]]:
+        """Inside put's transaction: drop expired/invalidated snapshots and the oldest beyond max_bytes"""
+        now = time.time()
+        rows = db.execute("SELECT base_url, from_date, to_date, fetched, length(body) FROM snapshots "
+                          "ORDER BY fetched DESC").fetchall()
+        doomed = []
+        size = 0
+        for base_url, from_date, to_date, fetched, length in rows:
+            key = (base_url, from_date, to_date)
+            if key != keep and (fetched < now - self.retention or size + length > self.max_bytes):
+                # Invalidated snapshots have fetched = 0 and always go
+                doomed.append(key)
+            else:
+                size += length
+        db.executemany("DELETE FROM snapshots WHERE base_url = ? AND from_date = ? AND to_date = ?", doomed)
+        # Leases of crashed refreshers
+        db.execute("DELETE FROM leases WHERE expires < ?", (now,))
+        return doomed
+
+    def invalidate(self, base_url: str):
+        """Mark every snapshot of base_url stale for all processes (after a write)"""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("INSERT INTO generations VALUES (?, 1) "
+                       "ON CONFLICT (base_url) DO UPDATE SET generation = generation + 1", (base_url,))
+            db.execute("UPDATE snapshots SET fetched = 0 WHERE base_url = ?", (base_url,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    # ---- refresh lease ----
+
+    def _try_lease(self, key: Tuple[str, str, str]) -> bool:
+        db = self._db()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT owner, expires FROM leases WHERE base_url = ? AND from_date = ? "
+                             "AND to_date = ?", key).fetchone()
+            mine = row is None or row[1] < now or row[0] == self._owner()
+            if mine:
+                db.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?, ?, ?)",
+                           (*key, self._owner(), now + self.lease))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return mine
+
+    def _release(self, key: Tuple[str, str, str]):
+        self._db().execute("DELETE FROM leases WHERE base_url = ? AND from_date = ? AND to_date = ? "
+                           "AND owner = ?", (*key, self._owner()))
+
+    def get_or_refresh(self, base_url: str, from_date: str, to_date: str,
+                       fetch: Callable[[], List[Dict]]) -> List[Dict]:
+        """Fresh snapshot, else refresh it here or wait for the process that holds the lease"""
+        key = (base_url, from_date, to_date)
+        deadline = time.monotonic() + self.wait
+        waited = False
+        while True:
+            snapshot = self.read(key)
+            age = time.time() - snapshot[1] if snapshot else None
+            if snapshot and age < self.ttl:
+                self._count("hits")
+                return snapshot[2]
+            if self._try_lease(key):
+                try:
+                    # Another process may have finished a refresh since our read
+                    latest = self.read(key)
+                    if latest and time.time() - latest[1] < self.ttl:
+                        self._count("hits")
+                        return latest[2]
+                    self._count("refreshes")
+                    generation = self.generation(base_url)
+                    campaigns = fetch()
+                    if campaigns:
+                        self.put(key, campaigns, generation)
+                        return campaigns
+                    # A failed fetch returns [] - keep serving what we had
+                    return latest[2] if latest else campaigns
+                finally:
+                    self._release(key)
+            if snapshot and age < self.max_stale:
+                self._count("stale")
+                return snapshot[2]
+            if time.monotonic() >= deadline:
+                # The refresher is stuck; don't hold the caller any longer
+                return fetch()
+            if not waited:
+                waited = True
+                self._count("waits")
+            time.sleep(POLL_INTERVAL)
+
+    def entries(self) -> List[Dict]:
+        rows = self._db().execute("SELECT base_url, from_date, to_date, version, fetched, length(body) "
+                                  "FROM snapshots ORDER BY base_url, from_date, to_date").fetchall()
+        return [{"base_url": r[0], "from": r[1], "to": r[2], "version": r[3],
+                 "age_s": round(time.time() - r[4], 1), "bytes": r[5]} for r in rows]
+
+
+def _worker(base_url: str, username: str, password: str, db_path: str, seconds: float, results):
+    from script_loader import load_script
+    client = load_script("6.noipfraud_complete_api.py")
+    cache = SharedSnapshotCache(db_path, ttl=1.0)
+    api = client.NoIPFraudAPI(base_url, username, password, snapshot_cache=cache)
+    reads = 0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        if api.get_campaigns():
+            reads += 1
+    results.put((reads, cache.stats))
+
+
+def main():
+    """Demo: N processes reading the campaign list for a few seconds, sharing one snapshot"""
+    import argparse
+    import multiprocessing
+    import tempfile
+
+    from script_loader import load_script
+
+    parser = argparse.ArgumentParser(description="Cross-process snapshot sharing against the mock server")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--campaigns", type=int, default=500)
+    args = parser.parse_args()
+
+    mock = load_script("8.mock_server.py")
+    db_path = os.path.join(tempfile.mkdtemp(prefix="noipfraud-snapshots-"), "snapshots.db")
+
+    print("="*70)
+    print(f"Shared snapshot cache - {args.processes} processes x {args.seconds}s, ttl 1s")
+    print("="*70)
+    with mock.MockNoIPFraudServer(campaigns=args.campaigns) as server:
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_worker, args=(server.base_url, server.username, server.password,
+                                                               db_path, args.seconds, results))
+                 for _ in range(args.processes)]
+        for p in procs:
+            p.start()
+        totals = {"reads": 0, "hits": 0, "stale": 0, "refreshes": 0, "waits": 0}
+        for _ in procs:
+            reads, stats = results.get()
+            totals["reads"] += reads
+            for k, v in stats.items():
+                totals[k] += v
+        for p in procs:
+            p.join()
+        fetched = server.requests["campaigns.php?a=list"]
+    print(f"📖 {totals['reads']:,} list reads across {args.processes} processes")
+    print(f"🌐 {fetched} campaigns.php?a=list requests reached the server")
+    print(f"   hits {totals['hits']:,}  stale {totals['stale']:,}  refreshes {totals['refreshes']}  "
+          f"waits {totals['waits']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,10 @@ import json
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any
 
+from script_loader import load_script
+
+profiling = load_script("11.profiling.py")
+
 
 class NoIPFraudAPI:
     """API client for noIPFraud platform"""
@@ -287,4 +291,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    profiling.run_main(main, __file__)
\ No newline at end of file
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Stats Rollups
+Materialized weekly and monthly aggregates (total, block, days) per campaign
+and per tenant, kept in SQLite next to the daily rows they come from.
+
+Daily rows (get_campaign_stats, block-report or campaign list rows) are
+applied as deltas against the stored day: a new day adds to its ISO week
+and calendar month, a corrected day adds only the difference, so re-syncing
+recent days never double-counts. Tenant totals are kept under campaign "*".
+
+A range query is answered from whole months, then whole weeks, then single
+days at the edges - a quarter reads 3 rows instead of ~90 days x campaigns.
+
+Run:
+    python 30.rollups.py sync --db rollups.db --tenants tenants.json --from 2025-07-01
+    python 30.rollups.py sync --db rollups.db                      (since the last sync, env credentials)
+    python 30.rollups.py query --db rollups.db --tenant luxeattic --from 2025-07-01 --to 2025-09-30
+    python 30.rollups.py series --db rollups.db --tenant luxeattic --grain month --from 2025-01-01
+"""
+
+import argparse
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from script_loader import load_script
+
+ALL = "*"
+GRAINS = ("week", "month")
+# Recent days keep changing on the server; re-read them on every sync
+LOOKBACK_DAYS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily (
+    tenant TEXT NOT NULL,
+    campaign TEXT NOT NULL,
+    date TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    block INTEGER NOT NULL,
+    PRIMARY KEY (tenant, campaign, date)
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    tenant TEXT NOT NULL,
+    campaign TEXT NOT NULL,
+    grain TEXT NOT NULL,
+    period TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    block INTEGER NOT NULL,
+    days INTEGER NOT NULL,
+    PRIMARY KEY (tenant, campaign, grain, period)
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    tenant TEXT PRIMARY KEY,
+    synced_to TEXT NOT NULL
+);
+"""
+
+
+def _day(value: str) -> date:
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
+
+
+def periods(day: date) -> List[Tuple[str, str]]:
+    """(grain, period start) rows a day rolls into: its ISO week (Monday) and month"""
+    monday = day - timedelta(days=day.weekday())
+    return [("week", monday.isoformat()), ("month", day.replace(day=1).isoformat())]
+
+
+def _month_end(day: date) -> date:
+    following = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return following - timedelta(days=1)
+
+
+def cover(from_date: str, to_date: str) -> List[Tuple[str, str]]:
+    """
+    Fewest (grain, period) pieces that exactly cover [from_date, to_date]
+
+    grain is "month", "week" or "day"; months are preferred, then weeks.
+    """
+    start, end = _day(from_date), _day(to_date)
+    pieces = []
+    while start <= end:
+        if start.day == 1 and _month_end(start) <= end:
+            pieces.append(("month", start.isoformat()))
+            start = _month_end(start) + timedelta(days=1)
+        elif start.weekday() == 0 and start + timedelta(days=6) <= end:
+            pieces.append(("week", start.isoformat()))
+            start += timedelta(days=7)
+        else:
+            pieces.append(("day", start.isoformat()))
+            start += timedelta(days=1)
+    return pieces
+
+
+def normalize(row: Dict, campaign_id: str = None) -> Optional[Tuple[str, str, int, int]]:
+    """(campaign, date, total, block) from a stats, block-report or list row"""
+    campaign = campaign_id or row.get("campaign_id") or row.get("name")
+    day = row.get("date")
+    if not campaign or not day:
+        return None
+    block = row.get("block", row.get("blocked", 0))
+    return campaign, day[:10], int(row.get("total") or 0), int(block or 0)
+
+
+class RollupStore:
+    """Daily rows plus incrementally maintained week/month rollups"""
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def _apply(self, tenant: str, campaign: str, day: date, total: int, block: int, new_day: bool):
+        self.db.execute("INSERT INTO daily VALUES (?, ?, ?, ?, ?) ON CONFLICT (tenant, campaign, date) DO UPDATE "
+                        "SET total = total + excluded.total, block = block + excluded.block",
+                        (tenant, campaign, day.isoformat(), total, block))
+        for grain, period in periods(day):
+            self.db.execute("INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?) "
+                            "ON CONFLICT (tenant, campaign, grain, period) DO UPDATE SET "
+                            "total = total + excluded.total, block = block + excluded.block, "
+                            "days = days + excluded.days",
+                            (tenant, campaign, grain, period, total, block, int(new_day)))
+
+    def ingest(self, tenant: str, rows: Iterable[Tuple[str, str, int, int]]) -> Dict[str, int]:
+        """
+        Apply (campaign, date, total, block) rows in one transaction
+
+        Returns:
+            {"new": days added, "changed": days corrected, "unchanged": rows skipped}
+        """
+        stats = {"new": 0, "changed": 0, "unchanged": 0}
+        with self.db:
+            for campaign, day, total, block in rows:
+                old = self.db.execute("SELECT total, block FROM daily WHERE tenant = ? AND campaign = ? "
+                                      "AND date = ?", (tenant, campaign, day)).fetchone()
+                if old == (total, block):
+                    stats["unchanged"] += 1
+                    continue
+                d_total, d_block = total - (old[0] if old else 0), block - (old[1] if old else 0)
+                parsed = _day(day)
+                self._apply(tenant, campaign, parsed, d_total, d_block, old is None)
+                # Tenant row: a day is new for "*" only the first time any campaign reports it
+                all_new = old is None and self.db.execute(
+                    "SELECT 1 FROM daily WHERE tenant = ? AND campaign = ? AND date = ?",
+                    (tenant, ALL, day)).fetchone() is None
+                self._apply(tenant, ALL, parsed, d_total, d_block, all_new)
+                stats["changed" if old else "new"] += 1
+        return stats
+
+    def watermark(self, tenant: str) -> Optional[str]:
+        row = self.db.execute("SELECT synced_to FROM watermarks WHERE tenant = ?", (tenant,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, tenant: str, synced_to: str):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO watermarks VALUES (?, ?)", (tenant, synced_to))
+
+    def totals(self, tenant: str, from_date: str, to_date: str, campaign: str = ALL) -> Dict:
+        """Totals over a date range from the fewest materialized rows"""
+        total = block = days = 0
+        pieces = cover(from_date, to_date)
+        for grain, period in pieces:
+            if grain == "day":
+                row = self.db.execute("SELECT total, block, 1 FROM daily WHERE tenant = ? AND campaign = ? "
+                                      "AND date = ?", (tenant, campaign, period)).fetchone()
+            else:
+                row = self.db.execute("SELECT total, block, days FROM rollups WHERE tenant = ? AND campaign = ? "
+                                      "AND grain = ? AND period = ?", (tenant, campaign, grain, period)).fetchone()
+            if row:
+                total, block, days = total + row[0], block + row[1], days + row[2]
+        return _summary({"tenant": tenant, "campaign": campaign, "from": from_date, "to": to_date,
+                         "total": total, "block": block, "days": days, "rows_read": len(pieces)})
+
+    def series(self, tenant: str, grain: str, from_date: str, to_date: str, campaign: str = ALL) -> List[Dict]:
+        """Trend rows for each week/month/quarter starting in the range"""
+        source = "month" if grain == "quarter" else grain
+        rows = self.db.execute("SELECT period, total, block, days FROM rollups WHERE tenant = ? AND campaign = ? "
+                               "AND grain = ? AND period BETWEEN ? AND ? ORDER BY period",
+                               (tenant, campaign, source, from_date, to_date)).fetchall()
+        if grain == "quarter":
+            quarters: Dict[str, List[int]] = {}
+            for period, total, block, days in rows:
+                month = int(period[5:7])
+                key = f"{period[:4]}-{(month - 1) // 3 * 3 + 1:02d}-01"
+                q = quarters.setdefault(key, [0, 0, 0])
+                q[0], q[1], q[2] = q[0] + total, q[1] + block, q[2] + days
+            rows = [(k, *v) for k, v in sorted(quarters.items())]
+        return [_summary({"period": period, "total": total, "block": block, "days": days})
+                for period, total, block, days in rows]
+
+
+def _summary(row: Dict) -> Dict:
+    row["allowed"] = row["total"] - row["block"]
+    row["block_rate"] = round(row["block"] / row["total"] * 100, 2) if row["total"] else 0.0
+    return row
+
+
+def fetch_rows(api, from_date: str, to_date: str,
+               concurrency: int = 8) -> Tuple[List[Tuple[str, str, int, int]], Optional[str], List[str]]:
+    """
+    Daily rows for every campaign in the range, in as few requests as possible
+
+    One campaign list per day when there are fewer days than campaigns,
+    otherwise one get_campaign_stats per campaign.
+
+    Returns:
+        (rows, complete_through, failures): complete_through is the last day
+        up to which every request succeeded (None if not even from_date did).
+        A failed fetch is reported, never read as "no clicks".
+    """
+    start, end = _day(from_date), _day(to_date)
+    days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    ids = [c["name"] for c in api.get_campaigns(to_date, to_date, strict=True)]
+    rows, failures = [], []
+    if len(days) <= len(ids):
+        def fetch_day(day):
+            try:
+                return day, [normalize(dict(c, date=day)) for c in api.get_campaigns(day, day, strict=True)]
+            except Exception as e:
+                return day, f"{day}: {type(e).__name__}: {e}"
+        complete_through = to_date
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for day, batch in pool.map(fetch_day, days):
+                if isinstance(batch, str):
+                    failures.append(batch)
+                    complete_through = min(complete_through, (_day(day) - timedelta(days=1)).isoformat())
+                else:
+                    rows.extend(batch)
+    else:
+        def fetch_campaign(cid):
+            try:
+                stats = api.get_campaign_stats(cid, from_date, to_date)
+            except Exception as e:
+                return f"{cid}: {type(e).__name__}: {e}"
+            if stats is None:
+                return f"{cid}: stats request failed"
+            return [normalize(r, cid) for r in stats]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for batch in pool.map(fetch_campaign, ids):
+                if isinstance(batch, str):
+                    failures.append(batch)
+                else:
+                    rows.extend(batch)
+        # A missing campaign leaves a hole in every day of the range
+        complete_through = None if failures else to_date
+    if complete_through is not None and complete_through < from_date:
+        complete_through = None
+    return [r for r in rows if r], complete_through, failures
+
+
+def sync(store: RollupStore, api, tenant: str, from_date: str = None, to_date: str = None,
+         concurrency: int = 8) -> Dict:
+    """
+    Pull daily rows since the tenant's watermark (minus LOOKBACK_DAYS) and roll them up
+
+    The watermark only moves up to the last completely fetched day, so days
+    that failed are fetched again on the next sync.
+    """
+    to_date = to_date or date.today().isoformat()
+    if not from_date:
+        mark = store.watermark(tenant)
+        from_date = (_day(mark) - timedelta(days=LOOKBACK_DAYS)).isoformat() if mark else to_date
+    rows, complete_through, failures = fetch_rows(api, from_date, to_date, concurrency)
+    result = store.ingest(tenant, rows)
+    if complete_through and complete_through > (store.watermark(tenant) or ""):
+        store.set_watermark(tenant, complete_through)
+    return dict(result, tenant=tenant, failures=failures, synced_to=store.watermark(tenant),
+                **{"from": from_date, "to": to_date})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialized weekly/monthly stats rollups")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("sync", help="pull daily rows and update the rollups")
+    p.add_argument("--db", default="rollups.db")
+    p.add_argument("--tenants", help="JSON tenants file (default: NOIPFRAUD_* env vars)")
+    p.add_argument("--from", dest="from_date", help="YYYY-MM-DD (default: since the last sync)")
+    p.add_argument("--to", dest="to_date", help="YYYY-MM-DD (default today)")
+    p.add_argument("--concurrency", type=int, default=8)
+    for name, help in (("query", "totals over a date range"), ("series", "week/month/quarter trend")):
+        p = sub.add_parser(name, help=help)
+        p.add_argument("--db", default="rollups.db")
+        p.add_argument("--tenant", required=True)
+        p.add_argument("--campaign", default=ALL, help="campaign id (default: whole tenant)")
+        p.add_argument("--from", dest="from_date", required=True)
+        p.add_argument("--to", dest="to_date", default=date.today().isoformat())
+        if name == "series":
+            p.add_argument("--grain", choices=["week", "month", "quarter"], default="week")
+    args = parser.parse_args()
+
+    store = RollupStore(args.db)
+    if args.command == "query":
+        print(json.dumps(store.totals(args.tenant, args.from_date, args.to_date, args.campaign), indent=2))
+        return
+    if args.command == "series":
+        print(json.dumps(store.series(args.tenant, args.grain, args.from_date, args.to_date, args.campaign),
+                         indent=2))
+        return
+
+    client = load_script("6.noipfraud_complete_api.py")
+    tenants = load_script("12.daemon.py").load_tenants(args.tenants)
+    print("="*70)
+    print(f"noIPFraud Rollup Sync - {len(tenants)} tenants -> {args.db}")
+    print("="*70)
+    for name, cfg in tenants.items():
+        api = client.NoIPFraudAPI(cfg["base_url"].rstrip("/"), cfg["username"], cfg["password"],
+                                  max_retries=2, tenant=name, pool_size=args.concurrency)
+        try:
+            result = sync(store, api, name, args.from_date, args.to_date, args.concurrency)
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            continue
+        print(f"{'⚠️ ' if result['failures'] else '✅'} {name} {result['from']}..{result['to']}: "
+              f"{result['new']} new days, {result['changed']} corrected, {result['unchanged']} unchanged")
+        for failure in result["failures"]:
+            print(f"   ❌ {failure}")
+        if result["failures"]:
+            print(f"   watermark held at {result['synced_to'] or '-'}; failed days are retried next sync")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Load Test
+Simulates N concurrent n8n-style workflows against the mock server and ramps
+N up step by step to find where each client configuration saturates.
+
+One workflow = the usual n8n chain:
+    list            get_campaigns()
+    block_report    get_block_report()
+    bulk_status     bulk_change_status(HIGH block-rate campaigns, -1)
+    embed           get_all_embed_codes(sample)
+
+Each step runs N workflow loops for --duration seconds and reports
+workflows/s, API requests/s, error rate and p50/p95/p99 workflow latency.
+A step is saturated when throughput grows less than --min-gain over the best
+earlier step, errors exceed --max-errors, or p95 exceeds --max-p95-factor x
+the first step's; the saturation point is the last step before that.
+
+The mock server runs in a child process with --latency/--jitter (and
+optional --error-rate/--rate-limit) so the client side is what's measured.
+
+Run:
+    python 31.load_test.py
+    python 31.load_test.py --configs shared-pool10 shared-pool32 per-workflow --steps 1 2 4 8 16 32 64
+    python 31.load_test.py --latency 0.05 --error-rate 0.02 --json load.json
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+from script_loader import load_script
+
+benchmark = load_script("9.benchmark.py")
+client = load_script("6.noipfraud_complete_api.py")
+metrics = load_script("10.metrics.py")
+
+STEPS = [1, 2, 4, 8, 16, 32]
+WORKFLOW_CALLS = ("list", "block_report", "bulk_status", "embed")
+
+# name -> (shared client across workflows?, NoIPFraudAPI kwargs)
+CONFIGS = {
+    "shared-pool10": (True, {"pool_size": 10}),
+    "shared-pool32": (True, {"pool_size": 32}),
+    "shared-retries": (True, {"pool_size": 32, "max_retries": 2, "retry_backoff": 0.05}),
+    "shared-http2": (True, {"pool_size": 32, "transport": "http2"}),
+    "per-workflow": (False, {"pool_size": 4}),
+}
+
+
+class WorkflowError(Exception):
+    pass
+
+
+def run_workflow(api, rng: random.Random, batch: int, fan_out: int) -> Dict[str, float]:
+    """One list -> block report -> bulk status -> embed chain; per-call seconds"""
+    timings = {}
+
+    start = time.perf_counter()
+    campaigns = api.get_campaigns()
+    timings["list"] = time.perf_counter() - start
+    if not campaigns:
+        raise WorkflowError("list returned nothing")
+
+    start = time.perf_counter()
+    report = api.get_block_report()
+    timings["block_report"] = time.perf_counter() - start
+    if not report:
+        raise WorkflowError("block report returned nothing")
+
+    flagged = [r["campaign_id"] for r in report if r["flag"] == "HIGH"][:batch] or [report[0]["campaign_id"]]
+    start = time.perf_counter()
+    results = api.bulk_change_status(flagged, -1, concurrency=fan_out)
+    timings["bulk_status"] = time.perf_counter() - start
+    if not all(results.values()):
+        raise WorkflowError(f"{sum(not ok for ok in results.values())} status changes failed")
+
+    sample = rng.sample([c["name"] for c in campaigns], min(batch, len(campaigns)))
+    start = time.perf_counter()
+    codes = api.get_all_embed_codes(sample, concurrency=fan_out)
+    timings["embed"] = time.perf_counter() - start
+    if any(code is None for code in codes.values()):
+        raise WorkflowError("embed codes missing")
+    return timings
+
+
+def _requests_sent(registry) -> int:
+    return int(sum(registry.requests.snapshot().values()))
+
+
+def run_step(apis: List, registry, concurrency: int, duration: float, batch: int, fan_out: int,
+             seed: int = 0) -> Dict:
+    """concurrency workflow loops for duration seconds; latency/throughput summary"""
+    lock = threading.Lock()
+    latencies: List[float] = []
+    calls: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    before = _requests_sent(registry)
+    barrier = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def loop(index: int):
+        api = apis[index % len(apis)]
+        rng = random.Random(seed * 1000 + index)
+        barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            start = time.perf_counter()
+            try:
+                timings = run_workflow(api, rng, batch, fan_out)
+            except Exception as e:
+                with lock:
+                    errors[type(e).__name__ if not isinstance(e, WorkflowError) else str(e)] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                for name, seconds in timings.items():
+                    calls[name].append(seconds)
+
+    threads = [threading.Thread(target=loop, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    deadline[0] = time.perf_counter() + duration
+    start = time.perf_counter()
+    barrier.wait()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    failed = sum(errors.values())
+    attempted = len(latencies) + failed
+    pct = benchmark.percentile
+    return {
+        "concurrency": concurrency,
+        "workflows": len(latencies),
+        "workflows_per_s": round(len(latencies) / wall, 2),
+        "requests_per_s": round((_requests_sent(registry) - before) / wall, 1),
+        "error_rate": round(failed / attempted, 4) if attempted else 0.0,
+        "errors": dict(errors),
+        "p50_ms": round(pct(latencies, 50) * 1000, 1),
+        "p95_ms": round(pct(latencies, 95) * 1000, 1),
+        "p99_ms": round(pct(latencies, 99) * 1000, 1),
+        "calls_p95_ms": {name: round(pct(sorted(v), 95) * 1000, 1) for name, v in calls.items()},
+    }
+
+
+def saturated(step: Dict, history: List[Dict], min_gain: float, max_errors: float, max_p95_factor: float) -> str:
+    """Why this step counts as saturated ("" if it still scales)"""
+    if step["error_rate"] > max_errors:
+        return f"error rate {step['error_rate']:.1%}"
+    if not history:
+        return ""
+    baseline = history[0]["p95_ms"]
+    if baseline and step["p95_ms"] > baseline * max_p95_factor:
+        return f"p95 {step['p95_ms']:.0f} ms > {max_p95_factor:g}x {baseline:.0f} ms"
+    best = max(h["workflows_per_s"] for h in history)
+    if step["workflows_per_s"] < best * (1 + min_gain):
+        return f"throughput {(step['workflows_per_s'] / best - 1) * 100 if best else 0:+.0f}% (< {min_gain:.0%})"
+    return ""
+
+
+def ramp(name: str, base_url: str, steps: List[int], duration: float, batch: int, fan_out: int,
+         min_gain: float = 0.1, max_errors: float = 0.05, max_p95_factor: float = 4.0,
+         full: bool = False, report: Callable[[Dict], None] = None) -> Dict:
+    """Ramp one client configuration; returns {"config", "steps", "saturation"}"""
+    shared, kwargs = CONFIGS[name]
+    registry = metrics.ClientMetrics()
+
+    def make_api():
+        api = client.NoIPFraudAPI(base_url, "mock", "mock", metrics_registry=registry, **kwargs)
+        if not api.login():
+            raise RuntimeError(f"Login against mock server failed ({base_url})")
+        return api
+
+    shared_api = make_api() if shared else None
+    ran, saturation, reason = [], None, "not reached"
+    for concurrency in steps:
+        apis = [shared_api] if shared else [make_api() for _ in range(concurrency)]
+        step = run_step(apis, registry, concurrency, duration, batch, fan_out)
+        step["saturated"] = saturated(step, ran, min_gain, max_errors, max_p95_factor)
+        if report:
+            report(step)
+        if step["saturated"] and saturation is None:
+            # The last step that still scaled (the first one if even that didn't)
+            saturation, reason = ran[-1] if ran else step, step["saturated"]
+        ran.append(step)
+        if saturation is not None and not full:
+            break
+    saturation = saturation or ran[-1]
+    return {
+        "config": name,
+        "steps": ran,
+        "saturation": {"concurrency": saturation["concurrency"], "workflows_per_s": saturation["workflows_per_s"],
+                       "p95_ms": saturation["p95_ms"], "reason": reason},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp concurrent n8n-style workflows to find saturation")
+    parser.add_argument("--configs", nargs="+", choices=sorted(CONFIGS), default=["shared-pool10", "shared-pool32",
+                                                                                   "per-workflow"])
+    parser.add_argument("--steps", type=int, nargs="+", default=STEPS, help="concurrent workflows per step")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per step")
+    parser.add_argument("--campaigns", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=10, help="campaigns per bulk status / embed call")
+    parser.add_argument("--fan-out", type=int, default=4, help="concurrency inside bulk calls")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock server latency (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock 5xx probability")
+    parser.add_argument("--rate-limit", type=float, help="mock requests/s before 429")
+    parser.add_argument("--min-gain", type=float, default=0.1, help="throughput gain that still counts as scaling")
+    parser.add_argument("--max-errors", type=float, default=0.05)
+    parser.add_argument("--max-p95-factor", type=float, default=4.0)
+    parser.add_argument("--full", action="store_true", help="run every step even after saturation")
+    parser.add_argument("--json", metavar="FILE", help="write all results as JSON")
+    args = parser.parse_args()
+
+    if "shared-http2" in args.configs and not load_script("13.http2_transport.py").available():
+        print("⚠️  httpx[http2] not installed - shared-http2 falls back to HTTP/1.1 (pip install 'httpx[http2]')")
+
+    faults = {"jitter": args.jitter, "error_rate": args.error_rate, "rate_limit": args.rate_limit}
+    print("="*70)
+    print(f"noIPFraud Load Test - {args.campaigns} campaigns, latency {args.latency}s±{args.jitter}s, "
+          f"{args.duration}s/step")
+    print("="*70)
+
+    results = []
+    for name in args.configs:
+        # Fresh server per configuration: clean state and its own circuit breaker key
+        process, base_url = benchmark.start_server(args.campaigns, args.latency, **faults)
+        print(f"\n🔧 {name}")
+        print(f"   {'wf':>4} {'wf/s':>8} {'req/s':>8} {'err':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+        def show(step):
+            flag = f"  ⚠️  {step['saturated']}" if step["saturated"] else ""
+            print(f"   {step['concurrency']:>4} {step['workflows_per_s']:>8.2f} {step['requests_per_s']:>8.1f} "
+                  f"{step['error_rate']:>6.1%} {step['p50_ms']:>8.1f} {step['p95_ms']:>8.1f} {step['p99_ms']:>8.1f}"
+                  f"{flag}")
+
+        try:
+            result = ramp(name, base_url, args.steps, args.duration, args.batch, args.fan_out,
+                          args.min_gain, args.max_errors, args.max_p95_factor, args.full, show)
+        finally:
+            process.terminate()
+            process.join()
+        results.append(result)
+
+    print("\n" + "="*70)
+    print("SATURATION POINTS")
+    print("="*70)
+    for result in results:
+        sat = result["saturation"]
+        print(f"{result['config']:<16} {sat['concurrency']:>4} workflows  {sat['workflows_per_s']:>7.2f} wf/s  "
+              f"p95 {sat['p95_ms']:.0f} ms  ({sat['reason']})")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,10 @@ noIPFraud - Create Campaign Test
 import requests
 import json
 
+from script_loader import load_script
+
+profiling = load_script("11.profiling.py")
+
 BASE_URL = "https://luxeattic.com/admin/api"
 USERNAME = "luxeattic"
 PASSWORD = "Z456789xAa"
@@ -144,4 +148,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    profiling.run_main(main, __file__)
\ No newline at end of file
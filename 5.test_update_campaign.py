@@ -4,6 +4,10 @@
 import requests
 import json
 
+from script_loader import load_script
+
+profiling = load_script("11.profiling.py")
+
 BASE_URL = "https://luxeattic.com/admin/api"
 USERNAME = "luxeattic"
 PASSWORD = "Z456789xAa"
@@ -157,4 +161,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    profiling.run_main(main, __file__)
\ No newline at end of file
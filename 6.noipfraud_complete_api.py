@@ -6,24 +6,87 @@ All endpoints discovered - Ready for n8n implementation
 
 import requests
 import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, List
+from urllib.parse import urlparse
+
+from script_loader import load_script
+
+metrics = load_script("10.metrics.py")
+profiling = load_script("11.profiling.py")
+campaign_index = load_script("15.campaign_index.py")
+circuit_breaker = load_script("18.circuit_breaker.py")
+date_windows = load_script("19.date_windows.py")
+request_scheduler = load_script("28.request_scheduler.py")
+
+# Transient statuses worth retrying when max_retries > 0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# (connect, read) seconds - without one a dead host holds every call until the OS gives up
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+TRAFFIC_FACEBOOK = "54218f34454c61f813000001"
 
 
 class NoIPFraudAPI:
     """Complete API client for noIPFraud"""
     
-    def __init__(self, base_url: str, username: str, password: str):
+    def __init__(self, base_url: str, username: str, password: str,
+                 max_retries: int = 0, retry_backoff: float = 0.5,
+                 metrics_registry=None, tenant: str = None, pool_size: int = 10,
+                 transport: str = "http1", timeout=DEFAULT_TIMEOUT,
+                 breaker_threshold: int = 5, breaker_reset: float = 30.0, cassette=None,
+                 max_in_flight: int = None, priority_shares: Dict[str, float] = None,
+                 snapshot_cache=None):
         self.base_url = base_url
         self.username = username
         self.password = password
         self.token = None
         self.token_expiry = None
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.metrics = metrics_registry or metrics.REGISTRY
+        self.tenant = tenant or urlparse(base_url).hostname or base_url
+        self.timeout = timeout
+        # Stats of fully past date windows (get_campaigns window_days=...)
+        self.window_cache = date_windows.WindowCache()
+        self._embed_renderer = None
+        # 29.snapshot_cache.py SharedSnapshotCache: list snapshots shared across processes
+        self.snapshot_cache = snapshot_cache
+        # Shared by every client of this base_url; breaker_threshold=0 disables it
+        self.breaker = circuit_breaker.get_breaker(base_url, failure_threshold=breaker_threshold,
+                                                   reset_timeout=breaker_reset) if breaker_threshold else None
+        # In-flight requests are handed out by priority class (see 28.request_scheduler.py);
+        # max_in_flight defaults to pool_size, 0 disables the scheduler
+        slots = pool_size if max_in_flight is None else max_in_flight
+        self.scheduler = request_scheduler.RequestScheduler(slots, priority_shares, self.metrics,
+                                                            self.tenant) if slots else None
+        self._priority = threading.local()
+        self.session = None
+        if transport == "http2":
+            # httpx-based, multiplexes bulk fan-out over one connection; None if not installed
+            self.session = load_script("13.http2_transport.py").make_session(pool_size)
+        if self.session is None:
+            # One keep-alive pool per client; pool_size bounds parallel connections per host
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        if cassette is not None:
+            # 27.cassette.py Cassette: record through the real session or replay from disk
+            self.session = cassette.wrap(self.session)
     
     def login(self) -> bool:
         """Authenticate and get 5-hour token"""
-        url = f"{self.base_url}/login.php"
-        response = requests.post(url, json={"username": self.username, "password": self.password}, params={"a": "auth"})
+        if self.token:
+            self.metrics.relogin(self.tenant)
+        response = self._request("POST", "login.php", "auth",
+                                 json_body={"username": self.username, "password": self.password},
+                                 auth=False)
         if response.status_code == 200:
             self.token = response.json()["token"]
             self.token_expiry = datetime.now() + timedelta(hours=5)
@@ -34,32 +97,217 @@ class NoIPFraudAPI:
         if not self.token or (self.token_expiry and datetime.now() >= self.token_expiry):
             self.login()
     
+    def _invalidate_snapshots(self):
+        if self.snapshot_cache is not None:
+            self.snapshot_cache.invalidate(self.base_url)
+    
+    def circuit_status(self) -> Optional[Dict]:
+        """Circuit breaker state for this client's base_url (None if disabled)"""
+        return self.breaker.status() if self.breaker else None
+    
+    def _record(self, ok: bool):
+        if self.breaker is None:
+            return
+        if ok:
+            self.breaker.success()
+        else:
+            self.breaker.failure()
+        self.metrics.circuit(self.tenant, self.breaker.state)
+    
+    @contextmanager
+    def priority(self, priority: Optional[str]):
+        """
+        Send this thread's requests (and fan-outs started from it) in a priority class
+        
+        e.g. with api.priority("alert"): api.get_campaigns(); None keeps the default
+        """
+        previous = getattr(self._priority, "value", None)
+        if priority is not None:
+            self._priority.value = priority
+        try:
+            yield
+        finally:
+            self._priority.value = previous
+    
+    def _in_priority(self, fn):
+        """fn wrapped to run in the calling thread's priority class (for pool workers)"""
+        priority = getattr(self._priority, "value", None)
+        if priority is None:
+            return fn
+        
+        def run(*args):
+            with self.priority(priority):
+                return fn(*args)
+        return run
+    
+    def _slot(self, method: str, action: Optional[str]):
+        if self.scheduler is None:
+            return nullcontext()
+        priority = getattr(self._priority, "value", None) or request_scheduler.classify(method, action)
+        return self.scheduler.slot(priority)
+    
     def _headers(self) -> Dict[str, str]:
         return {"Authorization": f"Bearer {self.token}", "Accept": "application/json"}
     
+    def _request(self, method: str, endpoint: str, action: str = None, params: Dict = None,
+                 json_body=None, auth: bool = True, retries: int = None) -> requests.Response:
+        """
+        Send one API request with metrics, 401 re-login and optional retries
+        
+        Args:
+            endpoint: Script name, e.g. "campaigns.php"
+            action: Value of the `a=` query parameter
+            auth: Send the bearer token (False only for login)
+            retries: Override max_retries (0 for writes that aren't safe to repeat)
+        
+        Returns:
+            The final response; transport errors are re-raised after retries
+        
+        Raises:
+            circuit_breaker.CircuitOpen (a requests.ConnectionError) without
+            sending anything while the base_url's breaker is open
+        """
+        query = {"a": action, **(params or {})} if action else params
+        label = f"{endpoint}?a={action}" if endpoint == "campaigns.php" and action else endpoint
+        url = f"{self.base_url}/{endpoint}"
+        max_retries = self.max_retries if retries is None else retries
+        attempt = 0
+        relogged = False
+        
+        while True:
+            if self.breaker is not None:
+                try:
+                    self.breaker.allow()
+                except circuit_breaker.CircuitOpen:
+                    self.metrics.short_circuit(self.tenant, label)
+                    raise
+                if self.breaker.state == circuit_breaker.HALF_OPEN:
+                    self.metrics.circuit(self.tenant, circuit_breaker.HALF_OPEN)
+            try:
+                # Held only for the send: a 401 re-login below takes its own slot
+                with self._slot(method, action):
+                    start = time.perf_counter()
+                    with profiling.PROFILER.phase("network"):
+                        response = self.session.request(method, url, params=query, json=json_body,
+                                                        headers=self._headers() if auth else None,
+                                                        timeout=self.timeout)
+            except requests.RequestException as e:
+                self._record(False)
+                self.metrics.observe(self.tenant, label, type(e).__name__, time.perf_counter() - start)
+                if attempt < max_retries:
+                    attempt += 1
+                    self.metrics.retry(self.tenant, label)
+                    time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                    continue
+                raise
+            except BaseException:
+                # Local error, not the server's: free a half-open trial slot without counting a failure
+                if self.breaker is not None:
+                    self.breaker.release()
+                raise
+            self._record(response.status_code < 500)
+            
+            body = response.request.body
+            # Wire size (compressed) when the server reports it
+            received = int(response.headers.get("Content-Length") or len(response.content))
+            self.metrics.observe(self.tenant, label, response.status_code, time.perf_counter() - start,
+                                 sent=len(body) if body else 0, received=received)
+            
+            if auth and response.status_code == 401 and not relogged:
+                relogged = True
+                if self.login():
+                    self.metrics.retry(self.tenant, label)
+                    continue
+            if response.status_code in RETRY_STATUSES and attempt < max_retries:
+                attempt += 1
+                self.metrics.retry(self.tenant, label)
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                continue
+            return response
+    
     # ==================== CAMPAIGNS ====================
     
-    def get_campaigns(self, from_date: str = None, to_date: str = None) -> List[Dict]:
-        """Get campaign list"""
+    def get_campaigns(self, from_date: str = None, to_date: str = None,
+                      window_days: int = None, concurrency: int = 4, strict: bool = False) -> List[Dict]:
+        """
+        Get campaign list
+        
+        Args:
+            window_days: Split a longer range into windows of this many days,
+                fetched concurrently and merged (click counters summed, settings
+                from the newest window). Fully past windows are served from window_cache.
+            strict: Raise requests.HTTPError when the list can't be loaded
+                instead of returning [] (callers that must not read a failed
+                fetch as "no campaigns")
+        """
         self._ensure_authenticated()
         if not from_date:
             from_date = datetime.now().strftime("%Y-%m-%d")
         if not to_date:
             to_date = from_date
         
-        response = requests.get(
-            f"{self.base_url}/campaigns.php",
-            params={"a": "list", "from": from_date, "to": to_date},
-            headers=self._headers()
-        )
-        return response.json() if response.status_code == 200 else []
-    
-    def create_campaign(self, name: str, safe_url: str, money_url: str, 
-                       countries: List[str] = None, mobile_only: bool = True) -> Dict:
-        """Create new campaign"""
+        windows = date_windows.split_range(from_date, to_date, window_days) if window_days else []
+        if len(windows) <= 1:
+            return self._list_campaigns(from_date, to_date, strict)
+        return self._get_campaigns_windowed(windows, concurrency, strict)
+    
+    def _list_campaigns(self, from_date: str, to_date: str, strict: bool = False) -> List[Dict]:
+        if self.snapshot_cache is not None:
+            return self.snapshot_cache.get_or_refresh(self.base_url, from_date, to_date,
+                                                      lambda: self._fetch_list(from_date, to_date, strict))
+        return self._fetch_list(from_date, to_date, strict)
+    
+    def _fetch_list(self, from_date: str, to_date: str, strict: bool = False) -> List[Dict]:
+        response = self._request("GET", "campaigns.php", "list", params={"from": from_date, "to": to_date})
+        if response.status_code != 200:
+            if strict:
+                raise requests.HTTPError(f"campaign list {from_date}..{to_date}: HTTP {response.status_code}",
+                                         response=response)
+            return []
+        with profiling.PROFILER.phase("parse"):
+            return response.json()
+    
+    def _get_campaigns_windowed(self, windows: List, concurrency: int, strict: bool = False) -> List[Dict]:
+        # The newest window always goes to the server: it carries current settings
+        *older, newest = windows
+        cached = {w: self.window_cache.get(self.base_url, w) for w in older if date_windows.is_past(w)}
+        missing = [w for w in older if cached.get(w) is None]
+        failed = False
+        
+        def fetch(window):
+            return window, self._list_campaigns(*window, strict)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(missing) + 1))) as pool:
+            fetched = dict(pool.map(self._in_priority(fetch), [newest] + missing))
+        latest = fetched.pop(newest)
+        if not latest:
+            return []
+        for window, campaigns in fetched.items():
+            if not campaigns:
+                # A failed window would silently undercount - fail the whole call like a single fetch
+                failed = True
+            elif date_windows.is_past(window):
+                cached[window] = self.window_cache.put(self.base_url, window, campaigns)
+            else:
+                cached[window] = {c["name"]: date_windows.stats_of(c) for c in campaigns}
+        if failed:
+            return []
+        return date_windows.merge(latest, [cached[w] for w in older])
+    
+    def create_campaign(self, name: str, safe_url: str, money_url, 
+                       countries: List[str] = None, mobile_only: bool = True,
+                       traffic: str = TRAFFIC_FACEBOOK) -> Dict:
+        """
+        Create new campaign
+        money_url is a URL, or a realurl split list [{"url", "perc", "desc"}, ...]
+        """
         self._ensure_authenticated()
         if not countries:
             countries = ["th"]
+        if isinstance(money_url, str):
+            realurl = [{"url": money_url, "perc": 100, "desc": "LP1"}]
+        else:
+            realurl = money_url
         
         payload = {
             "info": name,
@@ -70,30 +318,33 @@ class NoIPFraudAPI:
             "filters": [],
             "lptrack": False,
             "pagelock": {"enabled": False, "action": "blank", "url": "", "timeout": 10},
-            "realurl": [{"url": money_url, "perc": 100, "desc": "LP1"}],
+            "realurl": realurl,
             "rules": {
                 "mobile": {"allow": True, "d": [] if mobile_only else None},
                 "country": {"allow": True, "d": countries}
             },
             "schedule": [],
-            "traffic": "54218f34454c61f813000001",  # Facebook
+            "traffic": traffic,
             "urlfilter": [{"variable": "", "action": "1", "value": ""}],
             "urlkeyword": ""
         }
         
-        response = requests.post(
-            f"{self.base_url}/campaigns.php",
-            params={"a": "create"},
-            json=payload,
-            headers=self._headers()
-        )
+        # Never re-sent: a create the server committed but answered slowly would be duplicated
+        response = self._request("POST", "campaigns.php", "create", json_body=payload, retries=0)
+        self._invalidate_snapshots()
         return response.json() if response.status_code == 200 else None
     
-    def update_campaign(self, campaign_id: str, **updates) -> bool:
-        """Update existing campaign"""
+    def update_campaign(self, campaign_id: str, index=None, **updates) -> bool:
+        """
+        Update existing campaign
+        Pass a CampaignIndex to reuse an existing snapshot instead of re-listing
+        """
         self._ensure_authenticated()
-        campaigns = self.get_campaigns()
-        current = next((c for c in campaigns if c["name"] == campaign_id), None)
+        if index is not None:
+            current = index.get(campaign_id)
+        else:
+            # One lookup: a scan is cheaper than building every secondary index
+            current = next((c for c in self.get_campaigns() if c.get("name") == campaign_id), None)
         if not current:
             return False
         
@@ -121,12 +372,8 @@ class NoIPFraudAPI:
             "device": current.get("device")
         }
         
-        response = requests.post(
-            f"{self.base_url}/campaigns.php",
-            params={"a": "update"},
-            json=payload,
-            headers=self._headers()
-        )
+        response = self._request("POST", "campaigns.php", "update", json_body=payload)
+        self._invalidate_snapshots()
         return response.status_code == 200
     
     def change_status(self, campaign_id: str, status: int) -> bool:
@@ -135,53 +382,74 @@ class NoIPFraudAPI:
         0=Review, 1=Active, 2=Allow All, -1=Block All
         """
         self._ensure_authenticated()
-        response = requests.get(
-            f"{self.base_url}/campaigns.php",
-            params={"a": "changeStatus", "clid": campaign_id, "status": status},
-            headers=self._headers()
-        )
+        response = self._request("GET", "campaigns.php", "changeStatus",
+                                 params={"clid": campaign_id, "status": status})
+        self._invalidate_snapshots()
         return response.status_code == 200
     
     def get_embed_code(self, campaign_id: str) -> str:
         """Get PHP embed code for deployment"""
         self._ensure_authenticated()
-        response = requests.get(
-            f"{self.base_url}/campaigns.php",
-            params={"a": "getPhpEmbed", "clid": campaign_id},
-            headers=self._headers()
-        )
+        response = self._request("GET", "campaigns.php", "getPhpEmbed", params={"clid": campaign_id})
         return response.text if response.status_code == 200 else None
-    
+
+    # ==================== STATS ====================
+
+    def get_campaign_stats(self, campaign_id: str, from_date: str, to_date: str) -> Optional[List[Dict]]:
+        """Get daily stats rows for a campaign"""
+        self._ensure_authenticated()
+        response = self._request("GET", "stats.php", "daily",
+                                 params={"clid": campaign_id, "from": from_date, "to": to_date})
+        return response.json() if response.status_code == 200 else None
+
     # ==================== BULK OPERATIONS ====================
     
-    def bulk_change_status(self, campaign_ids: List[str], status: int) -> Dict[str, bool]:
+    def _fan_out(self, fn, campaign_ids: List[str], concurrency: int) -> Dict:
+        """Run fn(campaign_id) for each id, in parallel when concurrency > 1"""
+        if concurrency <= 1 or len(campaign_ids) <= 1:
+            return {cid: fn(cid) for cid in campaign_ids}
+        # Log in once up front instead of racing in every worker
+        self._ensure_authenticated()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return dict(zip(campaign_ids, pool.map(self._in_priority(fn), campaign_ids)))
+    
+    def bulk_change_status(self, campaign_ids: List[str], status: int, concurrency: int = 1) -> Dict[str, bool]:
         """Change status for multiple campaigns"""
-        results = {}
-        for cid in campaign_ids:
-            results[cid] = self.change_status(cid, status)
-        return results
+        return self._fan_out(lambda cid: self.change_status(cid, status), campaign_ids, concurrency)
+    
+    def get_all_campaign_stats(self, campaign_ids: List[str], from_date: str, to_date: str,
+                               concurrency: int = 1) -> Dict[str, Optional[List[Dict]]]:
+        """Daily stats rows for multiple campaigns"""
+        return self._fan_out(lambda cid: self.get_campaign_stats(cid, from_date, to_date), campaign_ids, concurrency)
     
     def bulk_update(self, updates: List[Dict]) -> Dict[str, bool]:
         """
         Bulk update campaigns
         updates = [{"campaign_id": "xxx", "fakeurl": "...", ...}, ...]
         """
+        # One list fetch for the whole batch rather than one per campaign
+        index = campaign_index.CampaignIndex(self.get_campaigns())
         results = {}
         for item in updates:
             cid = item.pop("campaign_id")
-            results[cid] = self.update_campaign(cid, **item)
+            results[cid] = self.update_campaign(cid, index=index, **item)
         return results
     
-    def get_all_embed_codes(self, campaign_ids: List[str] = None) -> Dict[str, str]:
-        """Get embed codes for multiple campaigns"""
+    def get_all_embed_codes(self, campaign_ids: List[str] = None, concurrency: int = 1,
+                            local: bool = False) -> Dict[str, str]:
+        """
+        Get embed codes for multiple campaigns
+        local=True renders from a template learned per cv (see 21.embed_template.py)
+        """
+        if local:
+            if self._embed_renderer is None:
+                self._embed_renderer = load_script("21.embed_template.py").EmbedRenderer(self)
+            return self._embed_renderer.embed_codes(campaign_ids, concurrency)
         if not campaign_ids:
             campaigns = self.get_campaigns()
             campaign_ids = [c["name"] for c in campaigns]
         
-        codes = {}
-        for cid in campaign_ids:
-            codes[cid] = self.get_embed_code(cid)
-        return codes
+        return self._fan_out(self.get_embed_code, campaign_ids, concurrency)
     
     # ==================== REPORTING ====================
     
@@ -200,8 +468,11 @@ class NoIPFraudAPI:
         """Get block rate report"""
         if not date:
             date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-        
-        campaigns = self.get_campaigns(date, date)
+        return self.block_report_rows(self.get_campaigns(date, date), date)
+    
+    @staticmethod
+    def block_report_rows(campaigns: List[Dict], date: str) -> List[Dict]:
+        """Block report rows from an already fetched campaign list of that date"""
         report = []
         for c in campaigns:
             total = c.get("total", 0)
@@ -215,7 +486,9 @@ class NoIPFraudAPI:
                 "blocked": blocked,
                 "allowed": total - blocked,
                 "block_rate": round(rate, 2),
-                "flag": "HIGH" if rate > 50 else "OK"
+                "flag": "HIGH" if rate > 50 else "OK",
+                "status": c.get("active"),
+                "traffic": c.get("traffic")
             })
         return report
 
@@ -223,6 +496,7 @@ class NoIPFraudAPI:
 # ==================== TEST ALL ENDPOINTS ====================
 
 def main():
+    PROFILER = profiling.PROFILER
     api = NoIPFraudAPI("https://luxeattic.com/admin/api", "luxeattic", "Z456789xAa")
     
     print("\n" + "="*70)
@@ -231,34 +505,40 @@ def main():
     
     # 1. Login
     print("\n1. Testing Login...")
-    assert api.login(), "Login failed"
+    with PROFILER.phase("login"):
+        assert api.login(), "Login failed"
     print("✅ Login successful")
     
     # 2. Get Campaigns
     print("\n2. Testing Get Campaigns...")
-    campaigns = api.get_campaigns()
+    with PROFILER.phase("get_campaigns"):
+        campaigns = api.get_campaigns()
     print(f"✅ Retrieved {len(campaigns)} campaigns")
     
     # 3. Change Status
     print("\n3. Testing Change Status...")
     if campaigns:
-        result = api.change_status(campaigns[0]["name"], 1)
+        with PROFILER.phase("change_status"):
+            result = api.change_status(campaigns[0]["name"], 1)
         print(f"✅ Status changed: {result}")
     
     # 4. Get Status Report
     print("\n4. Testing Status Report...")
-    report = api.get_status_report()
+    with PROFILER.phase("status_report"):
+        report = api.get_status_report()
     print(f"✅ Generated report for {len(report)} campaigns")
     
     # 5. Get Block Report
     print("\n5. Testing Block Report...")
-    block_report = api.get_block_report()
+    with PROFILER.phase("block_report"):
+        block_report = api.get_block_report()
     print(f"✅ Generated block report for {len(block_report)} campaigns")
     
     # 6. Get Embed Code
     print("\n6. Testing Get Embed Code...")
     if campaigns:
-        code = api.get_embed_code(campaigns[0]["name"])
+        with PROFILER.phase("embed_code"):
+            code = api.get_embed_code(campaigns[0]["name"])
         print(f"✅ Retrieved embed code ({len(code) if code else 0} chars)")
     
     # 7. Create Campaign (optional - uncomment to test)
@@ -269,7 +549,8 @@ def main():
     # 8. Update Campaign
     print("\n8. Testing Update Campaign...")
     if campaigns:
-        result = api.update_campaign(campaigns[0]["name"], info="Test-Update")
+        with PROFILER.phase("update_campaign"):
+            result = api.update_campaign(campaigns[0]["name"], info="Test-Update")
         print(f"✅ Campaign updated: {result}")
     
     print("\n" + "="*70)
@@ -279,4 +560,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    profiling.run_main(main, __file__)
\ No newline at end of file
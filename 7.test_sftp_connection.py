@@ -3,10 +3,13 @@
 Test SFTP connection to noIPFraud servers
 """
 
-import paramiko
 import stat
 from pathlib import Path
 
+from script_loader import load_script
+
+profiling = load_script("11.profiling.py")
+
 # Server configs
 SERVERS = {
     "luxeattic": {
@@ -33,8 +36,42 @@ SERVERS = {
 }
 
 
+def key_path(config) -> Path:
+    """Key file as given, else next to this script"""
+    path = Path(config["key_file"])
+    if not path.exists() and not path.is_absolute():
+        path = Path(__file__).resolve().parent / config["key_file"]
+    return path
+
+
+def load_key(path):
+    import paramiko
+    try:
+        return paramiko.RSAKey.from_private_key_file(str(path))
+    except Exception:
+        return paramiko.Ed25519Key.from_private_key_file(str(path))
+
+
+def connect(config, timeout: float = 10.0):
+    """SSHClient connected to a SERVERS entry; raises on failure"""
+    import paramiko
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    ssh.connect(
+        hostname=config["host"],
+        port=config["port"],
+        username=config["username"],
+        pkey=load_key(key_path(config)),
+        look_for_keys=False,
+        allow_agent=False,
+        timeout=timeout
+    )
+    return ssh
+
+
 def test_sftp_connection(server_name, config):
     """Test SFTP connection and list files"""
+    import paramiko  # imported here so API-only callers never pay for it
     
     print(f"\n{'='*70}")
     print(f"Testing: {server_name}")
@@ -48,19 +85,16 @@ def test_sftp_connection(server_name, config):
         
         # Connect with key file
         print(f"Connecting with key file: {config['key_file']}")
-        if not Path(config['key_file']).exists():
+        if not key_path(config).exists():
             print(f"❌ Key file not found: {config['key_file']}")
             return False
         
         # Load private key
         try:
-            pkey = paramiko.RSAKey.from_private_key_file(config['key_file'])
+            pkey = load_key(key_path(config))
         except Exception as e:
-            try:
-                pkey = paramiko.Ed25519Key.from_private_key_file(config['key_file'])
-            except Exception as e2:
-                print(f"❌ Could not load key: {e}")
-                return False
+            print(f"❌ Could not load key: {e}")
+            return False
         
         ssh.connect(
             hostname=config["host"],
@@ -159,10 +193,10 @@ def main():
 if __name__ == "__main__":
     # Check if paramiko is installed
     try:
-        import paramiko
+        import paramiko  # noqa: F401
     except ImportError:
         print("❌ paramiko not installed")
         print("Run: pip install paramiko")
         exit(1)
     
-    main()
\ No newline at end of file
+    profiling.run_main(main, __file__)
\ No newline at end of file
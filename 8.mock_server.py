@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+noIPFraud Mock Server
+Local stand-in for https://<tenant>/admin/api - offline testing and benchmarking
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import string
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, List
+from urllib.parse import urlparse, parse_qs
+
+
+TRAFFIC_SOURCES = [
+    "54218f34454c61f813000001",  # Facebook
+    "54218f34454c61f813000002",
+    "54218f34454c61f813000003",
+]
+COUNTRIES = ["th", "vn", "id", "my", "ph", "sg"]
+
+EMBED_TEMPLATE = """<?php
+/*
+ * noIPFraud v{cv} - campaign {name}
+ * Place this code at the very top of your landing page.
+ */
+$nipf_clid = '{name}';
+$nipf_cv = '{cv}';
+$nipf_maxrisk = {maxrisk};
+$nipf_api = '{api}';
+$nipf_ctx = stream_context_create(array('http' => array('timeout' => 5)));
+$nipf_res = @file_get_contents($nipf_api . '/check.php?clid=' . $nipf_clid . '&ip=' . urlencode($_SERVER['REMOTE_ADDR']), false, $nipf_ctx);
+if ($nipf_res === 'real') {{
+    return;
+}}
+?>
+"""
+
+
+class MockDataset:
+    """In-memory campaign store with deterministic per-day click counters"""
+
+    def __init__(self, campaigns: int = 100, seed: int = 0, api_url: str = "http://127.0.0.1/admin/api"):
+        self.seed = seed
+        self.api_url = api_url
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.campaigns: Dict[str, Dict] = {}
+        for i in range(campaigns):
+            self._add(self._generate(i))
+
+    def _new_id(self) -> str:
+        alphabet = string.ascii_lowercase + string.digits
+        while True:
+            cid = "".join(self.rng.choice(alphabet) for _ in range(8))
+            if cid not in self.campaigns:
+                return cid
+
+    def _generate(self, i: int) -> Dict:
+        countries = self.rng.sample(COUNTRIES, self.rng.randint(1, 3))
+        return {
+            "name": self._new_id(),
+            "info": f"Campaign-{i:05d}",
+            "cv": "1.8.2",
+            "maxrisk": self.rng.choice([0, 50, 70, 90]),
+            "active": self.rng.choice([0, 1, 1, 1, 2, -1]),
+            "fakeurl": f"https://safe{i % 50}.example.com/p{i}",
+            "realurl": [{"url": f"https://money{i % 20}.example.com/lp{i}", "perc": 100, "desc": "LP1"}],
+            "rules": {
+                "mobile": {"allow": True, "d": []},
+                "country": {"allow": True, "d": countries}
+            },
+            "traffic": self.rng.choice(TRAFFIC_SOURCES),
+            "filters": [],
+            "dynvar": [{"name": "", "value": ""}],
+            "urlfilter": [{"variable": "", "action": "1", "value": ""}],
+            "schedule": [],
+            "pagelock": {"enabled": False, "action": "blank", "url": "", "timeout": 10},
+            "lptrack": "",
+            "dynautopt": "1",
+            "urlkeyword": "",
+            "allowedcountries": None,
+            "allowedref": None,
+            "archived": 0,
+            "device": None
+        }
+
+    def _add(self, campaign: Dict):
+        self.campaigns[campaign["name"]] = campaign
+
+    def daily(self, campaign_id: str, day: str) -> Dict[str, int]:
+        """Clicks for one campaign on one day - stable for the same seed"""
+        digest = hashlib.blake2b(f"{self.seed}:{campaign_id}:{day}".encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, "big")
+        total = value % 2000
+        block = (value >> 16) % (total + 1) if total else 0
+        return {"total": total, "block": block}
+
+    def list(self, from_date: str, to_date: str) -> List[Dict]:
+        days = list(_date_range(from_date, to_date))
+        with self.lock:
+            snapshot = [dict(c) for c in self.campaigns.values()]
+        for c in snapshot:
+            total = block = 0
+            for day in days:
+                counts = self.daily(c["name"], day)
+                total += counts["total"]
+                block += counts["block"]
+            c["total"] = total
+            c["block"] = block
+        return snapshot
+
+    def stats(self, campaign_id: str, from_date: str, to_date: str) -> Optional[List[Dict]]:
+        if campaign_id not in self.campaigns:
+            return None
+        return [dict(date=day, **self.daily(campaign_id, day)) for day in _date_range(from_date, to_date)]
+
+    def create(self, payload: Dict) -> Dict:
+        with self.lock:
+            campaign = self._generate(len(self.campaigns))
+            campaign.update({k: v for k, v in payload.items() if k != "name"})
+            campaign["name"] = self._new_id()
+            self._add(campaign)
+            return dict(campaign)
+
+    def update(self, payload: Dict) -> bool:
+        with self.lock:
+            current = self.campaigns.get(payload.get("name"))
+            if current is None:
+                return False
+            current.update(payload)
+            return True
+
+    def change_status(self, campaign_id: str, status: int) -> bool:
+        with self.lock:
+            current = self.campaigns.get(campaign_id)
+            if current is None:
+                return False
+            current["active"] = status
+            return True
+
+    def embed(self, campaign_id: str) -> Optional[str]:
+        current = self.campaigns.get(campaign_id)
+        if current is None:
+            return None
+        return EMBED_TEMPLATE.format(
+            name=current["name"],
+            cv=current.get("cv", "1.8.2"),
+            maxrisk=current.get("maxrisk") or 0,
+            api=self.api_url
+        )
+
+
+def _date_range(from_date: str, to_date: str):
+    start = datetime.strptime(from_date, "%Y-%m-%d")
+    end = datetime.strptime(to_date, "%Y-%m-%d")
+    while start <= end:
+        yield start.strftime("%Y-%m-%d")
+        start += timedelta(days=1)
+
+
+class FaultInjector:
+    """Latency, random 5xx errors and token-bucket rate limiting"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: Optional[float] = None, burst: Optional[int] = None, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst or (int(rate_limit) if rate_limit else 0)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = float(self.burst)
+        self.last_refill = time.monotonic()
+
+    def delay(self):
+        wait = self.latency
+        if self.jitter:
+            with self.lock:
+                wait += self.rng.uniform(0, self.jitter)
+        if wait > 0:
+            time.sleep(wait)
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self.lock:
+            return self.rng.random() < self.error_rate
+
+    def allow(self) -> bool:
+        if not self.rate_limit:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate_limit)
+            self.last_refill = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes - avoid Nagle/delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _send(self, status: int, body, content_type: str = "application/json", headers: Dict = None):
+        if not isinstance(body, (str, bytes)):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode()
+        headers = dict(headers or {})
+        if len(body) > self.server.compress_min and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method: str):
+        server = self.server
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        endpoint = parsed.path.rsplit("/", 1)[-1]
+        action = query.get("a", "")
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+
+        server.count(f"{endpoint}?a={action}" if action else endpoint)
+
+        faults = server.faults
+        if not faults.allow():
+            return self._send(429, {"error": "rate limited"}, headers={"Retry-After": "1"})
+        faults.delay()
+        if faults.should_fail():
+            return self._send(500, {"error": "injected failure"})
+
+        try:
+            payload = json.loads(raw) if raw else {}
+        except json.JSONDecodeError:
+            return self._send(400, {"error": "invalid json"})
+
+        if endpoint == "login.php" and action == "auth" and method == "POST":
+            if (payload.get("username"), payload.get("password")) != (server.username, server.password):
+                return self._send(401, {"error": "invalid credentials"})
+            return self._send(200, {"token": server.issue_token()})
+
+        auth = self.headers.get("Authorization", "")
+        if not server.check_token(auth[7:] if auth.startswith("Bearer ") else ""):
+            return self._send(401, {"error": "unauthorized"})
+
+        data = server.dataset
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        if endpoint == "campaigns.php":
+            if action == "list":
+                from_date = query.get("from", today)
+                return self._send(200, data.list(from_date, query.get("to", from_date)))
+            if action == "create" and method == "POST":
+                return self._send(200, data.create(payload))
+            if action == "update" and method == "POST":
+                ok = data.update(payload)
+                return self._send(200 if ok else 404, {"success": ok})
+            if action == "changeStatus":
+                try:
+                    ok = data.change_status(query.get("clid"), int(query.get("status", "")))
+                except ValueError:
+                    return self._send(400, {"error": "invalid status"})
+                return self._send(200 if ok else 404, {"success": ok})
+            if action == "getPhpEmbed":
+                code = data.embed(query.get("clid"))
+                if code is None:
+                    return self._send(404, {"error": "campaign not found"})
+                return self._send(200, code, content_type="text/plain; charset=utf-8")
+
+        if endpoint == "stats.php" and action == "daily":
+            from_date = query.get("from", today)
+            rows = data.stats(query.get("clid"), from_date, query.get("to", from_date))
+            if rows is None:
+                return self._send(404, {"error": "campaign not found"})
+            return self._send(200, rows)
+
+        return self._send(404, {"error": f"unknown endpoint {endpoint}?a={action}"})
+
+
+class MockNoIPFraudServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server speaking the noIPFraud admin API
+
+    Usage:
+        with MockNoIPFraudServer(campaigns=1000, latency=0.02) as server:
+            api = NoIPFraudAPI(server.base_url, server.username, server.password)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, campaigns: int = 100,
+                 username: str = "mock", password: str = "mock", seed: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: Optional[float] = None, burst: Optional[int] = None,
+                 token_ttl: float = 5 * 3600, compress_min: int = 1024, verbose: bool = False):
+        super().__init__((host, port), _Handler)
+        self.username = username
+        self.password = password
+        self.token_ttl = token_ttl
+        # gzip responses larger than this when the client sends Accept-Encoding: gzip
+        self.compress_min = compress_min
+        self.verbose = verbose
+        self.dataset = MockDataset(campaigns, seed=seed, api_url=self.base_url)
+        self.faults = FaultInjector(latency, jitter, error_rate, rate_limit, burst, seed=seed)
+        self.tokens: Dict[str, float] = {}
+        self.requests = Counter()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/admin/api"
+
+    def issue_token(self) -> str:
+        token = "".join(random.choices(string.ascii_letters + string.digits, k=64))
+        with self._stats_lock:
+            self.tokens[token] = time.monotonic() + self.token_ttl
+        return token
+
+    def check_token(self, token: str) -> bool:
+        expiry = self.tokens.get(token)
+        return expiry is not None and expiry > time.monotonic()
+
+    def count(self, key: str):
+        with self._stats_lock:
+            self.requests[key] += 1
+
+    def reset_counts(self):
+        with self._stats_lock:
+            self.requests.clear()
+
+    def start(self) -> str:
+        """Serve in a background thread and return the base URL"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local noIPFraud mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--campaigns", type=int, default=100, help="number of campaigns to generate")
+    parser.add_argument("--username", default="mock")
+    parser.add_argument("--password", default="mock")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="added delay per request (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra delay up to N seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests/sec before 429")
+    parser.add_argument("--burst", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = MockNoIPFraudServer(
+        args.host, args.port, campaigns=args.campaigns,
+        username=args.username, password=args.password, seed=args.seed,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit=args.rate_limit, burst=args.burst, verbose=args.verbose
+    )
+
+    print("="*70)
+    print("noIPFraud Mock Server")
+    print("="*70)
+    print(f"📍 Base URL: {server.base_url}")
+    print(f"🔑 Credentials: {args.username} / {args.password}")
+    print(f"📊 Campaigns: {args.campaigns}")
+    print(f"⏱️  Latency: {args.latency}s (+{args.jitter}s jitter)")
+    print(f"💥 Error rate: {args.error_rate:.1%}")
+    print(f"🚦 Rate limit: {args.rate_limit or 'off'}")
+    print("="*70)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
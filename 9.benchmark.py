@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+noIPFraud API Client Benchmark
+Drives NoIPFraudAPI against the local mock server at several scales and
+concurrency levels. Baselines are stored as JSON; --compare exits 1 on regression.
+
+Examples:
+    python 9.benchmark.py --quick
+    python 9.benchmark.py --save bench_baseline.json
+    python 9.benchmark.py --compare bench_baseline.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import requests
+
+from script_loader import load_script
+
+client_module = load_script("6.noipfraud_complete_api.py")
+mock_server = load_script("8.mock_server.py")
+
+SCALES = [10, 1000, 10000]
+CONCURRENCY = [1, 4, 16]
+CASES = [
+    "get_campaigns",
+    "bulk_change_status",
+    "bulk_update",
+    "get_all_embed_codes",
+    "get_status_report",
+    "get_block_report",
+]
+
+
+# ==================== REQUEST COUNTING ====================
+
+class RequestCounter:
+    """Counts outgoing HTTP requests by wrapping requests.Session.send"""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+        self._original = requests.Session.send
+
+    def install(self):
+        counter = self
+        original = self._original
+
+        def send(session, request, **kwargs):
+            with counter.lock:
+                counter.count += 1
+            return original(session, request, **kwargs)
+
+        requests.Session.send = send
+
+    def uninstall(self):
+        requests.Session.send = self._original
+
+    def take(self) -> int:
+        with self.lock:
+            value, self.count = self.count, 0
+        return value
+
+
+# ==================== MOCK SERVER PROCESS ====================
+
+def _serve(campaigns: int, latency: float, ready, faults: Dict = None):
+    # Runs in a child process so tracemalloc only sees client allocations
+    server = mock_server.MockNoIPFraudServer(campaigns=campaigns, latency=latency, **(faults or {}))
+    ready.put(server.base_url)
+    server.serve_forever()
+
+
+def start_server(campaigns: int, latency: float, **faults):
+    """Mock server in a child process; faults are MockNoIPFraudServer options (jitter, error_rate, ...)"""
+    ctx = multiprocessing.get_context("fork" if sys.platform != "win32" else "spawn")
+    ready = ctx.Queue()
+    process = ctx.Process(target=_serve, args=(campaigns, latency, ready, faults), daemon=True)
+    process.start()
+    return process, ready.get(timeout=60)
+
+
+# ==================== CASES ====================
+
+def build_case(api, name: str, campaign_ids: List[str], batch: int) -> Callable[[int], object]:
+    """Return a callable running one operation of the case (arg = op index)"""
+    ids = campaign_ids[:batch]
+
+    if name == "get_campaigns":
+        return lambda i: api.get_campaigns()
+    if name == "bulk_change_status":
+        return lambda i: api.bulk_change_status(ids, 1 if i % 2 else 0)
+    if name == "bulk_update":
+        return lambda i: api.bulk_update([{"campaign_id": cid, "info": f"bench-{i}-{cid}"} for cid in ids])
+    if name == "get_all_embed_codes":
+        return lambda i: api.get_all_embed_codes(ids)
+    if name == "get_status_report":
+        return lambda i: api.get_status_report()
+    if name == "get_block_report":
+        return lambda i: api.get_block_report()
+    raise ValueError(f"Unknown case: {name}")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run_case(api, name: str, campaign_ids: List[str], concurrency: int,
+             ops: int, batch: int, counter: RequestCounter) -> Dict:
+    op = build_case(api, name, campaign_ids, batch)
+    latencies = []
+    lock = threading.Lock()
+
+    def timed(i):
+        start = time.perf_counter()
+        op(i)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    counter.take()
+    tracemalloc.reset_peak()
+    base_memory = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(ops)))
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - base_memory
+    request_count = counter.take()
+
+    latencies.sort()
+    return {
+        "ops": ops,
+        "wall_s": round(wall, 4),
+        "ops_per_sec": round(ops / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "requests": request_count,
+        "requests_per_op": round(request_count / ops, 2),
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+
+
+def run_suite(scales: List[int], concurrency_levels: List[int], cases: List[str],
+              ops: int, batch: int, latency: float) -> Dict:
+    counter = RequestCounter()
+    counter.install()
+    tracemalloc.start()
+    results = {}
+    try:
+        for scale in scales:
+            process, base_url = start_server(scale, latency)
+            try:
+                # Enough scheduler slots that the highest concurrency level isn't capped
+                api = client_module.NoIPFraudAPI(base_url, "mock", "mock",
+                                                 max_in_flight=max(concurrency_levels))
+                if not api.login():
+                    raise RuntimeError(f"Login against mock server failed ({base_url})")
+                campaign_ids = [c["name"] for c in api.get_campaigns()]
+
+                for concurrency in concurrency_levels:
+                    for case in cases:
+                        key = f"{case}@{scale}x{concurrency}"
+                        print(f"⏱️  {key:<40}", end="", flush=True)
+                        result = run_case(api, case, campaign_ids, concurrency, ops, batch, counter)
+                        results[key] = result
+                        print(f"{result['ops_per_sec']:>9.2f} ops/s  "
+                              f"p95 {result['p95_ms']:>9.2f} ms  "
+                              f"{result['requests_per_op']:>7.1f} req/op  "
+                              f"{result['peak_mem_kb']:>9.1f} KB")
+            finally:
+                process.terminate()
+                process.join()
+    finally:
+        tracemalloc.stop()
+        counter.uninstall()
+    return results
+
+
+# ==================== BASELINES ====================
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """Return human-readable regressions (empty list = pass)"""
+    regressions = []
+    for key, now in current.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        if before["ops_per_sec"] and now["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{key}: ops/sec {before['ops_per_sec']} → {now['ops_per_sec']}")
+        for metric in ("p95_ms", "p99_ms"):
+            if before[metric] and now[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{key}: {metric} {before[metric]} → {now[metric]}")
+        if now["requests_per_op"] > before["requests_per_op"]:
+            regressions.append(f"{key}: requests/op {before['requests_per_op']} → {now['requests_per_op']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NoIPFraudAPI against the mock server")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=CONCURRENCY)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--ops", type=int, default=10, help="operations per case")
+    parser.add_argument("--batch", type=int, default=20, help="campaigns per bulk operation")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock server latency (seconds)")
+    parser.add_argument("--quick", action="store_true", help="small smoke run (10 campaigns, concurrency 1/4)")
+    parser.add_argument("--save", metavar="FILE", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.scales, args.concurrency, args.ops = [10], [1, 4], 5
+
+    print("="*70)
+    print("noIPFraud API Client Benchmark")
+    print("="*70)
+    print(f"Scales: {args.scales}  Concurrency: {args.concurrency}  "
+          f"Ops: {args.ops}  Batch: {args.batch}  Latency: {args.latency}s")
+    print("="*70)
+
+    results = run_suite(args.scales, args.concurrency, args.cases, args.ops, args.batch, args.latency)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "settings": {"ops": args.ops, "batch": args.batch, "latency": args.latency},
+                "results": results
+            }, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.tolerance)
+        print("\n" + "="*70)
+        if regressions:
+            print(f"❌ {len(regressions)} REGRESSION(S) vs {args.compare}")
+            print("="*70)
+            for r in regressions:
+                print(f"   {r}")
+            sys.exit(1)
+        print(f"✅ No regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
+        print("="*70)
+
+
+if __name__ == "__main__":
+    main()
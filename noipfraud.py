@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+noipfraud - unified command line for the noIPFraud API
+One entry point for n8n / cron. Prints JSON on stdout, exits non-zero on failure.
+
+Credentials come from flags or the environment (never hardcoded):
+    NOIPFRAUD_BASE_URL   e.g. https://luxeattic.com/admin/api
+    NOIPFRAUD_USERNAME
+    NOIPFRAUD_PASSWORD
+
+Examples:
+    noipfraud.py login
+    noipfraud.py list --from 2025-10-01 --to 2025-10-31
+    noipfraud.py list --from 2025-01-01 --to 2025-10-31 --window-days 7
+    noipfraud.py --shared-cache list         (reuse the list snapshot of other workers, see 29.snapshot_cache.py)
+    noipfraud.py status xmgbl4i3
+    noipfraud.py status xmgbl4i3 --set -1
+    noipfraud.py bulk-status 0 xmgbl4i3 twvpck0j
+    noipfraud.py update xmgbl4i3 --fakeurl https://safe.example.com
+    noipfraud.py create "Launch-TH-01" https://safe.example.com https://money.example.com --countries th,vn
+    noipfraud.py bulk-create manifest.csv --concurrency 8      (skips names that already exist)
+    noipfraud.py embed xmgbl4i3 --out ./embeds
+    noipfraud.py report block --date 2025-10-31
+    noipfraud.py sftp-check luxeattic
+    noipfraud.py daemon --port 8787          (warm HTTP/JSON service, see 12.daemon.py)
+
+Startup is kept short: only stdlib modules are imported at the top, the API
+client (requests) is loaded by the API subcommands and paramiko only by
+sftp-check. The login token is cached on disk so each invocation does not
+have to log in again, and with a cached token `status` is answered over
+http.client without loading the client at all.
+
+Exit codes: 0 ok, 1 API/connection failure or some items of a bulk command
+failed, 2 usage error.
+"""
+
+import os
+import sys
+
+TOKEN_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "noipfraud")
+QUICK_TIMEOUT = 30.0
+
+
+# ==================== OUTPUT / CONFIG ====================
+
+def emit(data, pretty: bool = False):
+    import json
+    json.dump(data, sys.stdout, indent=2 if pretty else None, ensure_ascii=False, default=str)
+    sys.stdout.write("\n")
+
+
+def fail(message: str, code: int = 1):
+    """Report an error on stderr and as JSON on stdout, then exit non-zero"""
+    sys.stderr.write(f"❌ {message}\n")
+    emit({"ok": False, "error": message})
+    sys.exit(code)
+
+
+def _token_cache_path(base_url: str, username: str) -> str:
+    import hashlib
+    key = hashlib.sha256(f"{base_url}\0{username}".encode()).hexdigest()[:16]
+    return os.path.join(TOKEN_CACHE_DIR, f"token-{key}.json")
+
+
+def _cached_token(base_url: str, username: str):
+    """(token, expiry) from the token cache, or None if missing/expired"""
+    import json
+    from datetime import datetime
+    try:
+        with open(_token_cache_path(base_url, username)) as f:
+            cached = json.load(f)
+        expiry = datetime.fromisoformat(cached["expiry"])
+    except (OSError, ValueError, KeyError):
+        return None
+    if expiry <= datetime.now():
+        return None
+    return cached["token"], expiry
+
+
+def _load_token(api):
+    cached = _cached_token(api.base_url, api.username)
+    if cached:
+        api.token, api.token_expiry = cached
+
+
+def _save_token(api):
+    import json
+    if not api.token:
+        return
+    os.makedirs(TOKEN_CACHE_DIR, mode=0o700, exist_ok=True)
+    path = _token_cache_path(api.base_url, api.username)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"token": api.token, "expiry": api.token_expiry.isoformat()}, f)
+
+
+def shared_cache_path(args):
+    """SQLite file for --shared-cache, or None when snapshot sharing is off"""
+    path = os.environ.get("NOIPFRAUD_SHARED_CACHE")
+    if path or args.shared_cache:
+        return path or os.path.join(TOKEN_CACHE_DIR, "snapshots.db")
+    return None
+
+
+def credentials(args):
+    """(base_url, username, password) from flags/env"""
+    base_url = args.base_url or os.environ.get("NOIPFRAUD_BASE_URL")
+    username = args.username or os.environ.get("NOIPFRAUD_USERNAME")
+    password = args.password or os.environ.get("NOIPFRAUD_PASSWORD")
+    if not (base_url and username and password):
+        fail("Missing credentials: set --base-url/--username/--password or NOIPFRAUD_* env vars", 2)
+    return base_url.rstrip("/"), username, password
+
+
+def make_client(args):
+    """Build NoIPFraudAPI from flags/env - this is where requests gets imported"""
+    base_url, username, password = credentials(args)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from script_loader import load_script
+    client = load_script("6.noipfraud_complete_api.py")
+
+    snapshot_cache = None
+    path = shared_cache_path(args)
+    if path:
+        snapshot_cache = load_script("29.snapshot_cache.py").SharedSnapshotCache(path, ttl=args.snapshot_ttl)
+    api = client.NoIPFraudAPI(base_url, username, password, max_retries=args.retries,
+                              snapshot_cache=snapshot_cache)
+    if not args.no_token_cache:
+        _load_token(api)
+    return api
+
+
+def quick_status(args):
+    """
+    `status` without --set over plain http.client, so the common n8n poll
+    doesn't pay for importing requests and the client scripts.
+    Needs a cached token; returns None whenever the full client should handle
+    it instead (no token, shared cache, auth or protocol errors). Connection
+    errors are raised - retrying them through requests would only wait twice.
+    """
+    import http.client
+    import json
+    from datetime import datetime
+    from urllib.parse import urlencode, urlsplit
+
+    if args.set is not None or args.no_token_cache or args.retries or shared_cache_path(args):
+        return None
+    base_url, username, _ = credentials(args)
+    cached = _cached_token(base_url, username)
+    if not cached:
+        return None
+    url = urlsplit(base_url)
+    if url.scheme not in ("http", "https"):
+        return None
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    conn_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+    conn = conn_class(url.netloc, timeout=QUICK_TIMEOUT)
+    try:
+        conn.request("GET", f"{url.path}/campaigns.php?" + urlencode({"a": "list", "from": today, "to": today}),
+                     headers={"Authorization": f"Bearer {cached[0]}", "Accept": "application/json"})
+        response = conn.getresponse()
+        if response.status != 200:
+            return None
+        campaigns = json.loads(response.read())
+    except (http.client.HTTPException, ValueError):
+        return None
+    finally:
+        conn.close()
+    if not isinstance(campaigns, list):
+        return None
+
+    # Same rows as NoIPFraudAPI.get_status_report
+    wanted = set(args.campaign_ids)
+    return [{
+        "campaign_id": c["name"],
+        "campaign_name": c["info"],
+        "status": c["active"],
+        "fakeurl": c.get("fakeurl"),
+        "traffic": c.get("traffic")
+    } for c in campaigns if not wanted or c["name"] in wanted]
+
+
+# ==================== SUBCOMMANDS ====================
+
+def cmd_login(api, args):
+    if not api.login():
+        fail("Login failed")
+    return {"ok": True, "token_expiry": api.token_expiry.isoformat()}
+
+
+def cmd_list(api, args):
+    if args.window_days:
+        from script_loader import load_script
+        # On disk so past windows are reused by later invocations
+        api.window_cache = load_script("19.date_windows.py").WindowCache(os.path.join(TOKEN_CACHE_DIR, "windows"))
+    campaigns = api.get_campaigns(args.from_date, args.to_date, window_days=args.window_days,
+                                  concurrency=args.concurrency)
+    if args.fields:
+        fields = args.fields.split(",")
+        campaigns = [{k: c.get(k) for k in fields} for c in campaigns]
+    return campaigns
+
+
+def cmd_status(api, args):
+    if args.set is not None:
+        if len(args.campaign_ids) != 1:
+            fail("--set takes exactly one campaign id (use bulk-status for several)", 2)
+        cid = args.campaign_ids[0]
+        if not api.change_status(cid, args.set):
+            fail(f"Change status failed for {cid}")
+        return {"campaign_id": cid, "status": args.set, "ok": True}
+    report = api.get_status_report()
+    if args.campaign_ids:
+        wanted = set(args.campaign_ids)
+        report = [r for r in report if r["campaign_id"] in wanted]
+    return report
+
+
+def cmd_bulk_status(api, args):
+    ids = args.campaign_ids or [line.strip() for line in sys.stdin if line.strip()]
+    results = api.bulk_change_status(ids, args.status)
+    return {"status": args.status, "results": results, "changed": sum(results.values()), "total": len(results)}
+
+
+def cmd_update(api, args):
+    import json
+    updates = json.loads(args.json) if args.json else {}
+    for field in ("info", "fakeurl", "active", "traffic"):
+        value = getattr(args, field)
+        if value is not None:
+            updates[field] = value
+    if not updates:
+        fail("Nothing to update", 2)
+    ok = api.update_campaign(args.campaign_id, **updates)
+    if not ok:
+        fail(f"Update failed for {args.campaign_id}")
+    return {"campaign_id": args.campaign_id, "ok": True, "updated": sorted(updates)}
+
+
+def cmd_create(api, args):
+    countries = args.countries.split(",") if args.countries else None
+    result = api.create_campaign(args.name, args.safe_url, args.money_url,
+                                 countries=countries, mobile_only=not args.all_devices)
+    if not result:
+        fail("Create campaign failed")
+    return result
+
+
+def cmd_bulk_create(api, args):
+    from script_loader import load_script
+    bulk = load_script("16.bulk_create.py")
+    try:
+        rows = bulk.load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        fail(f"Bad manifest: {e}", 2)
+    try:
+        results = bulk.bulk_create(api, rows, args.concurrency, args.dry_run)
+    except RuntimeError as e:
+        fail(f"{e} - nothing created")
+    return {"summary": bulk.summarize(results), "results": results}
+
+
+def cmd_embed(api, args):
+    codes = api.get_all_embed_codes(args.campaign_ids or None, concurrency=args.concurrency, local=args.local)
+    if not args.out:
+        return codes
+    os.makedirs(args.out, exist_ok=True)
+    written = {}
+    for cid, code in codes.items():
+        if code is None:
+            continue
+        path = os.path.join(args.out, f"{cid}.php")
+        with open(path, "w") as f:
+            f.write(code)
+        written[cid] = path
+    return {"written": written, "failed": [cid for cid, code in codes.items() if code is None]}
+
+
+def cmd_report(api, args):
+    if args.kind == "status":
+        return api.get_status_report()
+    return api.get_block_report(args.date)
+
+
+def cmd_sftp_check(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from script_loader import load_script
+    try:
+        import paramiko  # noqa: F401
+    except ImportError:
+        fail("paramiko not installed - run: pip install paramiko")
+    sftp = load_script("7.test_sftp_connection.py")
+
+    names = args.servers or list(sftp.SERVERS)
+    unknown = [n for n in names if n not in sftp.SERVERS]
+    if unknown:
+        fail(f"Unknown server(s): {', '.join(unknown)}", 2)
+    # test_sftp_connection prints its progress - keep stdout clean for JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        results = {name: sftp.test_sftp_connection(name, sftp.SERVERS[name]) for name in names}
+    finally:
+        sys.stdout = stdout
+    return results
+
+
+COMMANDS = {
+    "login": cmd_login,
+    "list": cmd_list,
+    "status": cmd_status,
+    "bulk-status": cmd_bulk_status,
+    "update": cmd_update,
+    "create": cmd_create,
+    "bulk-create": cmd_bulk_create,
+    "embed": cmd_embed,
+    "report": cmd_report,
+}
+
+
+def build_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="noipfraud", description="noIPFraud API command line")
+    parser.add_argument("--base-url", help="API base URL (env NOIPFRAUD_BASE_URL)")
+    parser.add_argument("--username", help="env NOIPFRAUD_USERNAME")
+    parser.add_argument("--password", help="env NOIPFRAUD_PASSWORD")
+    parser.add_argument("--retries", type=int, default=0, help="retries for transient errors")
+    parser.add_argument("--no-token-cache", action="store_true", help=f"don't reuse tokens from {TOKEN_CACHE_DIR}")
+    parser.add_argument("--pretty", action="store_true", help="indent JSON output")
+    parser.add_argument("--shared-cache", action="store_true",
+                        help=f"share campaign list snapshots with other processes through "
+                             f"{TOKEN_CACHE_DIR}/snapshots.db (env NOIPFRAUD_SHARED_CACHE=PATH also enables it)")
+    parser.add_argument("--snapshot-ttl", type=float, default=30.0, help="shared snapshot freshness (seconds)")
+    # Also accept --pretty after the subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--pretty", action="store_true", default=argparse.SUPPRESS, help="indent JSON output")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("login", parents=[common], help="authenticate and cache the token")
+
+    p = sub.add_parser("list", parents=[common], help="list campaigns")
+    p.add_argument("--from", dest="from_date", help="YYYY-MM-DD (default today)")
+    p.add_argument("--to", dest="to_date", help="YYYY-MM-DD (default --from)")
+    p.add_argument("--fields", help="comma-separated fields to keep, e.g. name,info,active")
+    p.add_argument("--window-days", type=int, help="split long ranges into N-day windows fetched in parallel "
+                                                   "(past windows cached on disk)")
+    p.add_argument("--concurrency", type=int, default=4, help="parallel window fetches")
+
+    p = sub.add_parser("status", parents=[common], help="show campaign status, or change one with --set")
+    p.add_argument("campaign_ids", nargs="*", metavar="CAMPAIGN_ID")
+    p.add_argument("--set", type=int, choices=[-1, 0, 1, 2], help="0=Review 1=Active 2=Allow All -1=Block All")
+
+    p = sub.add_parser("bulk-status", parents=[common], help="change status of many campaigns (ids as args or on stdin)")
+    p.add_argument("status", type=int, choices=[-1, 0, 1, 2])
+    p.add_argument("campaign_ids", nargs="*", metavar="CAMPAIGN_ID")
+
+    p = sub.add_parser("update", parents=[common], help="update campaign fields")
+    p.add_argument("campaign_id")
+    p.add_argument("--info")
+    p.add_argument("--fakeurl")
+    p.add_argument("--active", type=int, choices=[-1, 0, 1, 2])
+    p.add_argument("--traffic")
+    p.add_argument("--json", help="JSON object of fields to update (realurl, rules, ...)")
+
+    p = sub.add_parser("create", parents=[common], help="create a campaign")
+    p.add_argument("name")
+    p.add_argument("safe_url")
+    p.add_argument("money_url")
+    p.add_argument("--countries", help="comma-separated country codes (default th)")
+    p.add_argument("--all-devices", action="store_true", help="don't restrict to mobile")
+
+    p = sub.add_parser("bulk-create", parents=[common], help="create campaigns from a CSV/JSON manifest, skipping existing names")
+    p.add_argument("manifest", help=".csv or .json manifest (see 16.bulk_create.py)")
+    p.add_argument("--concurrency", type=int, default=8, help="parallel create requests")
+    p.add_argument("--dry-run", action="store_true", help="only report what would be created")
+
+    p = sub.add_parser("embed", parents=[common], help="fetch PHP embed code (all campaigns if no ids)")
+    p.add_argument("campaign_ids", nargs="*", metavar="CAMPAIGN_ID")
+    p.add_argument("--out", help="write <id>.php files to this directory instead of printing")
+    p.add_argument("--local", action="store_true", help="render from a learned template, checking a sample against the server")
+    p.add_argument("--concurrency", type=int, default=1, help="parallel embed requests")
+
+    p = sub.add_parser("report", parents=[common], help="status or block-rate report")
+    p.add_argument("kind", choices=["status", "block"])
+    p.add_argument("--date", help="block report date (default yesterday)")
+
+    p = sub.add_parser("sftp-check", parents=[common], help="check SFTP access to the servers in 7.test_sftp_connection.py")
+    p.add_argument("servers", nargs="*", metavar="SERVER")
+
+    p = sub.add_parser("daemon", help="run the warm local HTTP/JSON daemon")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8787)
+    p.add_argument("--tenants", help="JSON file of tenants (default: NOIPFRAUD_* env vars)")
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--max-queue", type=int, default=100)
+    p.add_argument("--cache-ttl", type=float, default=30.0)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == "daemon":
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from script_loader import load_script
+        load_script("12.daemon.py").run(args.host, args.port, args.tenants, args.workers,
+                                        args.max_queue, args.cache_ttl, shared_cache=shared_cache_path(args))
+        return 0
+
+    if args.command == "sftp-check":
+        results = cmd_sftp_check(args)
+        emit(results, args.pretty)
+        return 0 if all(results.values()) else 1
+
+    # requests' exceptions derive from OSError (IOError), bad JSON bodies raise ValueError
+    try:
+        result = quick_status(args) if args.command == "status" else None
+        if result is None:
+            api = make_client(args)
+            token = api.token
+            result = COMMANDS[args.command](api, args)
+            if not args.no_token_cache and api.token != token:
+                _save_token(api)
+    except (OSError, ValueError) as e:
+        fail(f"{args.command} failed - {type(e).__name__}: {e}")
+    emit(result, args.pretty)
+    if args.command == "bulk-create" and result["summary"].get("failed"):
+        return 1
+    if args.command == "bulk-status" and result["changed"] < result["total"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""
+Import helper for the numbered scripts
+"6.noipfraud_complete_api.py" is not a valid module name, so load by file path
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+
+def load_script(filename: str, name: str = None):
+    """
+    Load a sibling script as a module (cached in sys.modules)
+
+    Args:
+        filename: e.g. "6.noipfraud_complete_api.py"
+        name: module name to register, defaults to the filename without
+              its number prefix and extension ("noipfraud_complete_api")
+    """
+    if name is None:
+        name = filename.rsplit(".py", 1)[0].split(".", 1)[-1]
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module